@@ -1,23 +1,27 @@
 # ad_export.py
-import subprocess
-import pandas as pd
 import os
 import logging
-from tqdm import tqdm
 import sys
-import json
+import time
 import unicodedata
-from config import AD_EXPORT_DIR, OUTPUT_DIR
+from datetime import datetime, timezone
+from config import AD_EXPORT_DIR, AD_EXPORT_TXT_FILE, OUTPUT_DIR, AD_INCREMENTAL, AD_SNAPSHOT_FILE, AD_DN_RULES, ensure_directories
+from ad_sources import get_directory_source
+from ad_sinks import get_output_sinks, SinkWriter
+from profiling import profiled
+from ad_snapshot import (load_snapshot, save_snapshot, new_snapshot, needs_full_sync,
+                         changes_since, merge_snapshot, prune_snapshot, TIMESTAMP_FORMAT)
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(OUTPUT_DIR / "ad_export.log", encoding='utf-8'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+def setup_logging():
+    """Настройка логирования для отдельного запуска экспорта (из main.py логирование настраивает main)"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(OUTPUT_DIR / "ad_export.log", encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
 
 def clean_value(value):
     """Очистка и преобразование значений"""
@@ -28,19 +32,108 @@ def clean_value(value):
     cleaned = str(value)
     
     # Удаляем управляющие символы (0x00-0x1F) и спецсимволы Excel
+    # (в печатаемой строке их нет, посимвольная проверка не нужна)
+    if cleaned.isprintable():
+        return cleaned.strip()
     cleaned = ''.join(ch for ch in cleaned if unicodedata.category(ch)[0] != "C")
     cleaned = cleaned.replace('\x00', '').replace('\x01', '').replace('\x02', '')
     
     return cleaned.strip()
 
-def export_ad_users():
+# Поля пользователя, которые попадают в выгрузку
+REQUIRED_FIELDS = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
+
+def process_user(user):
+    """Очистка полей пользователя AD"""
+    processed_user = {}
+    for field in REQUIRED_FIELDS:
+        value = user.get(field, "")
+        # Для поля Enabled сохраняем статус активности
+        if field == 'Enabled':
+            processed_user[field] = "Активна" if value else "Заблокирована"
+        else:
+            processed_user[field] = clean_value(value)
+    return processed_user
+
+def classify_user(processed_user, is_active):
+    """Категория пользователя: 'employee', 'gph' или None (только активные)"""
+    if not is_active:
+        return None
+    
+    dn = processed_user.get('DistinguishedName', '').lower()
+    # Правила из config (по умолчанию: "cu_users" без "гпх" - сотрудники, "external_organizations" или "гпх" - ГПХ)
+    for rule in AD_DN_RULES:
+        if any(marker.lower() in dn for marker in rule['contains']) \
+                and not any(marker.lower() in dn for marker in rule.get('excludes', ())):
+            return rule['category']
+    return None
+
+def write_users_stream(records, sinks, pbar=None):
+    """Потоковая запись пользователей: каждая запись обрабатывается один раз
+    и пачками передается выходным файлам, которые пишутся параллельно"""
+    total = employees_count = gph_count = 0
+    
+    with SinkWriter(sinks) as writer:
+        for user in records:
+            processed_user = process_user(user)
+            total += 1
+            
+            category = classify_user(processed_user, user.get('Enabled', False))
+            if category == 'employee':
+                employees_count += 1
+            elif category == 'gph':
+                gph_count += 1
+            writer.write(processed_user, category)
+            
+            if pbar is not None:
+                pbar.update(1)
+    
+    return total, employees_count, gph_count
+
+def _with_progress(records, pbar):
+    """Обновление индикатора прогресса по мере получения записей"""
+    for user in records:
+        pbar.update(1)
+        yield user
+
+def sync_snapshot(snapshot, records, full_sync):
+    """Обновление снимка записями из AD; при полной выгрузке снимок собирается заново"""
+    if full_sync:
+        snapshot = new_snapshot()
+        snapshot['last_full_sync'] = datetime.now(timezone.utc).strftime(TIMESTAMP_FORMAT)
+    added, updated = merge_snapshot(snapshot, records)
+    return snapshot, added, updated
+
+def remove_deleted_users(snapshot, source):
+    """Удаление из снимка учетных записей, которых больше нет в AD (whenChanged удаленных не возвращает)"""
+    try:
+        guids = set(source.iter_guids())
+    except Exception:
+        logging.exception("Не удалось получить список ObjectGUID из AD")
+        guids = set()
+    
+    removed = None if source.failed else prune_snapshot(snapshot, guids)
+    if removed is None:
+        logging.warning("Удаленные учетные записи не проверены: список ObjectGUID не получен")
+    else:
+        logging.info(f"Удалено из снимка учетных записей, которых нет в AD: {removed}")
+
+@profiled("ad_export", rows=lambda result: result[0])
+def export_ad_users(incremental=None, recorded_output=None, backend=None, recorded_guids=None):
+    """Экспорт пользователей AD; recorded_output - файл с записанным выводом PowerShell вместо запуска,
+    recorded_guids - записанный список ObjectGUID для поиска удаленных записей при инкрементальной синхронизации"""
+    from tqdm import tqdm  # Нужен только во время экспорта
+    
+    if incremental is None:
+        incremental = AD_INCREMENTAL
+    
     # Определяем путь для сохранения файлов
     script_dir = os.path.dirname(os.path.abspath(__file__))
     
-    # Создаем директорию, если она не существует
-    AD_EXPORT_DIR.mkdir(exist_ok=True)
+    # Создаем директории, если они не существуют
+    ensure_directories()
     
-    txt_filename = OUTPUT_DIR / 'ad_users_export.txt'
+    txt_filename = AD_EXPORT_TXT_FILE
     xlsx_filename = OUTPUT_DIR / 'ad_users_export.xlsx'
     employees_filename = AD_EXPORT_DIR / 'сотрудники.txt'
     gph_filename = AD_EXPORT_DIR / 'ГПХ.txt'
@@ -50,196 +143,73 @@ def export_ad_users():
     logging.info(f"Файлы будут сохранены в: {script_dir}")
     logging.info(f"Разделенные файлы будут сохранены в: {AD_EXPORT_DIR}")
     
-    # Исправленная PowerShell команда с добавлением DistinguishedName
-    ps_command = """
-    $OutputEncoding = [System.Text.Encoding]::UTF8
-    [Console]::OutputEncoding = [System.Text.Encoding]::UTF8
-    $ErrorActionPreference = 'Stop'
-    try {
-        $users = Get-ADUser -Filter * -Properties Name, SamAccountName, Enabled, EmailAddress, Company, DistinguishedName
-        $count = $users.Count
-        Write-Host "Найдено пользователей: $count"
-        
-        # Обрабатываем каждого пользователя отдельно
-        foreach ($user in $users) {
-            $user | Select-Object Name, SamAccountName, Enabled, EmailAddress, Company, DistinguishedName |
-            ConvertTo-Json -Depth 2 -Compress
-            Write-Host ""  # Разделитель между записями
-        }
-    }
-    catch {
-        Write-Error $_
-        exit 1
+    # Пишутся только включенные в config выходные файлы
+    filenames = {
+        'txt': txt_filename,
+        'employees': employees_filename,
+        'gph': gph_filename,
+        'xlsx': xlsx_filename
     }
-    """
+    sinks = get_output_sinks(filenames, REQUIRED_FIELDS)
+    
+    snapshot = load_snapshot(AD_SNAPSHOT_FILE) if incremental else None
+    full_sync = not incremental or needs_full_sync(snapshot)
+    since = None if full_sync else changes_since(snapshot)
+    if incremental:
+        logging.info("Полная синхронизация AD" if full_sync else f"Инкрементальная синхронизация AD: изменения с {since}")
     
-    logging.info("Запуск PowerShell команды...")
     try:
-        # Запускаем PowerShell процесс
-        process = subprocess.Popen(
-            ["powershell", "-Command", ps_command],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding='utf-8',
-            errors='replace',
-            bufsize=1
-        )
-        
-        # Переменные для сбора данных
-        users = []
-        user_count = 0
-        current_json = ""
-        in_json = False
+        if recorded_output is not None:
+            source = get_directory_source('powershell', recorded_output=recorded_output, recorded_guids=recorded_guids)
+        else:
+            source = get_directory_source(backend)
+        logging.info(f"Источник данных AD: {source.name}")
         
-        # Читаем вывод построчно
-        logging.info("Обработка вывода PowerShell...")
+        # Каждая запись обрабатывается сразу после получения
+        start_time = time.perf_counter()
         with tqdm(desc="Получение данных", unit="польз.") as pbar:
-            while True:
-                line = process.stdout.readline()
-                if not line:  # Конец вывода
-                    break
-                    
-                # Ищем количество пользователей
-                if "Найдено пользователей:" in line:
-                    try:
-                        user_count = int(line.split(":")[1].strip())
-                        logging.info(f"Найдено пользователей: {user_count}")
-                        pbar.total = user_count
-                    except:
-                        pass
-                    continue
-                    
-                # Пустые строки - разделители между JSON
-                if line.strip() == "":
-                    if current_json:
-                        try:
-                            user_data = json.loads(current_json)
-                            users.append(user_data)
-                            pbar.update(1)
-                            current_json = ""
-                            in_json = False
-                        except json.JSONDecodeError:
-                            logging.warning(f"Ошибка декодирования JSON: {current_json}")
-                            current_json = ""
-                    continue
-                    
-                # Собираем JSON строки
-                current_json += line
-                in_json = True
-        
-        # Проверяем завершающий JSON
-        if current_json and in_json:
-            try:
-                user_data = json.loads(current_json)
-                users.append(user_data)
-                pbar.update(1)
-            except json.JSONDecodeError:
-                logging.warning(f"Ошибка декодирования последнего JSON: {current_json}")
-        
-        # Проверяем ошибки
-        stderr = process.stderr.read()
-        if stderr:
-            logging.error(f"Ошибка PowerShell: {stderr}")
-            if not users:
-                # Создаем пустые файлы, если не удалось получить данные
-                open(employees_filename, 'w', encoding='utf-8').close()
-                open(gph_filename, 'w', encoding='utf-8').close()
-                return 0, 0, 0
-        
-        if not users:
-            logging.warning("Не найдено пользователей в Active Directory")
-            # Создаем пустые файлы
-            open(employees_filename, 'w', encoding='utf-8').close()
-            open(gph_filename, 'w', encoding='utf-8').close()
-            return 0, 0, 0
-        
-        # Обработка данных пользователей
-        logging.info("Обработка данных...")
-        processed_users = []
-        employees = []  # Сотрудники кампуса
-        gph_users = []  # Сотрудники ГПХ
-        
-        required_fields = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
-        
-        with tqdm(total=len(users), desc="Обработка данных", unit="польз.") as pbar:
-            for user in users:
-                processed_user = {}
-                for field in required_fields:
-                    value = user.get(field, "")
-                    # Для поля Enabled сохраняем статус активности
-                    if field == 'Enabled':
-                        processed_user[field] = "Активна" if value else "Заблокирована"
-                    else:
-                        processed_user[field] = clean_value(value)
-                
-                processed_users.append(processed_user)
-                
-                # Разделение пользователей по критериям (только активные)
-                dn = processed_user.get('DistinguishedName', '').lower()
-                is_active = user.get('Enabled', False)
-                
-                if is_active:
-                    # Сотрудники кампуса: DN содержит "cu_users" и не содержит "гпх"
-                    if 'cu_users' in dn and 'гпх' not in dn:
-                        employees.append(processed_user)
-                    # Сотрудники ГПХ: DN содержит "external_organizations" или "гпх"
-                    elif 'external_organizations' in dn or 'гпх' in dn:
-                        gph_users.append(processed_user)
-                
-                pbar.update(1)
-        
-        # Экспорт в TXT (общий файл)
-        logging.info(f"Экспорт в TXT файл: {txt_filename}")
-        with open(txt_filename, 'w', encoding='utf-8') as txt_file, \
-             tqdm(total=len(processed_users), desc="Запись в TXT", unit="польз.") as pbar:
-            
-            for user in processed_users:
-                txt_file.write("=" * 80 + "\n")
-                for key, value in user.items():
-                    txt_file.write(f"{key}: {value}\n")
-                txt_file.write("\n")
-                pbar.update(1)
-        
-        # Экспорт сотрудников кампуса
-        logging.info(f"Экспорт сотрудников кампуса: {employees_filename}")
-        with open(employees_filename, 'w', encoding='utf-8') as emp_file, \
-             tqdm(total=len(employees), desc="Запись сотрудников", unit="польз.") as pbar:
+            def set_total(count):
+                logging.info(f"Найдено пользователей: {count}")
+                pbar.total = count
             
-            for user in employees:
-                emp_file.write(f"Name: {user['Name']}\n")
-                emp_file.write(f"Status: {user['Enabled']}\n\n")
-                pbar.update(1)
+            records = source.iter_users(since, on_count=set_total)
+            if incremental:
+                new_snapshot_data, added, updated = sync_snapshot(snapshot, _with_progress(records, pbar), full_sync)
+            else:
+                total_users, employees_count, gph_count = write_users_stream(records, sinks, pbar)
+        elapsed = time.perf_counter() - start_time
+        failed = source.failed
         
-        # Экспорт сотрудников ГПХ
-        logging.info(f"Экспорт сотрудников ГПХ: {gph_filename}")
-        with open(gph_filename, 'w', encoding='utf-8') as gph_file, \
-             tqdm(total=len(gph_users), desc="Запись ГПХ", unit="польз.") as pbar:
+        if incremental:
+            received = added + updated
+            logging.info(f"Получено записей из AD: {received} (новых {added}, измененных {updated}), "
+                         f"{received / max(elapsed, 1e-9):.0f} польз./с")
+            if failed:
+                # Снимок не обновляем, файлы пересобираем из предыдущего снимка
+                logging.warning("Снимок AD не обновлен из-за ошибки источника данных")
+                new_snapshot_data = snapshot or new_snapshot()
+            else:
+                if not full_sync:
+                    remove_deleted_users(new_snapshot_data, source)
+                save_snapshot(new_snapshot_data, AD_SNAPSHOT_FILE)
             
-            for user in gph_users:
-                gph_file.write(f"Name: {user['Name']}\n")
-                gph_file.write(f"Status: {user['Enabled']}\n\n")
-                pbar.update(1)
+            # Производные файлы пересобираются из объединенного снимка
+            total_users, employees_count, gph_count = write_users_stream(new_snapshot_data['users'].records(), sinks)
         
-        # Экспорт в XLSX (общий файл)
-        logging.info(f"Экспорт в XLSX файл: {xlsx_filename}")
-        with tqdm(total=1, desc="Создание Excel", leave=False) as pbar:
-            df = pd.DataFrame(processed_users)
-            
-            # Сохраняем в Excel
-            df.to_excel(xlsx_filename, index=False, engine='openpyxl')
-            pbar.update(1)
+        if not total_users:
+            logging.warning("Не найдено пользователей в Active Directory")
+            return 0, 0, 0
         
         logging.info("Экспорт завершен успешно!")
-        logging.info(f"- TXT файл: {txt_filename}")
-        logging.info(f"- Excel файл: {xlsx_filename}")
-        logging.info(f"- Сотрудники кампуса: {employees_filename}")
-        logging.info(f"- Сотрудники ГПХ: {gph_filename}")
-        logging.info(f"- Всего экспортировано пользователей: {len(processed_users)}")
-        logging.info(f"- Сотрудников кампуса: {len(employees)}")
-        logging.info(f"- Сотрудников ГПХ: {len(gph_users)}")
+        for sink in sinks:
+            logging.info(f"- {sink.title}: {sink.filename}")
+        logging.info(f"- Всего экспортировано пользователей: {total_users}")
+        logging.info(f"- Сотрудников кампуса: {employees_count}")
+        logging.info(f"- Сотрудников ГПХ: {gph_count}")
+        if not incremental:
+            logging.info(f"- Скорость обработки: {total_users / max(elapsed, 1e-9):.0f} польз./с")
         
-        return len(processed_users), len(employees), len(gph_users)
+        return total_users, employees_count, gph_count
     
     except Exception as e:
         logging.exception("Произошла критическая ошибка:")
@@ -252,4 +222,6 @@ def export_ad_users():
         return 0, 0, 0
 
 if __name__ == "__main__":
+    ensure_directories()
+    setup_logging()
     export_ad_users()
\ No newline at end of file
@@ -0,0 +1,228 @@
+# ad_sinks.py
+import logging
+import os
+import queue
+import threading
+from abc import ABC, abstractmethod
+from config import AD_OUTPUT_SINKS, AD_SINK_BATCH_SIZE
+
+# Выходные файлы экспорта AD. Каждый файл пишется своим потоком и получает
+# пачки (обработанный пользователь, категория 'employee'/'gph'/None).
+
+FILE_BUFFER_SIZE = 1 << 20
+
+class OutputSink(ABC):
+    """Базовый выходной файл экспорта AD"""
+    name = "base"
+    title = "Файл"
+    
+    def __init__(self, filename):
+        self.filename = filename
+    
+    def open(self):
+        pass
+    
+    @abstractmethod
+    def write_batch(self, batch):
+        """Запись пачки (обработанный пользователь, категория)"""
+    
+    def close(self, total):
+        """Завершение записи; total - сколько пользователей получено всего"""
+        pass
+    
+    def abort(self):
+        """Освобождение файла после ошибки записи (без завершения: итогов, сохранения книги)"""
+        file = getattr(self, 'file', None)
+        if file is not None:
+            file.close()
+
+class TxtDumpSink(OutputSink):
+    """Полная текстовая выгрузка всех полей"""
+    name = "txt"
+    title = "TXT файл"
+    
+    def open(self):
+        self.file = open(self.filename, 'w', encoding='utf-8', buffering=FILE_BUFFER_SIZE)
+    
+    def write_batch(self, batch):
+        parts = []
+        for processed_user, _ in batch:
+            parts.append("=" * 80 + "\n")
+            for key, value in processed_user.items():
+                parts.append(f"{key}: {value}\n")
+            parts.append("\n")
+        self.file.write(''.join(parts))
+    
+    def close(self, total):
+        self.file.close()
+
+class CategorySink(OutputSink):
+    """Имена и статусы активных пользователей одной категории (вход сверки)"""
+    category = None
+    
+    def open(self):
+        self.file = open(self.filename, 'w', encoding='utf-8', buffering=FILE_BUFFER_SIZE)
+    
+    def write_batch(self, batch):
+        self.file.write(''.join(
+            f"Name: {processed_user['Name']}\nStatus: {processed_user['Enabled']}\n\n"
+            for processed_user, category in batch if category == self.category
+        ))
+    
+    def close(self, total):
+        self.file.close()
+
+class EmployeesSink(CategorySink):
+    name = "employees"
+    title = "Сотрудники кампуса"
+    category = 'employee'
+
+class GphSink(CategorySink):
+    name = "gph"
+    title = "Сотрудники ГПХ"
+    category = 'gph'
+
+class XlsxSink(OutputSink):
+    """Полная выгрузка в Excel (openpyxl write-only)"""
+    name = "xlsx"
+    title = "Excel файл"
+    
+    def __init__(self, filename, fields):
+        super().__init__(filename)
+        self.fields = fields
+    
+    def open(self):
+        from openpyxl import Workbook  # Выгрузка в Excel по умолчанию отключена - openpyxl загружается только для нее
+        
+        self.workbook = Workbook(write_only=True)
+        self.worksheet = self.workbook.create_sheet('Sheet1')
+        self.worksheet.append(self.fields)
+    
+    def write_batch(self, batch):
+        for processed_user, _ in batch:
+            self.worksheet.append([processed_user[field] for field in self.fields])
+    
+    def _save_temporary(self):
+        """Сохранение книги рядом с файлом; сохранение освобождает временный файл листа openpyxl"""
+        tmp_filename = f"{self.filename}.tmp"
+        try:
+            self.workbook.save(tmp_filename)
+        except Exception:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+        return tmp_filename
+    
+    def close(self, total):
+        tmp_filename = self._save_temporary()
+        if total:
+            os.replace(tmp_filename, self.filename)
+        else:
+            # Пустую книгу не сохраняем, как и раньше
+            os.remove(tmp_filename)
+    
+    def abort(self):
+        # Сам файл открывается только при сохранении; книга сохраняется во временный файл и удаляется
+        if getattr(self, 'workbook', None) is not None:
+            os.remove(self._save_temporary())
+
+OUTPUT_SINKS = {
+    TxtDumpSink.name: TxtDumpSink,
+    EmployeesSink.name: EmployeesSink,
+    GphSink.name: GphSink,
+    XlsxSink.name: XlsxSink
+}
+
+def get_output_sinks(filenames, fields, enabled=None):
+    """Включенные выходные файлы (по умолчанию config.AD_OUTPUT_SINKS); filenames - имя -> путь"""
+    enabled = AD_OUTPUT_SINKS if enabled is None else enabled
+    sinks = []
+    for name in enabled:
+        if name not in OUTPUT_SINKS:
+            raise ValueError(f"Неизвестный выходной файл AD: {name}. Доступны: {', '.join(OUTPUT_SINKS)}")
+        if name == XlsxSink.name:
+            sinks.append(XlsxSink(filenames[name], fields))
+        else:
+            sinks.append(OUTPUT_SINKS[name](filenames[name]))
+    
+    for name in (EmployeesSink.name, GphSink.name):
+        if name not in enabled:
+            logging.warning(f"Выходной файл {name} отключен: сверка будет использовать прежний файл")
+    return sinks
+
+class SinkWriter:
+    """Параллельная запись: у каждого выходного файла свой поток и ограниченная очередь пачек"""
+    
+    def __init__(self, sinks, batch_size=AD_SINK_BATCH_SIZE, max_batches=8):
+        self.sinks = sinks
+        self.batch_size = batch_size
+        self.batch = []
+        self.total = 0
+        self.errors = {}
+        self.queues = [queue.Queue(maxsize=max_batches) for _ in sinks]
+        self.threads = [
+            threading.Thread(target=self._drain, args=(sink, q), name=f"ad-sink-{sink.name}", daemon=True)
+            for sink, q in zip(sinks, self.queues)
+        ]
+    
+    def _drain(self, sink, batches):
+        failed = False
+        try:
+            sink.open()
+        except Exception as e:
+            self.errors[sink.name] = e
+            failed = True
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                # После ошибки очередь только опустошается, чтобы не блокировать остальных
+                if failed:
+                    continue
+                try:
+                    sink.write_batch(batch)
+                except Exception as e:
+                    self.errors[sink.name] = e
+                    failed = True
+            if not failed:
+                try:
+                    sink.close(self.total)
+                except Exception as e:
+                    self.errors[sink.name] = e
+                    failed = True
+        finally:
+            # Недописанный файл закрывается, иначе (в Windows) следующий запуск не сможет его перезаписать
+            if failed:
+                try:
+                    sink.abort()
+                except Exception as e:
+                    logging.warning(f"Выходной файл {sink.name} не закрыт после ошибки: {e}")
+    
+    def __enter__(self):
+        for thread in self.threads:
+            thread.start()
+        return self
+    
+    def write(self, processed_user, category):
+        self.batch.append((processed_user, category))
+        self.total += 1
+        if len(self.batch) >= self.batch_size:
+            self._flush()
+    
+    def _flush(self):
+        if self.batch:
+            for q in self.queues:
+                q.put(self.batch)
+            self.batch = []
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._flush()
+        for q in self.queues:
+            q.put(None)
+        for thread in self.threads:
+            thread.join()
+        if exc_type is None and self.errors:
+            name, error = next(iter(self.errors.items()))
+            raise RuntimeError(f"Ошибка записи выходного файла {name}: {error}") from error
+        return False
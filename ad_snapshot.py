@@ -0,0 +1,101 @@
+# ad_snapshot.py
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from config import AD_FULL_SYNC_DAYS, AD_SYNC_OVERLAP_MINUTES, AD_SERVER
+from ad_store import ADUserStore, compact_key
+
+# Формат отметки времени whenChanged, который отдает PowerShell (UTC)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+SNAPSHOT_VERSION = 2  # 2 - пользователи хранятся столбцами (ADUserStore)
+
+def new_snapshot():
+    """Пустой снимок AD"""
+    return {
+        'version': SNAPSHOT_VERSION,
+        'server': AD_SERVER,
+        'high_water_mark': None,
+        'last_full_sync': None,
+        'users': ADUserStore()
+    }
+
+def load_snapshot(filename):
+    """Загрузка локального снимка AD (None, если снимка нет или он поврежден)"""
+    if not filename.exists():
+        return None
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logging.warning(f"Снимок AD поврежден и будет создан заново: {e}")
+        return None
+    
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    try:
+        snapshot['users'] = ADUserStore.from_json(snapshot['users'])
+    except (KeyError, TypeError, ValueError) as e:
+        logging.warning(f"Снимок AD поврежден и будет создан заново: {e}")
+        return None
+    return snapshot
+
+def save_snapshot(snapshot, filename):
+    """Атомарное сохранение снимка AD"""
+    tmp_filename = filename.with_suffix(filename.suffix + '.tmp')
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        json.dump(dict(snapshot, users=snapshot['users'].to_json()), f, ensure_ascii=False)
+    os.replace(tmp_filename, filename)
+
+def needs_full_sync(snapshot, now=None):
+    """Нужна ли полная выгрузка вместо инкрементальной"""
+    if snapshot is None or not snapshot.get('high_water_mark') or not snapshot.get('last_full_sync'):
+        return True
+    
+    # whenChanged не реплицируется между контроллерами домена
+    if snapshot.get('server') != AD_SERVER:
+        return True
+    
+    # Периодическая полная выгрузка - на случай изменений, которые не попали в инкрементальные
+    now = now or datetime.now(timezone.utc)
+    last_full_sync = datetime.strptime(snapshot['last_full_sync'], TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+    return now - last_full_sync > timedelta(days=AD_FULL_SYNC_DAYS)
+
+def changes_since(snapshot):
+    """Момент, начиная с которого запрашиваются изменения (с запасом на задержки записи)"""
+    mark = datetime.strptime(snapshot['high_water_mark'], TIMESTAMP_FORMAT)
+    return (mark - timedelta(minutes=AD_SYNC_OVERLAP_MINUTES)).strftime(TIMESTAMP_FORMAT)
+
+def user_key(user):
+    """Ключ пользователя в снимке: ObjectGUID, иначе SamAccountName или DN"""
+    return user.get('ObjectGUID') or user.get('SamAccountName') or user.get('DistinguishedName')
+
+def merge_snapshot(snapshot, records):
+    """Слияние измененных записей в снимок; возвращает (добавлено, обновлено)"""
+    users = snapshot['users']
+    high_water_mark = snapshot.get('high_water_mark')
+    added = updated = 0
+    
+    for user in records:
+        key = user_key(user)
+        if not key:
+            continue
+        if users.upsert(key, user):
+            added += 1
+        else:
+            updated += 1
+        
+        changed = user.get('whenChanged')
+        if changed and (high_water_mark is None or changed > high_water_mark):
+            high_water_mark = changed
+    
+    snapshot['high_water_mark'] = high_water_mark
+    return added, updated
+
+def prune_snapshot(snapshot, guids):
+    """Удаление из снимка учетных записей, ObjectGUID которых нет в полном списке guids;
+    возвращает число удаленных (None, если список пуст - его не с чем сравнивать)"""
+    present = {compact_key(guid) for guid in guids if guid}
+    if not present:
+        return None
+    return snapshot['users'].retain(present)
\ No newline at end of file
@@ -0,0 +1,316 @@
+# ad_sources.py
+import json
+import logging
+import subprocess
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from config import AD_BACKEND, AD_SERVER, LDAP_SERVER, LDAP_BASE_DN, LDAP_USER, LDAP_PASSWORD
+from config import LDAP_USE_SSL, LDAP_PAGE_SIZE
+from ad_snapshot import TIMESTAMP_FORMAT
+
+# Источники пользователей каталога. Каждый источник отдает записи в формате
+# PowerShell-выгрузки: Name, SamAccountName, Enabled (bool), EmailAddress, Company,
+# DistinguishedName, ObjectGUID и whenChanged (UTC, TIMESTAMP_FORMAT).
+
+class DirectorySource(ABC):
+    """Базовый источник пользователей каталога"""
+    name = "base"
+    
+    def __init__(self):
+        self.failed = False  # Источник завершился с ошибкой (проверять после чтения записей)
+    
+    @abstractmethod
+    def iter_users(self, since=None, on_count=None):
+        """Потоковая выдача пользователей (всех или измененных после since)"""
+    
+    @abstractmethod
+    def iter_guids(self):
+        """Потоковая выдача ObjectGUID всех пользователей (для поиска удаленных записей)"""
+
+def iter_json_records(lines, on_count=None):
+    """Потоковый разбор вывода PowerShell: по одному JSON-документу на пользователя"""
+    buffer = []
+    for line in lines:
+        # Количество пользователей (если PowerShell его сообщил)
+        if "Найдено пользователей:" in line:
+            try:
+                count = int(line.split(":")[1].strip())
+                if on_count:
+                    on_count(count)
+            except ValueError:
+                pass
+            continue
+        
+        stripped = line.strip()
+        
+        # Пустые строки - разделители между JSON
+        if not stripped:
+            if buffer:
+                record = _decode_record(buffer)
+                buffer = []
+                if record is not None:
+                    yield record
+            continue
+        
+        # Сжатый JSON (-Compress) занимает одну строку - декодируем сразу
+        if not buffer and stripped.startswith('{') and stripped.endswith('}'):
+            try:
+                yield json.loads(stripped)
+                continue
+            except json.JSONDecodeError:
+                pass
+        
+        buffer.append(line)
+    
+    # Проверяем завершающий JSON
+    if buffer:
+        record = _decode_record(buffer)
+        if record is not None:
+            yield record
+
+def _decode_record(buffer):
+    """Декодирование накопленных строк одного JSON-документа"""
+    text = "".join(buffer)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        logging.warning(f"Ошибка декодирования JSON: {text}")
+        return None
+
+def build_ps_command(since=None):
+    """PowerShell команда выгрузки: все пользователи или только измененные после since (UTC)"""
+    server = f" -Server '{AD_SERVER}'" if AD_SERVER else ""
+    if since:
+        since_filter = f"""
+        $since = [DateTime]::ParseExact('{since}', "yyyy-MM-dd'T'HH:mm:ss'Z'",
+            [Globalization.CultureInfo]::InvariantCulture,
+            [Globalization.DateTimeStyles]::AssumeUniversal -bor [Globalization.DateTimeStyles]::AdjustToUniversal)
+        $filter = 'whenChanged -ge $since'"""
+    else:
+        since_filter = """
+        $filter = '*'"""
+    
+    # PowerShell отдает пользователей конвейером, по одному сжатому JSON на строку
+    return f"""
+    $OutputEncoding = [System.Text.Encoding]::UTF8
+    [Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+    $ErrorActionPreference = 'Stop'
+    try {{{since_filter}
+        Get-ADUser -Filter $filter{server} -ResultPageSize 1000 -Properties Name, SamAccountName, Enabled, EmailAddress, Company, DistinguishedName, whenChanged |
+        ForEach-Object {{
+            $_ | Select-Object Name, SamAccountName, Enabled, EmailAddress, Company, DistinguishedName,
+                @{{n='ObjectGUID'; e={{$_.ObjectGUID.ToString()}}}},
+                @{{n='whenChanged'; e={{$_.whenChanged.ToUniversalTime().ToString("yyyy-MM-dd'T'HH:mm:ss'Z'")}}}} |
+            ConvertTo-Json -Depth 2 -Compress
+            Write-Host ""  # Разделитель между записями
+        }}
+    }}
+    catch {{
+        Write-Error $_
+        exit 1
+    }}
+    """
+
+def build_ps_guids_command():
+    """PowerShell команда выгрузки только ObjectGUID всех пользователей (по одному в строке)"""
+    server = f" -Server '{AD_SERVER}'" if AD_SERVER else ""
+    return f"""
+    $OutputEncoding = [System.Text.Encoding]::UTF8
+    [Console]::OutputEncoding = [System.Text.Encoding]::UTF8
+    $ErrorActionPreference = 'Stop'
+    try {{
+        Get-ADUser -Filter *{server} -ResultPageSize 1000 | ForEach-Object {{ $_.ObjectGUID.ToString() }}
+    }}
+    catch {{
+        Write-Error $_
+        exit 1
+    }}
+    """
+
+class PowerShellSource(DirectorySource):
+    """Выгрузка через Get-ADUser в PowerShell (только Windows)"""
+    name = "powershell"
+    
+    def __init__(self, recorded_output=None, recorded_guids=None):
+        super().__init__()
+        self.recorded_output = recorded_output  # Записанный вывод PowerShell вместо запуска
+        self.recorded_guids = recorded_guids  # Записанный список ObjectGUID (по одному в строке)
+    
+    def iter_users(self, since=None, on_count=None):
+        if self.recorded_output is not None:
+            logging.info(f"Чтение записанного вывода PowerShell: {self.recorded_output}")
+            with open(self.recorded_output, 'r', encoding='utf-8') as lines:
+                yield from iter_json_records(lines, on_count=on_count)
+            return
+        
+        logging.info("Запуск PowerShell команды...")
+        yield from iter_json_records(self._run(build_ps_command(since)), on_count=on_count)
+    
+    def iter_guids(self):
+        if self.recorded_guids is not None:
+            logging.info(f"Чтение записанного списка ObjectGUID: {self.recorded_guids}")
+            with open(self.recorded_guids, 'r', encoding='utf-8') as lines:
+                yield from (line.strip() for line in lines if line.strip())
+            return
+        if self.recorded_output is not None:
+            # Записанный вывод без списка GUID - удаленные записи проверить не по чему
+            logging.warning("Для записанного вывода PowerShell не задан список ObjectGUID")
+            self.failed = True
+            return
+        
+        logging.info("Запуск PowerShell команды (список ObjectGUID)...")
+        yield from (line.strip() for line in self._run(build_ps_guids_command()) if line.strip())
+    
+    def _run(self, command):
+        """Строки вывода PowerShell по мере поступления; код возврата - в self.failed"""
+        process = subprocess.Popen(
+            ["powershell", "-Command", command],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1
+        )
+        with process.stdout:
+            yield from process.stdout
+        
+        # Проверяем ошибки
+        stderr = process.stderr.read()
+        self.failed = process.wait() != 0
+        if stderr:
+            logging.error(f"Ошибка PowerShell: {stderr}")
+
+# Атрибуты LDAP, которые нужны для полей выгрузки (DN приходит вместе с записью),
+# плюс objectGUID и whenChanged для инкрементальной синхронизации
+LDAP_ATTRIBUTES = ['name', 'sAMAccountName', 'userAccountControl', 'mail', 'company',
+                   'objectGUID', 'whenChanged']
+ACCOUNTDISABLE = 0x0002  # Флаг отключенной учетной записи в userAccountControl
+
+class LdapSource(DirectorySource):
+    """Прямой LDAP-запрос постраничным поиском (библиотека ldap3, работает на любой ОС)"""
+    name = "ldap"
+    
+    def __init__(self, server=None, base_dn=None, user=None, password=None,
+                 use_ssl=None, page_size=None, connection=None):
+        super().__init__()
+        self.server = server or LDAP_SERVER or AD_SERVER
+        self.base_dn = base_dn or LDAP_BASE_DN
+        self.user = user or LDAP_USER
+        self.password = password or LDAP_PASSWORD
+        self.use_ssl = LDAP_USE_SSL if use_ssl is None else use_ssl
+        self.page_size = page_size or LDAP_PAGE_SIZE
+        self.connection = connection  # Готовое подключение (например, ldap3 MOCK_SYNC)
+    
+    def _connect(self):
+        """Подключение к контроллеру домена"""
+        try:
+            import ldap3
+        except ImportError:
+            raise RuntimeError("Для LDAP-источника установите пакет ldap3: pip install ldap3")
+        
+        if not self.server or not self.base_dn:
+            raise RuntimeError("Для LDAP-источника укажите LDAP_SERVER и LDAP_BASE_DN в config.py")
+        
+        server = ldap3.Server(self.server, use_ssl=self.use_ssl, get_info=ldap3.NONE)
+        if self.user:
+            return ldap3.Connection(server, user=self.user, password=self.password, auto_bind=True)
+        # Без учетных данных - вход текущего пользователя Windows (Kerberos)
+        return ldap3.Connection(server, authentication=ldap3.SASL, sasl_mechanism=ldap3.KERBEROS, auto_bind=True)
+    
+    def search_filter(self, since=None):
+        """LDAP-фильтр пользователей; since - отметка whenChanged в TIMESTAMP_FORMAT"""
+        user_filter = "(objectCategory=person)(objectClass=user)"
+        if since:
+            changed = datetime.strptime(since, TIMESTAMP_FORMAT).strftime("%Y%m%d%H%M%S.0Z")
+            user_filter += f"(whenChanged>={changed})"
+        return f"(&{user_filter})"
+    
+    def _search(self, attributes, since=None):
+        """Постраничный поиск пользователей: (DN, атрибуты) по одной записи"""
+        connection = self.connection or self._connect()
+        try:
+            entries = connection.extend.standard.paged_search(
+                search_base=self.base_dn,
+                search_filter=self.search_filter(since),
+                attributes=attributes,
+                paged_size=self.page_size,
+                generator=True
+            )
+            for entry in entries:
+                if entry.get('type') != 'searchResEntry':
+                    continue
+                values = entry['attributes']
+                # Без схемы ldap3 декодирует значения, похожие на UTF-8, в строку - двоичный GUID берется как есть
+                raw_guid = entry.get('raw_attributes', {}).get('objectGUID')
+                if raw_guid:
+                    values = dict(values, objectGUID=raw_guid)
+                yield entry['dn'], values
+        finally:
+            if self.connection is None:
+                connection.unbind()
+    
+    def iter_users(self, since=None, on_count=None):
+        for dn, attributes in self._search(LDAP_ATTRIBUTES, since):
+            yield ldap_entry_to_user(dn, attributes)
+    
+    def iter_guids(self):
+        for _, attributes in self._search(['objectGUID']):
+            guid = _format_guid(attributes.get('objectGUID'))
+            if guid:
+                yield guid
+
+def _first(value):
+    """Первое значение атрибута (ldap3 возвращает список для многозначных атрибутов)"""
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else None
+    return value
+
+def _format_guid(value):
+    """objectGUID в виде, который отдает PowerShell (без фигурных скобок, нижний регистр)"""
+    value = _first(value)
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return str(uuid.UUID(bytes_le=value))
+    return str(value).strip('{}').lower()
+
+def _format_when_changed(value):
+    """whenChanged в TIMESTAMP_FORMAT (UTC)"""
+    value = _first(value)
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.utcoffset() is not None:
+            value = value - value.utcoffset()
+        return value.strftime(TIMESTAMP_FORMAT)
+    # Generalized Time без схемы: 20261017100000.0Z
+    return datetime.strptime(str(value)[:14], "%Y%m%d%H%M%S").strftime(TIMESTAMP_FORMAT)
+
+def ldap_entry_to_user(dn, attributes):
+    """Преобразование записи LDAP в формат PowerShell-выгрузки"""
+    uac = _first(attributes.get('userAccountControl')) or 0
+    return {
+        'Name': _first(attributes.get('name')),
+        'SamAccountName': _first(attributes.get('sAMAccountName')),
+        'Enabled': not (int(uac) & ACCOUNTDISABLE),
+        'EmailAddress': _first(attributes.get('mail')),
+        'Company': _first(attributes.get('company')),
+        'DistinguishedName': dn,
+        'ObjectGUID': _format_guid(attributes.get('objectGUID')),
+        'whenChanged': _format_when_changed(attributes.get('whenChanged'))
+    }
+
+# Доступные источники: имя в config.AD_BACKEND -> класс
+DIRECTORY_SOURCES = {
+    PowerShellSource.name: PowerShellSource,
+    LdapSource.name: LdapSource
+}
+
+def get_directory_source(backend=None, **kwargs):
+    """Источник пользователей по имени (по умолчанию config.AD_BACKEND)"""
+    backend = backend or AD_BACKEND
+    if backend not in DIRECTORY_SOURCES:
+        raise ValueError(f"Неизвестный источник AD: {backend}. Доступны: {', '.join(DIRECTORY_SOURCES)}")
+    return DIRECTORY_SOURCES[backend](**kwargs)
\ No newline at end of file
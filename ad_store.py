@@ -0,0 +1,162 @@
+# ad_store.py
+import uuid
+from array import array
+
+def compact_key(key):
+    """Ключ записи: ObjectGUID хранится как 16 байт, остальные ключи - строкой"""
+    try:
+        return uuid.UUID(key).bytes
+    except (ValueError, TypeError, AttributeError):
+        return key
+
+def _key_text(key):
+    return str(uuid.UUID(bytes=key)) if isinstance(key, bytes) else key
+
+class ValueTable:
+    """Интернированные повторяющиеся значения (Company, родительский OU): значение <-> код"""
+    
+    def __init__(self, values=None):
+        self.values = list(values or [])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+    
+    def code(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+class ADUserStore:
+    """Компактное хранилище пользователей AD: столбцы вместо словаря на каждого пользователя.
+
+    Enabled хранится байтом, Company - кодом в таблице значений, DistinguishedName -
+    кодом родительского контейнера, если DN имеет вид "CN=<Name>,<родитель>"
+    (иначе строкой в dn_custom). ObjectGUID и whenChanged в выгрузку не попадают:
+    GUID служит ключом (16 байт), whenChanged нужен только для отметки синхронизации.
+    """
+    
+    def __init__(self):
+        self.index = {}  # Ключ -> номер строки
+        self.keys = []
+        self.names = []
+        self.sam_names = []
+        self.emails = []
+        self.enabled = bytearray()
+        self.companies = array('I')
+        self.company_table = ValueTable()
+        self.dn_parents = array('I')
+        self.parent_table = ValueTable([None])  # Код 0 - DN не разобран, полный DN в dn_custom
+        self.dn_custom = {}  # Номер строки -> DistinguishedName
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def __contains__(self, key):
+        return compact_key(key) in self.index
+    
+    def _set_dn(self, row, name, dn):
+        prefix = f"CN={name},"
+        if name and dn and dn.startswith(prefix):
+            self.dn_custom.pop(row, None)
+            return self.parent_table.code(dn[len(prefix):])
+        self.dn_custom[row] = dn
+        return 0
+    
+    def upsert(self, key, user):
+        """Добавление или обновление записи; True, если запись новая"""
+        key = compact_key(key)
+        row = self.index.get(key)
+        name = user.get('Name')
+        company = self.company_table.code(user.get('Company'))
+        enabled = 1 if user.get('Enabled') else 0
+        
+        if row is None:
+            row = self.index[key] = len(self.keys)
+            self.keys.append(key)
+            self.names.append(name)
+            self.sam_names.append(user.get('SamAccountName'))
+            self.emails.append(user.get('EmailAddress'))
+            self.enabled.append(enabled)
+            self.companies.append(company)
+            self.dn_parents.append(self._set_dn(row, name, user.get('DistinguishedName')))
+            return True
+        
+        self.names[row] = name
+        self.sam_names[row] = user.get('SamAccountName')
+        self.emails[row] = user.get('EmailAddress')
+        self.enabled[row] = enabled
+        self.companies[row] = company
+        self.dn_parents[row] = self._set_dn(row, name, user.get('DistinguishedName'))
+        return False
+    
+    def retain(self, keys):
+        """Удаление записей, ключей которых нет в keys (компактные ключи); возвращает число удаленных.
+        
+        Записи без ObjectGUID (ключ - строка) по списку GUID не проверяются и остаются.
+        """
+        keep = [row for row, key in enumerate(self.keys) if key in keys or not isinstance(key, bytes)]
+        removed = len(self.keys) - len(keep)
+        if removed:
+            self.keys = [self.keys[row] for row in keep]
+            self.index = {key: row for row, key in enumerate(self.keys)}
+            self.names = [self.names[row] for row in keep]
+            self.sam_names = [self.sam_names[row] for row in keep]
+            self.emails = [self.emails[row] for row in keep]
+            self.enabled = bytearray(self.enabled[row] for row in keep)
+            self.companies = array('I', (self.companies[row] for row in keep))
+            self.dn_parents = array('I', (self.dn_parents[row] for row in keep))
+            self.dn_custom = {new: self.dn_custom[old] for new, old in enumerate(keep) if old in self.dn_custom}
+        return removed
+    
+    def distinguished_name(self, row):
+        parent = self.dn_parents[row]
+        if parent == 0:
+            return self.dn_custom.get(row)
+        return f"CN={self.names[row]},{self.parent_table.values[parent]}"
+    
+    def record(self, row):
+        """Запись в виде словаря полей выгрузки (создается на время обработки)"""
+        return {
+            'Name': self.names[row],
+            'SamAccountName': self.sam_names[row],
+            'Enabled': bool(self.enabled[row]),
+            'EmailAddress': self.emails[row],
+            'Company': self.company_table.values[self.companies[row]],
+            'DistinguishedName': self.distinguished_name(row),
+        }
+    
+    def records(self):
+        """Все записи по одной (словари не накапливаются)"""
+        for row in range(len(self.keys)):
+            yield self.record(row)
+    
+    def to_json(self):
+        """Столбцы для сохранения в снимок"""
+        return {
+            'keys': [_key_text(key) for key in self.keys],
+            'names': self.names,
+            'sam_names': self.sam_names,
+            'emails': self.emails,
+            'enabled': list(self.enabled),
+            'companies': self.company_table.values,
+            'company_codes': self.companies.tolist(),
+            'dn_parents': self.parent_table.values,
+            'dn_parent_codes': self.dn_parents.tolist(),
+            'dn_custom': {str(row): dn for row, dn in self.dn_custom.items()},
+        }
+    
+    @classmethod
+    def from_json(cls, data):
+        store = cls()
+        store.keys = [compact_key(key) for key in data['keys']]
+        store.index = {key: row for row, key in enumerate(store.keys)}
+        store.names = data['names']
+        store.sam_names = data['sam_names']
+        store.emails = data['emails']
+        store.enabled = bytearray(data['enabled'])
+        store.company_table = ValueTable(data['companies'])
+        store.companies = array('I', data['company_codes'])
+        store.parent_table = ValueTable(data['dn_parents'])
+        store.dn_parents = array('I', data['dn_parent_codes'])
+        store.dn_custom = {int(row): dn for row, dn in data['dn_custom'].items()}
+        return store
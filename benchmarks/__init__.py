@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# Пустой файл для создания пакета
\ No newline at end of file
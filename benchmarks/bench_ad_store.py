@@ -0,0 +1,84 @@
+# benchmarks/bench_ad_store.py
+"""Память на пользователя AD: словарь записей (старый снимок) против ADUserStore.
+
+Записи создаются так же, как при разборе вывода PowerShell (json.loads на строку),
+поэтому строки не разделяются между пользователями, как и в реальной выгрузке.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_ad_store [количество_пользователей]
+"""
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from ad_store import ADUserStore
+from ad_snapshot import user_key
+
+COMPANIES = ['ООО Ромашка', 'АО Лютик', 'ООО Василек', None]
+CONTAINERS = [
+    'OU=CU_Users,DC=corp,DC=local',
+    'OU=Бухгалтерия,OU=CU_Users,DC=corp,DC=local',
+    'OU=ГПХ,OU=External_Organizations,DC=corp,DC=local',
+]
+
+def synthetic_lines(count, seed=7):
+    """Строки вывода PowerShell: сжатый JSON одного пользователя"""
+    for i in range(count):
+        name = f"Фамилия{i} Имя{i % 97} Отчество{i % 13}"
+        user = {
+            'Name': name,
+            'SamAccountName': f"user{i}",
+            'Enabled': i % 10 != 0,
+            'EmailAddress': f"user{i}@corp.local",
+            'Company': COMPANIES[i % len(COMPANIES)],
+            'DistinguishedName': f"CN={name},{CONTAINERS[i % len(CONTAINERS)]}",
+            'ObjectGUID': str(uuid.UUID(int=seed * 10**12 + i)),
+            'whenChanged': f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:00:00Z",
+        }
+        yield json.dumps(user, ensure_ascii=False)
+
+def build_dicts(lines):
+    """Старый снимок: ключ -> исходный словарь пользователя"""
+    users = {}
+    for line in lines:
+        user = json.loads(line)
+        users[user_key(user)] = user
+    return users
+
+def build_store(lines):
+    store = ADUserStore()
+    for line in lines:
+        user = json.loads(line)
+        store.upsert(user_key(user), user)
+    return store
+
+def measure(builder, count):
+    """Время построения и память, которую занимает результат"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(synthetic_lines(count))
+    elapsed = time.perf_counter() - start
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained
+
+def main(count=500000):
+    users, dict_time, dict_memory = measure(build_dicts, count)
+    del users
+    store, store_time, store_memory = measure(build_store, count)
+    
+    # Хранилище отдает те же поля выгрузки
+    first = json.loads(next(synthetic_lines(1)))
+    record = store.record(0)
+    assert all(record[field] == first[field] for field in record)
+    
+    print(f"Пользователей: {count}")
+    print(f"Словари:     {dict_time:.1f} с, {dict_memory / 2**20:.0f} МБ, {dict_memory / count:.0f} байт/польз.")
+    print(f"ADUserStore: {store_time:.1f} с, {store_memory / 2**20:.0f} МБ, {store_memory / count:.0f} байт/польз.")
+    print(f"Экономия памяти: {dict_memory / store_memory:.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500000)
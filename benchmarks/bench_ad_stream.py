@@ -0,0 +1,172 @@
+# benchmarks/bench_ad_stream.py
+"""Потоковый разбор выгрузки AD на синтетическом выводе PowerShell.
+
+Проверяет, что:
+- сжатые, многострочные и разорванные на строки JSON-документы разбираются
+  так же, как прежним разбором (склейка строк до пустой строки);
+- каждый выходной файл получает нужных пользователей (сотрудники, ГПХ, полная выгрузка);
+- пиковая память не растет вместе с количеством пользователей.
+Печатает скорость обработки в записях в секунду.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_ad_stream [количество_пользователей ...]
+"""
+import json
+import logging
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from ad_sources import iter_json_records
+from ad_export import write_users_stream, REQUIRED_FIELDS
+from ad_sinks import get_output_sinks
+
+# Пользователей в проверке разбора разных видов JSON
+DECODE_CHECK_USERS = 3000
+# Эталон пиковой памяти: поток, которого хватает, чтобы заполнить очереди пачек всех файлов
+REFERENCE_USERS = 10000
+# Во сколько раз пик памяти может превышать эталон (пачки и буферы файлов постоянны)
+MAX_PEAK_GROWTH = 1.5
+
+def synthetic_user(i):
+    """Пользователь i: каждый третий - ГПХ, каждый десятый заблокирован"""
+    if i % 3 == 0:
+        dn = f"CN=User{i},OU=ГПХ,OU=External_Organizations,DC=corp,DC=local"
+    else:
+        dn = f"CN=User{i},OU=CU_Users,DC=corp,DC=local"
+    return {
+        'Name': f"Фамилия{i} Имя{i % 97} Отчество",
+        'SamAccountName': f"user{i}",
+        'Enabled': i % 10 != 0,
+        'EmailAddress': f"user{i}@corp.local",
+        'Company': f"Компания {i % 5}",
+        'DistinguishedName': dn
+    }
+
+def expected_category(i):
+    """Категория пользователя i по правилам AD_DN_RULES по умолчанию"""
+    if i % 10 == 0:
+        return None
+    return 'gph' if i % 3 == 0 else 'employee'
+
+def synthetic_powershell_output(count, mixed=False):
+    """Вывод PowerShell: JSON-документ и пустая строка-разделитель на пользователя.
+
+    По умолчанию документы сжатые (одна строка); mixed - по очереди сжатые,
+    многострочные (ConvertTo-Json без -Compress) и разорванные на две строки.
+    """
+    yield f"Найдено пользователей: {count}\n"
+    for i in range(count):
+        user = synthetic_user(i)
+        layout = i % 3 if mixed else 0
+        if layout == 1:
+            yield from (line + "\n" for line in json.dumps(user, ensure_ascii=False, indent=4).split("\n"))
+        else:
+            text = json.dumps(user, ensure_ascii=False)
+            if layout == 2:
+                split = text.index(', ') + 1
+                yield text[:split] + "\n"
+                yield text[split:] + "\n"
+            else:
+                yield text + "\n"
+        yield "\n"
+
+def legacy_records(lines):
+    """Прежний разбор: строки склеиваются до пустой строки и декодируются целиком"""
+    current_json = ""
+    for line in lines:
+        if "Найдено пользователей:" in line:
+            continue
+        if line.strip() == "":
+            if current_json:
+                try:
+                    yield json.loads(current_json)
+                except json.JSONDecodeError:
+                    logging.warning(f"Ошибка декодирования JSON: {current_json}")
+                current_json = ""
+            continue
+        current_json += line
+    if current_json:
+        yield json.loads(current_json)
+
+def check_decoding(count=DECODE_CHECK_USERS):
+    """Потоковый разбор сжатых, многострочных и разорванных документов совпадает с прежним"""
+    counts = []
+    records = list(iter_json_records(synthetic_powershell_output(count, mixed=True), on_count=counts.append))
+    assert counts == [count], counts
+    assert records == list(legacy_records(synthetic_powershell_output(count, mixed=True)))
+    assert records == [synthetic_user(i) for i in range(count)]
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read().split("\n")
+
+def check_sinks(count, files):
+    """Количество строк и выборочные записи каждого выходного файла"""
+    employees = [i for i in range(count) if expected_category(i) == 'employee']
+    gph = [i for i in range(count) if expected_category(i) == 'gph']
+
+    # Файлы сверки: "Name: ...", "Status: ..." и пустая строка на пользователя
+    for name, numbers in (('employees', employees), ('gph', gph)):
+        lines = read_lines(files[name])
+        assert len(lines) == 3 * len(numbers) + 1, (name, len(lines))
+        for position in (0, len(numbers) // 2, len(numbers) - 1):
+            i = numbers[position]
+            assert lines[3 * position:3 * position + 3] == [
+                f"Name: {synthetic_user(i)['Name']}", "Status: Активна", ""
+            ], (name, i)
+
+    # Полная выгрузка: разделитель, поля пользователя и пустая строка на каждого, включая заблокированных
+    lines = read_lines(files['txt'])
+    block = len(REQUIRED_FIELDS) + 2
+    assert len(lines) == block * count + 1, len(lines)
+    for i in (0, count // 2, count - 1):
+        user = synthetic_user(i)
+        assert lines[block * i:block * (i + 1)] == ["=" * 80] + [
+            f"{field}: {'Активна' if user[field] else 'Заблокирована'}" if field == 'Enabled' else f"{field}: {user[field]}"
+            for field in REQUIRED_FIELDS
+        ] + [""], i
+
+def run(count, directory):
+    """Разбор и запись count пользователей; возвращает время, пик памяти и счетчики"""
+    directory = Path(directory)
+    files = {
+        'txt': directory / 'ad_users_export.txt',
+        'employees': directory / 'сотрудники.txt',
+        'gph': directory / 'ГПХ.txt'
+    }
+    tracemalloc.start()
+    start = time.perf_counter()
+    sinks = get_output_sinks(files, REQUIRED_FIELDS, enabled=['txt', 'employees', 'gph'])
+    counts = write_users_stream(iter_json_records(synthetic_powershell_output(count)), sinks)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    check_sinks(count, files)
+    return elapsed, peak, counts
+
+def main(sizes):
+    check_decoding()
+    print(f"Разбор {DECODE_CHECK_USERS} сжатых, многострочных и разорванных JSON совпадает с прежним")
+
+    peaks = {}
+    with tempfile.TemporaryDirectory() as directory:
+        _, reference_peak, _ = run(REFERENCE_USERS, directory)
+        for count in sizes:
+            elapsed, peak, (total, employees, gph) = run(count, directory)
+            assert (total, employees, gph) == (
+                count,
+                sum(expected_category(i) == 'employee' for i in range(count)),
+                sum(expected_category(i) == 'gph' for i in range(count))
+            ), (total, employees, gph)
+            peaks[count] = peak
+            print(f"{count:>8} польз.: {elapsed:.2f} с, {count / elapsed:,.0f} польз./с, "
+                  f"пик памяти {peak / 1024:.0f} КБ (сотрудники {employees}, ГПХ {gph})")
+
+    # Память не зависит от размера потока
+    limit = reference_peak * MAX_PEAK_GROWTH
+    assert max(peaks.values()) <= limit, f"Пик памяти растет с размером потока: {peaks}, предел {limit:.0f}"
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,90 @@
+# benchmarks/bench_delta.py
+"""Отчет изменений против полного отчета: время сравнения снимков и размер файлов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_delta [пользователей ...]
+"""
+import gzip
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from report_writer import ReportWriter
+from run_history import keyed_rows, run_settings, run_snapshot, diff_runs, write_delta_report, DELTA_SHEETS
+from source_registry import SERVICES
+
+SHEETS = {
+    'kontur': {
+        'title': 'Контур',
+        'fio_col': 'Контур_ФИО',
+        'status_col': 'Контур_статус',
+        'remove_sheet': 'удалить из Контура',
+        'duplicates_sheet': 'дубли в Контуре'
+    }
+}
+
+def make_run(users, shift):
+    """Результаты запуска: пятая часть пользователей на удаление, 1% списка сменился с прошлого раза"""
+    names = [f"Фамилия{n} Имя{n % 300} Отчество" for n in range(shift, shift + users)]
+    remove = pd.DataFrame({'Контур_ФИО': names[::5], 'Контур_статус': 'активна'})
+    duplicates = pd.DataFrame({'Контур_ФИО': names[::500] * 2})
+    return names, remove, duplicates
+
+def check_delta_sheets(filename, changes):
+    """Лист на каждый непустой вид изменений (новые и ушедшие на удаление, новые и устраненные дубли)"""
+    service = SHEETS['kontur']
+    expected = {
+        prefix + (service['remove_sheet'] if status else service['duplicates_sheet']): len(changes[key])
+        for key, prefix, status in DELTA_SHEETS if changes[key]
+    }
+    assert len(expected) == len(DELTA_SHEETS), {key: len(changes[key]) for key, *_ in DELTA_SHEETS}
+    sheets = pd.read_excel(filename, sheet_name=list(expected))
+    assert {sheet_name: len(df) for sheet_name, df in sheets.items()} == expected
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as directory:
+        directory = Path(directory)
+        for users in sizes:
+            snapshots = []
+            for shift in (0, users // 100):
+                names, remove, duplicates = make_run(users, shift)
+                snapshots.append(run_snapshot({'kontur': {
+                    'remove': keyed_rows(remove, 'Контур_ФИО', 'Контур_статус'),
+                    'duplicates': keyed_rows(duplicates, 'Контур_ФИО')
+                }}, run_settings({0}, {0}, SERVICES)))
+            
+            start = time.perf_counter()
+            delta = diff_runs(*snapshots)
+            diff_seconds = time.perf_counter() - start
+            
+            snapshot_file = directory / "снимок.json.gz"
+            with gzip.open(snapshot_file, 'wt', encoding='utf-8') as f:
+                json.dump(snapshots[1], f, ensure_ascii=False, separators=(',', ':'))
+            
+            full_file = directory / "полный.xlsx"
+            report = ReportWriter()
+            report.add_sheet('сравнение пользователей', pd.DataFrame({'Контур_ФИО': names}))
+            report.add_sheet('удалить из Контура', remove)
+            report.add_sheet('дубли в Контуре', duplicates)
+            start = time.perf_counter()
+            report.save(full_file)
+            full_seconds = time.perf_counter() - start
+            
+            delta_file = directory / "изменения.xlsx"
+            start = time.perf_counter()
+            write_delta_report(delta, SHEETS, snapshots[0]['time'], delta_file)
+            delta_seconds = time.perf_counter() - start
+            check_delta_sheets(delta_file, delta['kontur'])
+            
+            full_size = full_file.stat().st_size
+            delta_size = delta_file.stat().st_size
+            print(f"{users:>8} пользователей: сравнение снимков {diff_seconds * 1000:.1f} мс, "
+                  f"снимок {snapshot_file.stat().st_size / 1024:.0f} КБ; "
+                  f"полный отчет {full_size / 1024:.0f} КБ за {full_seconds:.2f} с, "
+                  f"отчет изменений {delta_size / 1024:.0f} КБ за {delta_seconds:.2f} с "
+                  f"({full_size / delta_size:.0f}x меньше)")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000])
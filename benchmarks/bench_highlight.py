@@ -0,0 +1,63 @@
+# benchmarks/bench_highlight.py
+"""Подсветка в отчете: прежняя схема (to_excel, load_workbook и заливка по ячейкам)
+против масок подсветки при единственной записи и записи без подсветки.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_highlight [количество_строк ...]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import PatternFill
+from report_writer import ReportWriter
+from utils import normalize_name, highlight_duplicates, reset_name_cache
+
+def make_sheet(rows):
+    """Лист с ФИО, в котором каждое двадцатое ФИО повторяется"""
+    names = [f"Фамилия{n % (rows - rows // 20)} Имя{n % 50} Отчество" for n in range(rows)]
+    df = pd.DataFrame({'ФИО': names, 'Статус': 'Да', 'Администратор': 'нет'})
+    keys = pd.Series(names).map(normalize_name)
+    return df, set(keys[keys.duplicated()])
+
+def write_reloading(filename, df, duplicates):
+    """Прежняя схема: запись, повторное открытие книги и заливка строк по одной"""
+    fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
+    df.to_excel(filename, sheet_name='лист', index=False)
+    workbook = load_workbook(filename)
+    worksheet = workbook['лист']
+    for position, (_, row) in enumerate(df.iterrows(), 2):
+        if normalize_name(row['ФИО']) in duplicates:
+            worksheet.cell(row=position, column=1).fill = fill
+    workbook.save(filename)
+
+def write_highlighted(filename, df, duplicates):
+    """Маска подсветки считается по столбцу, заливка - при единственной записи"""
+    reset_name_cache()
+    report = ReportWriter()
+    report.add_sheet('лист', df, [highlight_duplicates(df, 'ФИО', duplicates)])
+    report.save(filename)
+
+def write_plain(filename, df, duplicates):
+    """Та же запись без подсветки"""
+    report = ReportWriter()
+    report.add_sheet('лист', df)
+    report.save(filename)
+
+def main(sizes):
+    writers = [('перезагрузка', write_reloading), ('маски', write_highlighted), ('без подсветки', write_plain)]
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            df, duplicates = make_sheet(rows)
+            timings = {}
+            for name, writer in writers:
+                start = time.perf_counter()
+                writer(Path(directory) / f"{name}.xlsx", df, duplicates)
+                timings[name] = time.perf_counter() - start
+            print(f"{rows:>8} строк: " + ", ".join(f"{name} {seconds:.2f} с" for name, seconds in timings.items())
+                  + f" (маски быстрее перезагрузки в {timings['перезагрузка'] / timings['маски']:.1f}x)")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 50000])
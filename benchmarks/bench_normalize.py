@@ -0,0 +1,60 @@
+# benchmarks/bench_normalize.py
+"""Сравнение построчной (normalize_name через apply) и векторной нормализации ФИО.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_normalize [количество_строк]
+"""
+import random
+import sys
+import time
+import pandas as pd
+from utils import normalize_name, normalize_names, normalized_column, reset_name_cache
+
+SURNAMES = ['Иванов', 'Петров', 'Сидоров', 'Ёлкин', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов']
+NAMES = ['Иван', 'Пётр', 'Алексей', 'Сергей', 'Андрей', 'Дмитрий', 'Артём', 'Олег']
+PATRONYMICS = ['Иванович', 'Петрович', 'Сергеевич', 'Алексеевич', '']
+
+def make_names(count, seed=42):
+    """Генерация случайных ФИО, включая пропуски и лишние пробелы"""
+    rnd = random.Random(seed)
+    result = []
+    for _ in range(count):
+        if rnd.random() < 0.01:
+            result.append(None)
+            continue
+        result.append(f" {rnd.choice(SURNAMES)}  {rnd.choice(NAMES)} {rnd.choice(PATRONYMICS)}")
+    return pd.Series(result, dtype=object)
+
+def measure(func, repeat=3):
+    """Лучшее время из нескольких запусков"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main(count=100000):
+    series = make_names(count)
+    df = pd.DataFrame({'ФИО': series})
+    
+    assert series.apply(normalize_name).tolist() == normalize_names(series).tolist()
+    
+    # Старый путь: каждый из ~7 вызовов нормализует столбец заново
+    per_cell = measure(lambda: [series.apply(normalize_name) for _ in range(7)])
+    
+    def vectorized_cached():
+        reset_name_cache()
+        for _ in range(7):
+            normalized_column(df, 'ФИО')
+    
+    vectorized = measure(vectorized_cached)
+    
+    print(f"Строк: {count}")
+    print(f"Построчно (apply x7):       {per_cell:.3f} с")
+    print(f"Векторно с кэшем (x7):      {vectorized:.3f} с")
+    print(f"Ускорение:                  {per_cell / vectorized:.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,39 @@
+# benchmarks/bench_report_formats.py
+"""Запись отчета в разных форматах: время и размер файлов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_report_formats [количество_строк ...]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+from report_writer import ReportWriter, SHEET_FORMATS, parquet_available
+from benchmarks.bench_report_writer import make_sheets
+
+def size_of(path):
+    """Размер файла или всех файлов каталога"""
+    if path.is_dir():
+        return sum(child.stat().st_size for child in path.iterdir())
+    return path.stat().st_size
+
+def main(sizes):
+    formats = ['xlsx', *[fmt for fmt in SHEET_FORMATS if fmt != 'parquet' or parquet_available()]]
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            main_df, comparison, extra = make_sheets(rows)
+            report = ReportWriter()
+            report.add_sheet('сравнение пользователей', main_df)
+            report.add_sheet('сравнение AD и Штатки', comparison)
+            for sheet_name, df in extra.items():
+                report.add_sheet(sheet_name, df)
+            
+            timings = []
+            for fmt in formats:
+                start = time.perf_counter()
+                paths = report.save(Path(directory) / f"{fmt}_{rows}.xlsx", [fmt])
+                timings.append(f"{fmt} {time.perf_counter() - start:.2f} с / {size_of(paths[0]) / 1024 / 1024:.1f} МБ")
+            print(f"{rows:>8} строк: " + ", ".join(timings))
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 50000])
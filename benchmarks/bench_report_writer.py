@@ -0,0 +1,53 @@
+# benchmarks/bench_report_writer.py
+"""Запись отчета: прежняя схема (to_excel + два дозаписывания mode='a') против ReportWriter.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_report_writer [количество_строк ...]
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+import pandas as pd
+from report_writer import ReportWriter
+
+def make_sheets(rows):
+    """Основной лист и несколько листов результатов, как в отчете"""
+    main = pd.DataFrame({f"Столбец_{i}": [f"Фамилия{n} Имя{n % 50}" for n in range(rows)] for i in range(13)})
+    part = pd.DataFrame({'ФИО': [f"Фамилия{n} Имя" for n in range(rows // 10)], 'Статус': 'Да'})
+    extra = {f"лист {i}": part for i in range(6)}
+    return main, part, extra
+
+def write_appending(filename, main, comparison, extra):
+    """Прежняя схема: книга перечитывается и пересохраняется при каждом дозаписывании"""
+    main.to_excel(filename, sheet_name='сравнение пользователей', index=False)
+    with pd.ExcelWriter(filename, engine='openpyxl', mode='a') as writer:
+        comparison.to_excel(writer, sheet_name='сравнение AD и Штатки', index=False)
+    with pd.ExcelWriter(filename, engine='openpyxl', mode='a') as writer:
+        for sheet_name, df in extra.items():
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+def write_single_pass(filename, main, comparison, extra):
+    """Один потоковый проход"""
+    report = ReportWriter()
+    report.add_sheet('сравнение пользователей', main)
+    report.add_sheet('сравнение AD и Штатки', comparison)
+    for sheet_name, df in extra.items():
+        report.add_sheet(sheet_name, df)
+    report.save(filename)
+
+def main(sizes):
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in sizes:
+            main_df, comparison, extra = make_sheets(rows)
+            timings = {}
+            for name, writer in [('дозапись', write_appending), ('один проход', write_single_pass)]:
+                start = time.perf_counter()
+                writer(Path(directory) / f"{name}.xlsx", main_df, comparison, extra)
+                timings[name] = time.perf_counter() - start
+            print(f"{rows:>8} строк: дозапись {timings['дозапись']:.2f} с, "
+                  f"один проход {timings['один проход']:.2f} с "
+                  f"({timings['дозапись'] / timings['один проход']:.1f}x)")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,118 @@
+# benchmarks/bench_scaling.py
+"""Масштабирование сверки на синтетических данных: 10k / 100k / 1M пользователей.
+
+Для каждого масштаба генерируется набор входных файлов (benchmarks.synthetic_data),
+затем в отдельном процессе (USERS_CLEANER_BASE_DIR указывает на набор) выполняются
+process_excel_data и функции сравнения. Фиксируются время и пиковая память;
+результаты печатаются таблицей и сохраняются в вывод/bench_scaling_<время>.json,
+чтобы сравнивать запуски между собой.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_scaling [масштаб ...]
+    python -m benchmarks.bench_scaling 10000 100000 1000000
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.synthetic_data import generate
+
+DEFAULT_SCALES = [10000, 100000]
+RESULT_MARKER = "BENCH_RESULT "
+
+try:
+    import resource  # Есть только на Unix
+except ImportError:
+    resource = None
+
+def max_rss_mb():
+    """Пиковый RSS текущего процесса в МБ (None, если недоступен)"""
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def timed(func):
+    """Результат и время одного вызова"""
+    start = time.perf_counter()
+    result = func()
+    return result, round(time.perf_counter() - start, 3)
+
+def run_worker():
+    """Замеры внутри процесса, для которого config указывает на синтетический набор"""
+    import pandas as pd
+    from config import EMPLOYEES_FILE, GPH_FILE
+    from excel_processor import process_excel_data, read_names_and_statuses_from_file
+    from source_registry import SERVICES, load_source
+    from utils import reset_name_cache, find_duplicates, find_internal_duplicates, find_users_to_remove
+    
+    metrics = {}
+    # Полный прогон: разбор файлов (кэш пуст), сравнение и запись отчета
+    _, metrics['process_excel_data_s'] = timed(lambda: process_excel_data({0}, {0}))
+    metrics['process_excel_data_rss_mb'] = max_rss_mb()
+    
+    # Функции сравнения по отдельности (файлы уже в кэше входных данных)
+    names = read_names_and_statuses_from_file(EMPLOYEES_FILE)[0] + read_names_and_statuses_from_file(GPH_FILE)[0]
+    ad_df = pd.DataFrame({'AD_ФИО': names})
+    for name in ('onec', 'kontur', 'diadoc'):
+        spec = SERVICES[name]
+        fio_col = spec['fio_col']
+        status_rule = (spec['status_col'], spec['active_value'])
+        reset_name_cache()
+        data = load_source(name)[[fio_col, spec['status_col']]].dropna(subset=[fio_col])
+        _, metrics[f'{name}_find_duplicates_s'] = timed(lambda: find_duplicates(ad_df, data, 'AD_ФИО', fio_col))
+        _, metrics[f'{name}_find_internal_duplicates_s'] = timed(lambda: find_internal_duplicates(data, fio_col))
+        _, metrics[f'{name}_find_users_to_remove_s'] = timed(lambda: find_users_to_remove(data, ad_df, ad_df, status_rule))
+    metrics['max_rss_mb'] = max_rss_mb()
+    
+    print(RESULT_MARKER + json.dumps(metrics))
+
+def run_scale(users):
+    """Генерация набора и замер в отдельном процессе"""
+    with tempfile.TemporaryDirectory() as directory:
+        counts, generate_s = timed(lambda: generate(directory, users))
+        env = dict(os.environ, USERS_CLEANER_BASE_DIR=directory)
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_scaling', '--worker'],
+            env=env, capture_output=True, text=True, encoding='utf-8'
+        )
+        for line in completed.stdout.splitlines():
+            if line.startswith(RESULT_MARKER):
+                metrics = json.loads(line[len(RESULT_MARKER):])
+                break
+        else:
+            raise RuntimeError(f"Замер для {users} пользователей завершился с ошибкой:\n{completed.stderr}")
+    
+    return {'users': users, 'rows': counts, 'generate_s': generate_s, **metrics}
+
+def main(scales):
+    from config import OUTPUT_DIR, ensure_directories
+    
+    ensure_directories()
+    
+    results = []
+    for users in scales:
+        print(f"Масштаб {users} пользователей...")
+        results.append(run_scale(users))
+    
+    print(f"{'Пользователей':>14} {'Обработка, с':>13} {'RSS, МБ':>9} {'Сравнение 1С/Контур/Диадок, с':>31}")
+    for result in results:
+        comparison = "/".join(
+            f"{sum(result[f'{name}_{func}_s'] for func in ('find_duplicates', 'find_internal_duplicates', 'find_users_to_remove')):.2f}"
+            for name in ('onec', 'kontur', 'diadoc')
+        )
+        print(f"{result['users']:>14} {result['process_excel_data_s']:>13.2f} "
+              f"{result['max_rss_mb'] or 0:>9.1f} {comparison:>31}")
+    
+    filename = OUTPUT_DIR / f"bench_scaling_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Результаты сохранены в {filename}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--worker']:
+        run_worker()
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SCALES)
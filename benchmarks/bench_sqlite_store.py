@@ -0,0 +1,57 @@
+# benchmarks/bench_sqlite_store.py
+"""Хранилище сверки SQLite против сверки в памяти: время и пиковая память.
+
+Для каждого масштаба генерируется набор входных файлов (benchmarks.synthetic_data),
+затем в отдельных процессах выполняется полный прогон process_excel_data:
+бэкенд pandas, SQLite с пустой базой (таблицы загружаются) и SQLite повторно
+(входные файлы не менялись - таблицы переиспользуются).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_sqlite_store [масштаб ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from benchmarks.synthetic_data import generate
+from benchmarks.bench_scaling import max_rss_mb, timed
+
+DEFAULT_SCALES = [10000, 100000]
+RESULT_MARKER = "BENCH_RESULT "
+# Прогоны: (название, бэкенд)
+RUNS = [('pandas', 'pandas'), ('sqlite, загрузка', 'sqlite'), ('sqlite, повторно', 'sqlite')]
+
+def run_worker():
+    """Один прогон в процессе, для которого config указывает на синтетический набор"""
+    from excel_processor import process_excel_data
+
+    _, seconds = timed(lambda: process_excel_data({0}, {0}))
+    print(RESULT_MARKER + json.dumps({'seconds': seconds, 'max_rss_mb': max_rss_mb()}))
+
+def run_once(directory, backend):
+    """Прогон в отдельном процессе (пиковая память не смешивается между прогонами)"""
+    env = dict(os.environ, USERS_CLEANER_BASE_DIR=directory, USERS_CLEANER_BACKEND=backend)
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.bench_sqlite_store', '--worker'],
+        env=env, capture_output=True, text=True, encoding='utf-8'
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"Прогон {backend} завершился с ошибкой:\n{completed.stderr}")
+
+def main(scales):
+    print(f"{'Пользователей':>14} {'Прогон':>18} {'Время, с':>9} {'RSS, МБ':>9}")
+    for users in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            generate(directory, users)
+            for title, backend in RUNS:
+                result = run_once(directory, backend)
+                print(f"{users:>14} {title:>18} {result['seconds']:>9.2f} {result['max_rss_mb'] or 0:>9.1f}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--worker']:
+        run_worker()
+    else:
+        main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SCALES)
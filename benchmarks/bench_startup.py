@@ -0,0 +1,65 @@
+# benchmarks/bench_startup.py
+"""Холодный старт: время импорта модулей (python -X importtime) и запуска main.py --help.
+
+Для сравнения замеряется и импорт всего, что нужно обработке (main, excel_processor,
+ad_export) - столько раньше стоил любой запуск main.py, включая меню и --help.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_startup [повторов]
+"""
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'tqdm']
+# Замеры: (название, импортируемые модули)
+IMPORTS = [
+    ('main (меню, --help)', ['main']),
+    ('ad_export (только экспорт AD)', ['ad_export']),
+    ('main + обработка', ['main', 'excel_processor', 'ad_export'])
+]
+
+def import_time(modules):
+    """Суммарное время импорта модулей (мс) и загруженные тяжелые библиотеки по выводу -X importtime"""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        cwd=PROJECT_DIR, capture_output=True, text=True, encoding='utf-8', check=True
+    )
+    total_us = 0
+    loaded = set()
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue  # Строка заголовка
+        # Модули верхнего уровня (без отступа) - их совокупное время и есть время импорта
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+        if name.strip() in HEAVY_MODULES:
+            loaded.add(name.strip())
+    return total_us / 1000, sorted(loaded)
+
+def wall_time(command):
+    """Время выполнения команды в новом процессе (с)"""
+    start = time.perf_counter()
+    subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+def main(repeats):
+    for title, modules in IMPORTS:
+        times = []
+        for _ in range(repeats):
+            milliseconds, loaded = import_time(modules)
+            times.append(milliseconds)
+        print(f"{title:>30}: импорт {statistics.median(times):6.0f} мс, "
+              f"тяжелые библиотеки: {', '.join(loaded) or 'нет'}")
+    
+    help_times = [wall_time([sys.executable, 'main.py', '--help']) for _ in range(repeats)]
+    print(f"{'main.py --help':>30}: {statistics.median(help_times) * 1000:6.0f} мс (весь процесс)")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,50 @@
+# benchmarks/bench_tenants.py
+"""Несколько организаций: последовательная обработка против параллельной (tenants.run_tenants).
+
+Для каждой организации создается свой синтетический набор (benchmarks.synthetic_data),
+затем все организации обрабатываются сначала по одной, потом одновременно
+(по числу ядер). Экспорт AD не выполняется. У каждого прохода свои каталоги
+результатов, а с ними и кэши разобранных файлов и результатов: второй проход
+не переиспользует работу первого.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_tenants [организаций] [пользователей]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.synthetic_data import generate
+from tenants import run_tenants
+
+def main(count, users):
+    with tempfile.TemporaryDirectory() as directory:
+        base_dirs = []
+        for number in range(count):
+            base_dir = Path(directory) / f"организация_{number}"
+            generate(base_dir, users, seed=number)
+            base_dirs.append(base_dir)
+        
+        timings = {}
+        for workers in sorted({1, min(count, os.cpu_count() or 1)}):
+            # Входные файлы общие, каталог результатов (и кэши в нем) - свой у каждого прохода
+            tenants = [
+                {'name': base_dir.name, 'base_dir': str(base_dir),
+                 'output_dir': str(Path(directory) / f"вывод_{workers}" / base_dir.name)}
+                for base_dir in base_dirs
+            ]
+            start = time.perf_counter()
+            summaries = run_tenants(tenants, {0}, {0}, ad_export=False, workers=workers)
+            timings[workers] = time.perf_counter() - start
+            failed = [summary['name'] for summary in summaries if not summary['report']]
+            if failed:
+                raise RuntimeError(f"Обработка не удалась: {', '.join(failed)}")
+        
+        print(f"{count} организаций по {users} пользователей:")
+        for workers, seconds in timings.items():
+            print(f"  процессов {workers}: {seconds:.1f} с ({timings[1] / seconds:.1f}x)")
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(args[0] if args else 4, args[1] if len(args) > 1 else 10000)
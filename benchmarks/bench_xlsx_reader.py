@@ -0,0 +1,57 @@
+# benchmarks/bench_xlsx_reader.py
+"""Чтение широкой выгрузки 1С: pd.read_excel всех столбцов против read_columns.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_xlsx_reader [количество_строк] [количество_столбцов]
+"""
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import pandas as pd
+from openpyxl import Workbook
+from xlsx_reader import read_columns
+
+def make_wide_onec_file(path, rows, width):
+    """Отчет 1С: шапка из трех строк, затем заголовок и много неиспользуемых столбцов"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(['Список пользователей'])
+    worksheet.append([])
+    worksheet.append(['Отбор: все пользователи'])
+    extra = [f"Реквизит {i}" for i in range(width - 2)]
+    worksheet.append(['Полное имя', 'Вход в приложение разрешен'] + extra)
+    for n in range(rows):
+        worksheet.append([f"Фамилия{n} Имя{n % 50} Отчество", 'Да' if n % 4 else None]
+                         + [f"значение {n}-{i}" for i in range(width - 2)])
+    workbook.save(path)
+
+def measure(func):
+    """Время и пик памяти: замеряются отдельными вызовами, tracemalloc искажает время"""
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+def main(rows=20000, width=40):
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'onec.xlsx'
+        make_wide_onec_file(path, rows, width)
+        
+        full, full_time, full_peak = measure(lambda: pd.read_excel(path, skiprows=3))
+        pruned, pruned_time, pruned_peak = measure(
+            lambda: read_columns(path, ['Полное имя', 'Вход в приложение разрешен']))
+        assert full['Полное имя'].tolist() == pruned['Полное имя'].tolist()
+        
+        print(f"{rows} строк x {width} столбцов")
+        print(f"pd.read_excel (все столбцы): {full_time:.2f} с, пик памяти {full_peak / 2**20:.1f} МБ")
+        print(f"read_columns (2 столбца):    {pruned_time:.2f} с, пик памяти {pruned_peak / 2**20:.1f} МБ")
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:3]])
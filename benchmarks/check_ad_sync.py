@@ -0,0 +1,165 @@
+# benchmarks/check_ad_sync.py
+"""Проверка синхронизации AD через снимок на записанном выводе PowerShell.
+
+В отдельном процессе (config указывает на временный каталог) выполняются:
+- экспорт по умолчанию - полная выгрузка без снимка;
+- полная синхронизация: снимок собирается заново;
+- инкрементальная синхронизация без списка ObjectGUID: изменения и новые записи
+  попадают в снимок, удаленные записи остаются (удалять не по чему);
+- инкрементальная синхронизация со списком ObjectGUID: удаленные записи уходят из снимка,
+  записи без ObjectGUID остаются.
+После каждого шага проверяются снимок (merge_snapshot/sync_snapshot/prune_snapshot),
+отметка high_water_mark и файлы сверки сотрудники.txt и ГПХ.txt.
+
+Запуск из корня проекта:
+    python -m benchmarks.check_ad_sync
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+USERS = 20
+FULL_SYNC_TIME = "2026-10-17T10:00:00Z"
+DELTA_TIME = "2026-10-17T12:00:00Z"
+DELETED = [6, 7]  # Удалены из AD после полной выгрузки
+NO_GUID = USERS - 1  # Запись без ObjectGUID (ключ - SamAccountName)
+
+def synthetic_user(i, changed=FULL_SYNC_TIME):
+    """Пользователь i: каждый четвертый - ГПХ, каждый пятый заблокирован"""
+    if i % 4 == 0:
+        dn = f"CN=Пользователь {i},OU=ГПХ,OU=External_Organizations,DC=corp,DC=local"
+    else:
+        dn = f"CN=Пользователь {i},OU=CU_Users,DC=corp,DC=local"
+    return {
+        'Name': f"Пользователь {i}",
+        'SamAccountName': f"user{i}",
+        'Enabled': i % 5 != 0,
+        'EmailAddress': f"user{i}@corp.local",
+        'Company': f"Компания {i % 2}",
+        'DistinguishedName': dn,
+        'ObjectGUID': None if i == NO_GUID else str(uuid.UUID(int=i + 1)),
+        'whenChanged': changed
+    }
+
+def delta_users():
+    """Изменения после полной выгрузки: переименование, блокировка, перевод в ГПХ и новые записи"""
+    renamed = synthetic_user(1, DELTA_TIME)
+    renamed['Name'] = "Пользователь 1 (новая фамилия)"
+    renamed['DistinguishedName'] = "CN=Пользователь 1 (новая фамилия),OU=CU_Users,DC=corp,DC=local"
+    disabled = dict(synthetic_user(2, DELTA_TIME), Enabled=False)
+    moved = dict(synthetic_user(3, DELTA_TIME),
+                 DistinguishedName="CN=Пользователь 3,OU=ГПХ,OU=External_Organizations,DC=corp,DC=local")
+    return [renamed, disabled, moved, synthetic_user(USERS, DELTA_TIME), synthetic_user(USERS + 1, DELTA_TIME)]
+
+def key(user):
+    return user['ObjectGUID'] or user['SamAccountName']
+
+def write_recorded_output(path, users):
+    """Вывод PowerShell: сжатый JSON и пустая строка-разделитель на пользователя"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"Найдено пользователей: {len(users)}\n")
+        for user in users:
+            f.write(json.dumps(user, ensure_ascii=False) + "\n\n")
+
+def write_guids(path, users):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(user['ObjectGUID'] + "\n" for user in users if user['ObjectGUID'])
+
+def file_names(filename):
+    """Имена из файла сверки ("Name: ...", "Status: ..." и пустая строка на пользователя)"""
+    lines = Path(filename).read_text(encoding='utf-8').split("\n")
+    return [line[len("Name: "):] for line in lines[0::3][:-1]]
+
+def category_names(users, category):
+    """Имена активных пользователей категории в порядке выгрузки"""
+    from ad_export import process_user, classify_user
+    return [user['Name'] for user in users if classify_user(process_user(user), user['Enabled']) == category]
+
+def check_state(expected, high_water_mark):
+    """Снимок и файлы сверки совпадают с ожидаемыми пользователями (в порядке снимка)"""
+    from config import AD_SNAPSHOT_FILE, EMPLOYEES_FILE, GPH_FILE
+    from ad_snapshot import load_snapshot
+
+    snapshot = load_snapshot(AD_SNAPSHOT_FILE)
+    assert snapshot is not None
+    assert snapshot['high_water_mark'] == high_water_mark, snapshot['high_water_mark']
+    store = snapshot['users']
+    snapshot_users = {
+        str(uuid.UUID(bytes=stored_key)) if isinstance(stored_key, bytes) else stored_key: store.record(row)
+        for row, stored_key in enumerate(store.keys)
+    }
+    fields = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
+    assert snapshot_users == {
+        key(user): {field: user[field] for field in fields} for user in expected.values()
+    }, sorted(snapshot_users)
+    assert list(snapshot_users) == list(expected)
+
+    for filename, category in ((EMPLOYEES_FILE, 'employee'), (GPH_FILE, 'gph')):
+        names = category_names(expected.values(), category)
+        assert names and file_names(filename) == names, (category, file_names(filename))
+
+def run_worker():
+    """Шаги синхронизации в процессе, для которого config указывает на временный каталог"""
+    from config import AD_INCREMENTAL, AD_SNAPSHOT_FILE, EMPLOYEES_FILE
+    from ad_export import export_ad_users
+
+    directory = Path(os.environ['USERS_CLEANER_BASE_DIR'])
+    full = [synthetic_user(i) for i in range(USERS)]
+    delta = delta_users()
+    present = [user for user in full if int(user['SamAccountName'][4:]) not in DELETED] + delta[3:]
+    write_recorded_output(directory / 'full.txt', full)
+    write_recorded_output(directory / 'delta.txt', delta)
+    write_guids(directory / 'guids.txt', present)
+
+    # По умолчанию инкрементальная синхронизация выключена: полная выгрузка без снимка
+    assert not AD_INCREMENTAL
+    assert export_ad_users(recorded_output=directory / 'full.txt')[0] == USERS
+    assert not AD_SNAPSHOT_FILE.exists()
+    assert file_names(EMPLOYEES_FILE) == category_names(full, 'employee')
+    print(f"Экспорт по умолчанию: полная выгрузка {USERS} пользователей, снимок не создается")
+
+    # Полная синхронизация: снимка нет
+    expected = {key(user): user for user in full}
+    export_ad_users(incremental=True, recorded_output=directory / 'full.txt')
+    check_state(expected, FULL_SYNC_TIME)
+    print(f"Полная синхронизация: {len(expected)} пользователей в снимке")
+
+    # Инкрементальная без списка ObjectGUID: изменения применяются, удаленные остаются
+    for user in delta:
+        expected[key(user)] = user
+    total = export_ad_users(incremental=True, recorded_output=directory / 'delta.txt')[0]
+    assert total == USERS + 2, total
+    check_state(expected, DELTA_TIME)
+    print(f"Инкрементальная без списка ObjectGUID: {len(delta)} изменений, удаленные записи остались")
+
+    # Инкрементальная со списком ObjectGUID: удаленные уходят, запись без ObjectGUID остается
+    for i in DELETED:
+        del expected[key(synthetic_user(i))]
+    total = export_ad_users(incremental=True, recorded_output=directory / 'delta.txt',
+                            recorded_guids=directory / 'guids.txt')[0]
+    assert total == USERS + 2 - len(DELETED), total
+    assert key(synthetic_user(NO_GUID)) in expected
+    check_state(expected, DELTA_TIME)
+    print(f"Инкрементальная со списком ObjectGUID: удалено {len(DELETED)}, в снимке {len(expected)}")
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        env = dict(os.environ, USERS_CLEANER_BASE_DIR=directory)
+        env.pop('USERS_CLEANER_AD_INCREMENTAL', None)
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.check_ad_sync', '--worker'],
+            env=env, capture_output=True, text=True, encoding='utf-8'
+        )
+        print(completed.stdout, end="")
+        if completed.returncode != 0:
+            raise RuntimeError(f"Проверка синхронизации завершилась с ошибкой:\n{completed.stderr}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--worker']:
+        run_worker()
+    else:
+        main()
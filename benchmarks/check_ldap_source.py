@@ -0,0 +1,142 @@
+# benchmarks/check_ldap_source.py
+"""Проверка LDAP-источника на сервере ldap3 MOCK_SYNC (без контроллера домена, работает в Linux).
+
+Проверяет, что:
+- постраничный поиск отдает всех пользователей, когда их больше размера страницы;
+- фильтр whenChanged >= since отдает только измененных пользователей;
+- список ObjectGUID (для поиска удаленных записей) совпадает с GUID полной выгрузки;
+- ldap_entry_to_user приводит objectGUID, userAccountControl, DN и whenChanged
+  к тому же виду, что и выгрузка PowerShell (ConvertTo-Json), и сверка
+  раскладывает пользователей по тем же категориям.
+
+Запуск из корня проекта:
+    python -m benchmarks.check_ldap_source
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+import ldap3
+from ad_sources import LdapSource, ldap_entry_to_user
+from ad_export import process_user, classify_user
+
+BASE_DN = "DC=corp,DC=local"
+USERS = 25
+PAGE_SIZE = 10
+CHANGED_USERS = 5  # Последние пользователи изменены после отметки синхронизации
+SINCE = "2026-10-17T11:00:00Z"
+
+# Флаги userAccountControl: обычная запись, отключенная, с бессрочным паролем
+UAC_VALUES = [512, 514, 66048, 66050]
+
+def synthetic_user(i):
+    """Пользователь i в формате выгрузки PowerShell (то, что отдает ConvertTo-Json)"""
+    if i % 4 == 0:
+        dn = f"CN=Пользователь {i},OU=ГПХ,OU=External_Organizations,{BASE_DN}"
+    else:
+        dn = f"CN=Пользователь {i},OU=CU_Users,{BASE_DN}"
+    uac = UAC_VALUES[i % len(UAC_VALUES)]
+    return {
+        'Name': f"Фамилия{i} Имя{i} Отчество",
+        'SamAccountName': f"user{i}",
+        'Enabled': not uac & 0x0002,
+        'EmailAddress': f"user{i}@corp.local" if i % 3 else None,
+        'Company': f"Компания {i % 2}" if i % 5 else None,
+        'DistinguishedName': dn,
+        # [Guid].ToString(): нижний регистр, без фигурных скобок; байты таких GUID - допустимый UTF-8,
+        # ldap3 без схемы декодирует их в строку, поэтому источник должен брать исходные байты
+        'ObjectGUID': str(uuid.UUID(int=i + 1)),
+        'whenChanged': "2026-10-17T12:00:00Z" if i >= USERS - CHANGED_USERS else "2026-10-17T10:00:00Z"
+    }
+
+def ldap_attributes(user, i):
+    """Атрибуты той же записи в LDAP (как их хранит контроллер домена)"""
+    attributes = {
+        'objectClass': ['top', 'person', 'organizationalPerson', 'user'],
+        'objectCategory': 'person',
+        'name': user['Name'],
+        'sAMAccountName': user['SamAccountName'],
+        'userAccountControl': str(UAC_VALUES[i % len(UAC_VALUES)]),
+        # objectGUID хранится в двоичном виде с little-endian первыми полями
+        'objectGUID': uuid.UUID(user['ObjectGUID']).bytes_le,
+        'whenChanged': datetime.strptime(user['whenChanged'], "%Y-%m-%dT%H:%M:%SZ").strftime("%Y%m%d%H%M%S.0Z")
+    }
+    if user['EmailAddress']:
+        attributes['mail'] = user['EmailAddress']
+    if user['Company']:
+        attributes['company'] = user['Company']
+    return attributes
+
+def mock_connection():
+    """Подключение MOCK_SYNC с USERS пользователями и счетчиком поисковых запросов (страниц)"""
+    server = ldap3.Server('mock_ad', get_info=ldap3.NONE)
+    connection = ldap3.Connection(server, user=f"CN=svc,{BASE_DN}", password="secret", client_strategy=ldap3.MOCK_SYNC)
+    connection.strategy.add_entry(f"CN=svc,{BASE_DN}", {'objectClass': ['top', 'person'], 'userPassword': "secret"})
+    for i in range(USERS):
+        user = synthetic_user(i)
+        connection.strategy.add_entry(user['DistinguishedName'], ldap_attributes(user, i))
+    connection.bind()
+
+    connection.pages = 0
+    search = connection.search
+    def counted_search(*args, **kwargs):
+        connection.pages += 1
+        return search(*args, **kwargs)
+    connection.search = counted_search
+    return connection
+
+def by_account(users):
+    return {user['SamAccountName']: user for user in users}
+
+def check_paging():
+    """Все пользователи за несколько страниц"""
+    connection = mock_connection()
+    users = list(LdapSource(base_dn=BASE_DN, page_size=PAGE_SIZE, connection=connection).iter_users())
+    expected_pages = -(-USERS // PAGE_SIZE)
+    assert connection.pages == expected_pages, (connection.pages, expected_pages)
+    assert len(users) == USERS, len(users)
+    assert by_account(users) == by_account(synthetic_user(i) for i in range(USERS))
+
+def check_since():
+    """Только пользователи, измененные после since"""
+    connection = mock_connection()
+    users = list(LdapSource(base_dn=BASE_DN, page_size=PAGE_SIZE, connection=connection).iter_users(since=SINCE))
+    changed = [synthetic_user(i) for i in range(USERS - CHANGED_USERS, USERS)]
+    assert by_account(users) == by_account(changed), sorted(by_account(users))
+
+def check_guids():
+    """ObjectGUID всех пользователей в том же виде, что и в полной выгрузке"""
+    connection = mock_connection()
+    guids = list(LdapSource(base_dn=BASE_DN, page_size=PAGE_SIZE, connection=connection).iter_guids())
+    assert sorted(guids) == sorted(synthetic_user(i)['ObjectGUID'] for i in range(USERS)), guids
+
+def check_conversion():
+    """Те же поля, что у PowerShell, и та же обработка при выгрузке"""
+    for i in range(USERS):
+        expected = synthetic_user(i)
+        user = ldap_entry_to_user(expected['DistinguishedName'], ldap_attributes(expected, i))
+        assert user == expected, (user, expected)
+        processed, expected_processed = process_user(user), process_user(expected)
+        assert processed == expected_processed
+        assert classify_user(processed, user['Enabled']) == classify_user(expected_processed, expected['Enabled'])
+
+    # Значения, разобранные по схеме (ldap3 с get_info): GUID в скобках, время с часовым поясом, число
+    expected = synthetic_user(1)
+    attributes = ldap_attributes(expected, 1)
+    attributes.update({
+        'objectGUID': "{" + expected['ObjectGUID'] + "}",
+        'whenChanged': datetime(2026, 10, 17, 13, 0, tzinfo=timezone(timedelta(hours=3))),
+        'userAccountControl': [UAC_VALUES[1]]
+    })
+    assert ldap_entry_to_user(expected['DistinguishedName'], attributes) == expected
+
+def main():
+    check_paging()
+    print(f"Постраничный поиск: {USERS} пользователей, страницы по {PAGE_SIZE}")
+    check_since()
+    print(f"Фильтр whenChanged >= {SINCE}: {CHANGED_USERS} измененных из {USERS}")
+    check_guids()
+    print(f"Список ObjectGUID: {USERS} пользователей")
+    check_conversion()
+    print("Поля LDAP совпадают с выгрузкой PowerShell")
+
+if __name__ == "__main__":
+    main()
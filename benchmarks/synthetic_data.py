@@ -0,0 +1,163 @@
+# benchmarks/synthetic_data.py
+"""Генератор правдоподобных обезличенных данных для проверки масштабирования.
+
+Создает в base_dir ту же структуру, что ожидает обработка:
+эксельки/AD/сотрудники.txt, ГПХ.txt (формат Name:/Status:) и книги
+штатки, Контура, Диадока и 1С с теми же столбцами, что у реальных выгрузок.
+В данных есть уволенные (нет в AD), заблокированные, внутренние дубли,
+варианты написания с ё/е и искаженные ФИО (опечатки, латиница, порядок слов).
+
+Запуск из корня проекта:
+    python -m benchmarks.synthetic_data каталог [количество_пользователей]
+"""
+import random
+import sys
+from pathlib import Path
+from openpyxl import Workbook
+
+SYLLABLES = ['Ба', 'Ве', 'Го', 'До', 'Ка', 'Ле', 'Ми', 'На', 'По', 'Ро', 'Са', 'Та', 'Фе', 'Ха',
+             'Че', 'Ша', 'Бо', 'Ву', 'Зо', 'Ку', 'Ло', 'Му', 'Ни', 'Ор', 'Пу', 'Ры', 'Сё', 'Тю',
+             'Жу', 'Лё', 'Гу', 'Дя']
+ROOT_ENDINGS = 'бвдклмнрст'
+# Мужское и женское окончание фамилии
+SURNAME_ENDINGS = [('ов', 'ова'), ('ев', 'ева'), ('ин', 'ина'), ('ский', 'ская'), ('енко', 'енко'), ('ых', 'ых')]
+MALE_NAMES = ['Александр', 'Алексей', 'Андрей', 'Артём', 'Владимир', 'Дмитрий', 'Евгений', 'Иван',
+              'Игорь', 'Максим', 'Михаил', 'Николай', 'Олег', 'Павел', 'Пётр', 'Роман', 'Сергей',
+              'Фёдор', 'Юрий', 'Семён']
+FEMALE_NAMES = ['Анна', 'Алёна', 'Дарья', 'Елена', 'Екатерина', 'Ирина', 'Ксения', 'Мария', 'Наталья',
+                'Ольга', 'Светлана', 'Татьяна', 'Юлия', 'Фёкла', 'Полина', 'Вера']
+PATRONYMIC_ROOTS = ['Александров', 'Алексеев', 'Андреев', 'Артёмов', 'Дмитриев', 'Иванов', 'Игорев',
+                    'Максимов', 'Михайлов', 'Николаев', 'Олегов', 'Павлов', 'Петров', 'Романов',
+                    'Сергеев', 'Фёдоров', 'Юрьев']
+
+# Доли пользователей AD в выгрузках и доли записей, которых в AD уже нет
+GPH_SHARE = 0.15
+SOURCE_COVERAGE = {'shtat': 0.8, 'kontur': 0.6, 'diadoc': 0.5, 'onec': 0.4}
+LEAVERS_SHARE = 0.05
+DUPLICATES_SHARE = 0.005
+YO_VARIANT_SHARE = 0.3  # Доля имен с ё, записанных в выгрузке через е
+DISTORTED_SHARE = 0.01  # Доля записей с опечаткой, латинской буквой или другим порядком слов
+LATIN_LOOKALIKES = {'А': 'A', 'В': 'B', 'Е': 'E', 'К': 'K', 'М': 'M', 'О': 'O', 'Р': 'P', 'С': 'C', 'Т': 'T', 'Х': 'X'}
+
+class NameFactory:
+    """Уникальные ФИО (уникальны фамилия и имя - по ним сравниваются источники)"""
+    
+    def __init__(self, rnd):
+        self.rnd = rnd
+        self.used = set()
+    
+    def person(self):
+        rnd = self.rnd
+        while True:
+            root = ''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(1, 3))) + rnd.choice(ROOT_ENDINGS)
+            root = root[0] + root[1:].lower()
+            male_ending, female_ending = rnd.choice(SURNAME_ENDINGS)
+            patronymic_root = rnd.choice(PATRONYMIC_ROOTS)
+            if rnd.random() < 0.5:
+                surname, name, patronymic = root + male_ending, rnd.choice(MALE_NAMES), patronymic_root + 'ич'
+            else:
+                surname, name, patronymic = root + female_ending, rnd.choice(FEMALE_NAMES), patronymic_root + 'на'
+            key = (surname, name)
+            if key not in self.used:
+                self.used.add(key)
+                return f"{surname} {name} {patronymic}"
+
+def yo_variant(fio, rnd):
+    """Часть выгрузок пишет ё как е"""
+    if 'ё' in fio and rnd.random() < YO_VARIANT_SHARE:
+        return fio.replace('ё', 'е')
+    return fio
+
+def distort(fio, rnd):
+    """Искажение ФИО, которое точное сравнение не находит (проверка нечеткого сопоставления)"""
+    surname, name, patronymic = fio.split()
+    kind = rnd.randrange(3)
+    if kind == 0:
+        # Латинская буква вместо кириллической
+        surname = ''.join(LATIN_LOOKALIKES.get(ch, ch) for ch in surname)
+    elif kind == 1:
+        # Порядок слов "Имя Фамилия"
+        surname, name = name, surname
+    else:
+        # Опечатка: пропущенная буква фамилии
+        position = rnd.randrange(1, len(surname))
+        surname = surname[:position] + surname[position + 1:]
+    return f"{surname} {name} {patronymic}"
+
+def source_people(people, factory, rnd, coverage):
+    """ФИО для выгрузки сервиса: часть пользователей AD, уволенные и внутренние дубли"""
+    names = [yo_variant(fio, rnd) for fio in rnd.sample(people, int(len(people) * coverage))]
+    names = [distort(fio, rnd) if rnd.random() < DISTORTED_SHARE else fio for fio in names]
+    names += [factory.person() for _ in range(int(len(people) * LEAVERS_SHARE))]
+    names += rnd.sample(names, int(len(names) * DUPLICATES_SHARE))
+    rnd.shuffle(names)
+    return names
+
+def write_ad_file(path, names):
+    with open(path, 'w', encoding='utf-8') as f:
+        for fio in names:
+            f.write(f"Name: {fio}\nStatus: Активна\n\n")
+
+def write_workbook(path, header, rows, preamble=()):
+    """Потоковая запись книги: строки шапки отчета, заголовок, данные"""
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    for line in preamble:
+        worksheet.append(line)
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(path)
+
+def generate(base_dir, users=10000, seed=1):
+    """Генерация набора входных файлов для users пользователей AD"""
+    base_dir = Path(base_dir)
+    rnd = random.Random(seed)
+    factory = NameFactory(rnd)
+    people = [factory.person() for _ in range(users)]
+    
+    input_dir = base_dir / "эксельки"
+    for directory in ["AD", "штатка", "эдо_контур", "эдо_диадок", "1С"]:
+        (input_dir / directory).mkdir(parents=True, exist_ok=True)
+    
+    gph_count = int(users * GPH_SHARE)
+    write_ad_file(input_dir / "AD" / "сотрудники.txt", people[gph_count:])
+    write_ad_file(input_dir / "AD" / "ГПХ.txt", people[:gph_count])
+    
+    shtat = source_people(people[gph_count:], factory, rnd, SOURCE_COVERAGE['shtat'])
+    write_workbook(input_dir / "штатка" / "штатное_расписание.xlsx",
+                   ['Табельный номер', 'Ф.И.О.', 'Подразделение', 'Должность'],
+                   ([str(100000 + i), fio, f"Отдел {i % 40}", 'Специалист'] for i, fio in enumerate(shtat)))
+    
+    kontur = source_people(people, factory, rnd, SOURCE_COVERAGE['kontur'])
+    write_workbook(input_dir / "эдо_контур" / "Контур.xlsx",
+                   ['ФИО', 'Email', 'Администратор', 'Дата блокировки', 'Организация'],
+                   ([fio, f"user{i}@example.com", rnd.random() < 0.02,
+                     '01.03.2024' if rnd.random() < 0.1 else None, 'ООО Ромашка']
+                    for i, fio in enumerate(kontur)))
+    
+    diadoc = source_people(people, factory, rnd, SOURCE_COVERAGE['diadoc'])
+    write_workbook(input_dir / "эдо_диадок" / "Выгрузка_диадок.xlsx",
+                   ['ФИО', 'Должность', 'Активен', 'Администратор'],
+                   ([fio, 'Специалист', 'Нет' if rnd.random() < 0.1 else 'Да',
+                     'Да' if rnd.random() < 0.02 else 'Нет']
+                    for fio in diadoc))
+    
+    onec = source_people(people, factory, rnd, SOURCE_COVERAGE['onec'])
+    write_workbook(input_dir / "1С" / "пользователи_1С.xlsx",
+                   ['Имя', 'Полное имя', 'Вход в приложение разрешен', 'Аутентификация ОС'],
+                   ([fio.split()[0], fio, 'Да' if rnd.random() < 0.9 else None, 'Нет']
+                    for fio in onec),
+                   preamble=[['Список пользователей информационной базы'], [], ['Отбор: все пользователи']])
+    
+    return {
+        'ad': users, 'shtat': len(shtat), 'kontur': len(kontur),
+        'diadoc': len(diadoc), 'onec': len(onec)
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    counts = generate(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
+    print(", ".join(f"{name}: {count}" for name, count in counts.items()))
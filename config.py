@@ -1,48 +1,135 @@
 # config.py
+import json
 import os
 from pathlib import Path
 from datetime import datetime, timedelta
 
 # Базовые пути
-BASE_DIR = Path(__file__).parent
-INPUT_DIR = BASE_DIR / "эксельки"
-OUTPUT_DIR = BASE_DIR / "вывод"
+# USERS_CLEANER_BASE_DIR - другой рабочий каталог (например, с синтетическими данными);
+# USERS_CLEANER_INPUT_DIR / USERS_CLEANER_OUTPUT_DIR - отдельные каталоги организации (tenants.py)
+BASE_DIR = Path(os.environ.get("USERS_CLEANER_BASE_DIR") or Path(__file__).parent)
+INPUT_DIR = Path(os.environ.get("USERS_CLEANER_INPUT_DIR") or BASE_DIR / "эксельки")
+OUTPUT_DIR = Path(os.environ.get("USERS_CLEANER_OUTPUT_DIR") or BASE_DIR / "вывод")
 AD_EXPORT_DIR = INPUT_DIR / "AD"
 SHTAT_DIR = INPUT_DIR / "штатка"
 KONTUR_DIR = INPUT_DIR / "эдо_контур"
 DIADOC_DIR = INPUT_DIR / "эдо_диадок"
 ONEC_DIR = INPUT_DIR / "1С"
 
-# Создаем директории, если они не существуют
-INPUT_DIR.mkdir(exist_ok=True)
-OUTPUT_DIR.mkdir(exist_ok=True)
-AD_EXPORT_DIR.mkdir(exist_ok=True)
-SHTAT_DIR.mkdir(exist_ok=True)
-KONTUR_DIR.mkdir(exist_ok=True)
-DIADOC_DIR.mkdir(exist_ok=True)
-ONEC_DIR.mkdir(exist_ok=True)
+def ensure_directories():
+    """Создание рабочих каталогов (вызывается в начале запуска, а не при импорте config)"""
+    for directory in (INPUT_DIR, OUTPUT_DIR, AD_EXPORT_DIR, SHTAT_DIR, KONTUR_DIR, DIADOC_DIR, ONEC_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
 
 # Настройка актуальности файлов (в днях)
 MAX_FILE_AGE_DAYS = 30
 
-# Генерация имени файла с датой и временеи
-current_time = datetime.now().strftime("%Y%m%d_%H%M%S")
-OUTPUT_FILE = OUTPUT_DIR / f"результат_обработки_{current_time}.xlsx"
+def run_timestamp():
+    """Отметка времени для имен файлов запуска"""
+    return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+def report_file():
+    """Имя файла отчета с датой и временем (новое при каждом вызове, а не на момент импорта)"""
+    return OUTPUT_DIR / f"результат_обработки_{run_timestamp()}.xlsx"
 
 # Файлы сотрудников и ГПХ
 EMPLOYEES_FILE = AD_EXPORT_DIR / "сотрудники.txt"
 GPH_FILE = AD_EXPORT_DIR / "ГПХ.txt"
 
+# Инкрементальная синхронизация AD
+AD_INCREMENTAL = os.environ.get("USERS_CLEANER_AD_INCREMENTAL") == "1"  # Запрашивать только изменившиеся учетные записи (включается явно)
+AD_SNAPSHOT_FILE = AD_EXPORT_DIR / "ad_snapshot.json"  # Локальный снимок последней выгрузки
+AD_FULL_SYNC_DAYS = 7  # Полная выгрузка не реже раза в N дней (на случай пропущенных изменений)
+AD_SYNC_OVERLAP_MINUTES = 10  # Запас по времени при запросе изменений
+AD_SERVER = os.environ.get("USERS_CLEANER_AD_SERVER") or None  # Контроллер домена (whenChanged не реплицируется, лучше закрепить один)
+
+# Источник данных AD: "powershell" (Get-ADUser, только Windows) или "ldap" (пакет ldap3)
+AD_BACKEND = os.environ.get("USERS_CLEANER_AD_BACKEND") or "powershell"
+LDAP_SERVER = os.environ.get("USERS_CLEANER_LDAP_SERVER") or None  # Адрес контроллера домена; если не задан, используется AD_SERVER
+LDAP_BASE_DN = os.environ.get("USERS_CLEANER_LDAP_BASE_DN") or None  # Например: "DC=corp,DC=local"
+LDAP_USER = os.environ.get("AD_LDAP_USER")  # Без учетных данных - вход через Kerberos
+LDAP_PASSWORD = os.environ.get("AD_LDAP_PASSWORD")
+LDAP_USE_SSL = True
+LDAP_PAGE_SIZE = 1000  # Размер страницы постраничного поиска
+
+# Категории учетных записей по DistinguishedName: первое подходящее правило задает категорию.
+# contains - DN содержит хотя бы одну из подстрок, excludes - ни одной (без учета регистра).
+# Другие правила - переменная USERS_CLEANER_DN_RULES (JSON того же вида)
+AD_DN_RULES = [
+    {'category': 'employee', 'contains': ['cu_users'], 'excludes': ['гпх']},  # Сотрудники кампуса
+    {'category': 'gph', 'contains': ['external_organizations', 'гпх']},  # Сотрудники ГПХ
+]
+if os.environ.get("USERS_CLEANER_DN_RULES"):
+    AD_DN_RULES = json.loads(os.environ["USERS_CLEANER_DN_RULES"])
+
+# Выходные файлы экспорта AD: "txt" - полная выгрузка, "employees"/"gph" - вход сверки,
+# "xlsx" - полная выгрузка в Excel (сверка ее не читает, поэтому по умолчанию отключена)
+AD_OUTPUT_SINKS = ["txt", "employees", "gph"]
+AD_SINK_BATCH_SIZE = 1000  # Пользователей в одной пачке для потоков записи
+AD_EXPORT_TXT_FILE = OUTPUT_DIR / "ad_users_export.txt"  # Полная выгрузка "txt" (все пользователи, включая заблокированных)
+
 # Файлы ЭДО
 KONTUR_FILE = KONTUR_DIR / "Контур.xlsx"
 DIADOC_FILE = DIADOC_DIR / "Выгрузка_SBINV-39662.xlsx"
 
+# Кэш разобранных входных файлов (повторный запуск на тех же файлах не разбирает XLSX)
+INPUT_CACHE_ENABLED = True
+INPUT_CACHE_DIR = OUTPUT_DIR / "кэш"
+INPUT_CACHE_MAX_AGE_DAYS = 30  # Неиспользуемые записи старше N дней удаляются
+INPUT_CACHE_REFRESH = os.environ.get("USERS_CLEANER_REFRESH_CACHE") == "1"  # Принудительно разобрать файлы заново
+
+# Кэш результатов по сервисам: сервис с неизменившимися файлами, AD и настройками не пересчитывается
+RESULT_CACHE_ENABLED = True
+RESULT_CACHE_DIR = INPUT_CACHE_DIR / "результаты"
+RESULT_CACHE_KEEP = 4  # Вариантов результата на сервис (например, для разных типов сотрудников)
+
+# История запусков: компактный снимок результатов и отчет изменений относительно прошлого запуска
+RUN_HISTORY_ENABLED = True
+RUN_HISTORY_DIR = OUTPUT_DIR / "история"
+RUN_HISTORY_KEEP = 100  # Сколько последних снимков хранить
+
+# Хранилище сверки в SQLite (USERS_CLEANER_BACKEND=sqlite): источники загружаются в таблицы с индексом
+# по ключу ФИО частями и переиспользуются между запусками, пока не изменились их входные файлы
+RECONCILE_BACKEND = os.environ.get("USERS_CLEANER_BACKEND") or "pandas"  # "pandas" или "sqlite"
+SQLITE_FILE = OUTPUT_DIR / "сверка.sqlite"
+SQLITE_CHUNK_ROWS = 50000  # Строк входного файла в одной части при загрузке
+SQLITE_SHEET_ROWS = 5000  # Строк таблицы в одной части при записи листов отчета (все столбцы основного листа)
+
+# Сколько первых строк входного файла просматривать в поисках строки заголовка
+HEADER_SCAN_ROWS = 20
+
+# Замеры этапов обработки (время, память, строки) - профиль пишется рядом с processing.log
+# в вывод/профиль_<время>.json
+PROFILE_ENABLED = os.environ.get("USERS_CLEANER_PROFILE") == "1"
+PROFILE_CPROFILE_STAGE = os.environ.get("USERS_CLEANER_CPROFILE_STAGE")  # Этап для дампа cProfile (например "load_onec")
+
+# Нечеткое сопоставление ФИО (опечатки, латиница вместо кириллицы, порядок слов, двойные фамилии)
+FUZZY_MATCHING = os.environ.get("USERS_CLEANER_FUZZY") == "1"
+FUZZY_THRESHOLD = 0.88  # Минимальное сходство (1 - расстояние Левенштейна / длина)
+FUZZY_CANDIDATES = 10  # Сколько кандидатов по общим триграммам проверять
+FUZZY_MAX_POSTING = 500  # Слишком частые триграммы не используются для отбора кандидатов
+
+# Режим наблюдения: период опроса входных каталогов (в секундах)
+WATCH_INTERVAL = 5
+
+# Параллельная загрузка входных файлов
+LOAD_EXECUTOR = os.environ.get("USERS_CLEANER_LOAD_EXECUTOR") or "process"  # "process" или "thread"
+LOAD_WORKERS = 4
+
+# Несколько организаций (main.py --tenants): сколько организаций обрабатывать одновременно
+TENANT_WORKERS = os.cpu_count() or 1
+
+# Форматы отчета (через запятую): xlsx - одна книга; csv, jsonl, parquet - файл на лист
+# в каталоге с именем отчета. Выбираются и при запуске: main.py --formats csv jsonl
+REPORT_FORMATS = [fmt.strip() for fmt in (os.environ.get("USERS_CLEANER_REPORT_FORMATS") or "xlsx").split(",") if fmt.strip()]
+
 # Настройки обработки Excel
 SHEET_NAME = "сравнение пользователей"
 COMPARISON_SHEET = "сравнение AD и Штатки"
 KONTUR_SHEET = "Контур данные"
 DIADOC_SHEET = "Диадок данные"
 ONEC_SHEET = "1С данные"
-MAX_ROWS = 10000  # Увеличили лимит строк
+# Подсветка ФИО систем на основном листе: внутренние дубли - красным, записи на удаление - желтым
+REPORT_HIGHLIGHT = os.environ.get("USERS_CLEANER_HIGHLIGHT") != "0"
 RED_COLOR = (255, 199, 206)  # RGB для красного цвета
 YELLOW_COLOR = (255, 235, 156)  # RGB для желтого цвета
\ No newline at end of file
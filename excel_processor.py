@@ -1,218 +1,337 @@
 # excel_processor.py
-import pandas as pd
+import logging
 import numpy as np
-from config import OUTPUT_FILE, SHEET_NAME, COMPARISON_SHEET, MAX_ROWS, EMPLOYEES_FILE, GPH_FILE
-from config import SHTAT_DIR
-from utils import replace_yo, normalize_name, find_internal_duplicates
-from utils import load_shtat_data, create_comparison_sheet
-from processors.onec_processor import process_onec_data
-from processors.kontur_processor import process_kontur_data
-from processors.diadoc_processor import process_diadoc_data
+import pandas as pd
+from config import REPORT_FORMATS, SHEET_NAME, COMPARISON_SHEET, EMPLOYEES_FILE, GPH_FILE
+from config import RESULT_CACHE_ENABLED, RUN_HISTORY_ENABLED, RECONCILE_BACKEND
+from config import REPORT_HIGHLIGHT, RED_COLOR, YELLOW_COLOR, ensure_directories, report_file
+from utils import replace_yo, name_index, reset_name_cache, active_mask
+from utils import create_comparison_sheet, add_comparison_sheet, read_names_and_statuses_from_file
+from input_loader import load_sources
+from source_registry import SERVICES, selected_sources, source_file, empty_frame, process_source, type_selected
+from result_cache import ad_fingerprint, result_key, load_result, save_result
+from run_history import keyed_rows, record_run
+from report_writer import ReportWriter, sheet_chunks
+from sqlite_store import ReconciliationStore
+from profiling import stage
+
+def build_comparison_frame(frames):
+    """Сборка основного листа: источники рядом друг с другом, каждый своей длины"""
+    return pd.concat([frame.reset_index(drop=True) for frame in frames], axis=1)
+
+# Файлы экспорта AD по типу сотрудников: файл и столбцы основного листа
+AD_FILES = {
+    1: (EMPLOYEES_FILE, 'AD_сотрудники', 'AD_Статус_сотрудники'),
+    2: (GPH_FILE, 'AD_ГПХ', 'AD_Статус_ГПХ')
+}
+
+def service_highlighting(service_data, service_duplicates, results, rows):
+    """Подсветка ФИО систем на основном листе: записи на удаление - желтым, внутренние дубли - красным"""
+    highlighting = []
+    for name, service in SERVICES.items():
+        data = service_data[name]
+        marked_frames = [(results.get(f"users_to_remove_{service['key']}"), YELLOW_COLOR),
+                         (service_duplicates[name], RED_COLOR)]
+        for marked, color in marked_frames:
+            if marked is None or marked.empty:
+                continue
+            # Строки отмечены метками исходных данных, на основном листе - позиции строк
+            positions = data.index.get_indexer(marked.index)
+            mask = np.zeros(rows, dtype=bool)
+            mask[positions[positions >= 0]] = True
+            highlighting.append((service['fio_col'], mask, color))
+    return highlighting
+
+def run_service(name, frame, ad_employees_df, ad_all_df, selected):
+    """Результат сервиса: данные для основного листа, показатели и внутренние дубликаты"""
+    if not selected:
+        return empty_frame(name), {}, None
+    data = frame
+    results = process_source(name, data, ad_employees_df, ad_all_df)
+    
+    duplicate_df = None
+    fio_col = SERVICES[name]['fio_col']
+    if fio_col in data.columns:
+        service_fio_data = data[[fio_col]].dropna(subset=[fio_col])
+        fio_index = name_index(service_fio_data, fio_col)
+        duplicates = fio_index.duplicates()
+        if duplicates:
+            duplicate_df = service_fio_data.iloc[fio_index.rows(duplicates)]
+    return data, results, duplicate_df
+
+def lookup_results(names, state, fingerprint, employee_types):
+    """Результаты сервисов из кэша: (попадания, ключи промахов для сохранения)"""
+    hits, keys = [], {}
+    for name in names:
+        key = result_key(name, source_file(name), fingerprint, employee_types)
+        cached = load_result(name, key)
+        if cached is None:
+            keys[name] = key
+        else:
+            state['service_results'][name] = cached
+            hits.append(name)
+    return hits, keys
+
+def ad_frame(names, statuses, employee_types):
+    """Объединенный DataFrame AD сотрудников указанных типов (AD_ФИО, AD_Статус)"""
+    ad_data = [
+        {'AD_ФИО': name, 'AD_Статус': status}
+        for employee_type in AD_FILES if employee_type in employee_types
+        for name, status in zip(names[employee_type], statuses[employee_type])
+    ]
+    if ad_data:
+        return pd.DataFrame(ad_data)
+    return pd.DataFrame(columns=['AD_ФИО', 'AD_Статус'])
+
+def load_ad_data(employee_types):
+    """Сотрудники и ГПХ из файлов экспорта AD.
+    
+    Оба файла читаются всегда: кандидаты на удаление ищутся по всем пользователям AD
+    (иначе активные ГПХ попали бы в списки на удаление при выборе только сотрудников),
+    а выбор типов действует на листы сравнения и дубликаты с AD.
+    """
+    names, statuses, sources = {}, {}, {}
+    selected = {employee_type for employee_type in AD_FILES if type_selected(employee_type, employee_types)}
+    with stage("read_ad") as record:
+        for employee_type, (filename, name_col, status_col) in AD_FILES.items():
+            names[employee_type], statuses[employee_type] = read_names_and_statuses_from_file(filename)
+            # Каждый источник хранится в своем DataFrame реальной длины (на основном листе - только выбранные типы)
+            shown = employee_type in selected
+            sources[employee_type] = pd.DataFrame({
+                name_col: pd.Series(names[employee_type] if shown else [], dtype=object).apply(replace_yo),
+                status_col: pd.Series(statuses[employee_type] if shown else [], dtype=object)
+            })
+        record['rows'] = sum(len(type_names) for type_names in names.values())
+    
+    # Сравнение с AD и дубликаты - по выбранным типам, поиск на удаление - по всем
+    ad_employees_df = ad_frame(names, statuses, selected)
+    ad_all_df = ad_employees_df if selected == set(AD_FILES) else ad_frame(names, statuses, set(AD_FILES))
+    
+    return {
+        'employees_names': names[1] if 1 in selected else [],
+        'ad_employees_source': sources[1],
+        'ad_gph_source': sources[2],
+        'ad_employees_df': ad_employees_df,
+        'ad_all_df': ad_all_df,
+        'files': [filename for filename, _, _ in AD_FILES.values()]
+    }
 
-def read_names_and_statuses_from_file(filename):
-    """Чтение имен и статусов из файла в формате 'Name: ФИО' и 'Status: Статус'"""
-    names = []
-    statuses = []
-    current_name = None
-    current_status = "Неизвестно"
-    
-    try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('Name:'):
-                    # Если уже есть текущее имя, сохраняем его с текущим статусом
-                    if current_name is not None:
-                        names.append(current_name)
-                        statuses.append(current_status)
-                    current_name = line.split(':', 1)[1].strip()
-                    current_status = "Неизвестно"  # Сбрасываем статус для нового имени
-                elif line.startswith('Status:'):
-                    current_status = line.split(':', 1)[1].strip()
-            
-            # Добавляем последнее имя, если оно есть
-            if current_name is not None:
-                names.append(current_name)
-                statuses.append(current_status)
-                
-        return names, statuses
-    except Exception as e:
-        print(f"Ошибка при чтении файла {filename}: {e}")
-        return [], []
+def services_snapshot(results, service_duplicates):
+    """Записи на удаление и дубликаты проверенных сервисов для истории запусков"""
+    services = {}
+    for name, service in SERVICES.items():
+        remove_key = f"users_to_remove_{service['key']}"
+        if remove_key not in results:
+            continue
+        services[name] = {
+            'remove': keyed_rows(results[remove_key], service['fio_col'], service['status_col']),
+            'duplicates': keyed_rows(service_duplicates[name], service['fio_col'])
+        }
+    return services
 
-def process_excel_data(selected_options=None, employee_types=None):
-    """Основная функция обработки Excel данных"""
+def new_state():
+    """Данные, которые режим наблюдения хранит между пересчетами"""
+    return {'ad': None, 'frames': {}, 'service_results': {}}
+
+def process_excel_data(selected_options=None, employee_types=None, state=None, changed=None, output_file=None,
+                       formats=None):
+    """Основная функция обработки Excel данных.
+    
+    state - данные прошлого запуска (режим наблюдения): перечитываются только источники
+    из changed ('ad', 'shtat', 'onec', 'kontur', 'diadoc'), а сервисы пересчитываются,
+    только если изменились их файлы или AD. Результаты сервисов, кроме того, берутся из кэша
+    результатов, если их входной файл, AD и настройки совпадают с одним из прошлых запусков.
+    formats - форматы отчета (xlsx, csv, jsonl, parquet; по умолчанию REPORT_FORMATS).
+    """
     if selected_options is None:
         selected_options = {0}  # По умолчанию проверяем всё
     
     if employee_types is None:
         employee_types = {0}  # По умолчанию все типы сотрудников
     
-    # Создаем новый DataFrame с нужной структурой
-    df = pd.DataFrame(index=range(MAX_ROWS), columns=[
-        'Штатное_ФИО',
-        'AD_сотрудники',
-        'AD_Статус_сотрудники',
-        'AD_ГПХ',
-        'AD_Статус_ГПХ',
-        'Контур_ФИО',
-        'Контур_Администратор',
-        'Контур_статус',
-        'Диадок_ФИО',
-        'Диадок_Активен',
-        'Диадок_Администратор',
-        '1C_ФИО',
-        '1C_Активен'
+    # Рабочие каталоги создаются при запуске обработки (импорт config их не создает)
+    ensure_directories()
+    if output_file is None:
+        output_file = report_file()
+    
+    if formats is None:
+        formats = REPORT_FORMATS
+    
+    # Хранилище SQLite само переиспользует таблицы неизменившихся источников
+    if RECONCILE_BACKEND == "sqlite":
+        return process_with_store(selected_options, employee_types, output_file, formats)
+    
+    if state is None or changed is None:
+        state = state if state is not None else new_state()
+        state.update(new_state())
+        changed = None
+        # Нормализованные ключи ФИО считаются заново для каждого запуска
+        reset_name_cache()
+    
+    # AD перечитывается при первом запуске и при изменении файлов экспорта
+    reload_ad = changed is None or 'ad' in changed or state['ad'] is None
+    if reload_ad:
+        state['ad'] = load_ad_data(employee_types)
+        if RESULT_CACHE_ENABLED:
+            state['ad']['fingerprint'] = ad_fingerprint(state['ad']['files'])
+    ad = state['ad']
+    employees_names = ad['employees_names']
+    ad_employees_df = ad['ad_employees_df']
+    
+    # Сервисы, результат которых устарел: он берется из кэша результатов или пересчитывается
+    needed = selected_sources(selected_options, employee_types)
+    stale = [
+        name for name in SERVICES
+        if reload_ad or name in changed or name not in state['service_results']
+    ]
+    hits, keys = [], {}
+    if RESULT_CACHE_ENABLED:
+        hits, keys = lookup_results([name for name in stale if name in needed], state,
+                                    ad.get('fingerprint'), employee_types)
+    recompute = [name for name in stale if name not in hits]
+    
+    # Все нужные источники загружаются параллельно до начала сравнения
+    # (файлы сервисов с результатом из кэша не читаются)
+    sources = [
+        name for name in needed
+        if (name not in SERVICES or name in recompute)
+        and (changed is None or name in changed or name not in state['frames'])
+    ]
+    frames = {}
+    if sources:
+        with stage("load_sources"):
+            frames, errors = load_sources(sources)
+        if errors:
+            for name, error in errors.items():
+                print(f"Ошибка загрузки источника {name}: {error}")
+            raise next(iter(errors.values()))
+    
+    state['frames'].update(frames)
+    shtat_data = state['frames'].get('shtat', empty_frame('shtat'))
+    
+    # Обработка данных из различных источников (пересчитываются только затронутые сервисы)
+    for name in recompute:
+        state['service_results'][name] = run_service(
+            name, state['frames'].get(name), ad_employees_df, ad['ad_all_df'], name in needed
+        )
+        if name in keys:
+            save_result(name, keys[name], state['service_results'][name])
+    
+    if hits or keys:
+        logging.info(
+            f"Кэш результатов: попаданий {len(hits)} ({', '.join(hits) or '-'}), "
+            f"промахов {len(keys)} ({', '.join(keys) or '-'})"
+        )
+    
+    results = {}
+    service_data = {}
+    service_duplicates = {}
+    for name in SERVICES:
+        service_data[name], service_results, service_duplicates[name] = state['service_results'][name]
+        results.update(service_results)
+    
+    # Основной лист собирается из источников только при записи
+    df = build_comparison_frame([
+        shtat_data[['Штатное_ФИО']],
+        ad['ad_employees_source'],
+        ad['ad_gph_source'],
+        *service_data.values()
     ])
     
-    # Чтение сотрудников из AD с фильтрацией по типам
-    employees_names, employees_statuses = read_names_and_statuses_from_file(EMPLOYEES_FILE)
-    gph_names, gph_statuses = read_names_and_statuses_from_file(GPH_FILE)
-    
-    # Заполняем столбцы AD
-    df['AD_сотрудники'] = pd.Series(employees_names)
-    df['AD_Статус_сотрудники'] = pd.Series(employees_statuses)
-    df['AD_ГПХ'] = pd.Series(gph_names)
-    df['AD_Статус_ГПХ'] = pd.Series(gph_statuses)
-    
-    # Создаем объединенный DataFrame AD сотрудников для сравнения
-    ad_employees_data = []
-    
-    # Добавляем сотрудников, если выбраны
-    if 1 in employee_types or 0 in employee_types:
-        for i, name in enumerate(employees_names):
-            if i < len(employees_statuses):
-                ad_employees_data.append({'AD_ФИО': name, 'AD_Статус': employees_statuses[i]})
-    
-    # Добавляем ГПХ, если выбраны
-    if 2 in employee_types or 0 in employee_types:
-        for i, name in enumerate(gph_names):
-            if i < len(gph_statuses):
-                ad_employees_data.append({'AD_ФИО': name, 'AD_Статус': gph_statuses[i]})
-    
-    # Создаем DataFrame для сравнения
-    if ad_employees_data:
-        ad_employees_df = pd.DataFrame(ad_employees_data)
-    else:
-        ad_employees_df = pd.DataFrame(columns=['AD_ФИО', 'AD_Статус'])
-    
-    # Загружаем данные из штатного расписания
-    shtat_data = load_shtat_data()
-    if not shtat_data.empty:
-        df['Штатное_ФИО'] = pd.Series(shtat_data['Штатное_ФИО'])
-    
-    # Обработка данных из различных источников
-    df, _ = process_onec_data(df, ad_employees_df, selected_options, employee_types)
-    df, _ = process_kontur_data(df, ad_employees_df, selected_options, employee_types)
-    df, _ = process_diadoc_data(df, ad_employees_df, selected_options, employee_types)
-    
-    # Замена ё на е во всех столбцах с ФИО
-    for col in ['Штатное_ФИО', 'AD_сотрудники', 'AD_ГПХ', 'Контур_ФИО', 'Диадок_ФИО', '1C_ФИО']:
-        if col in df.columns:
-            df.loc[:, col] = df[col].apply(lambda x: replace_yo(x) if pd.notna(x) else x)
-    
-    # Удаляем полностью пустые строки
-    df = df.replace('', np.nan).dropna(how='all')
-    
-    # Сохранение основного листа
-    df.to_excel(OUTPUT_FILE, sheet_name=SHEET_NAME, index=False)
+    # Лист сравнения AD и штатки строится при записи отчета
+    shtat_names = shtat_data['Штатное_ФИО'].tolist() if not shtat_data.empty else []
+    return write_results(
+        df, lambda report: create_comparison_sheet(employees_names, shtat_names, report),
+        service_data, service_duplicates, results, selected_options, employee_types, output_file, formats
+    )
+
+def process_with_store(selected_options, employee_types, output_file, formats):
+    """Сверка через хранилище SQLite: таблицы переиспользуются, пока не изменились входные файлы"""
+    # Основной лист и данные систем читаются курсорами при записи - хранилище открыто до ее конца
+    with ReconciliationStore() as store:
+        reconciled = store.reconcile(selected_options, employee_types)
+        
+        def add_comparison(report):
+            if reconciled['missing_in_shtat'] is None:
+                return 0
+            return add_comparison_sheet(reconciled['missing_in_shtat'], report)
+        
+        return write_results(
+            reconciled['main_sheet'], add_comparison, reconciled['service_data'],
+            reconciled['service_duplicates'], reconciled['results'], selected_options, employee_types, output_file,
+            formats
+        )
+
+def write_results(df, add_comparison, service_data, service_duplicates, results, selected_options,
+                  employee_types, output_file, formats):
+    """Запись отчета в выбранных форматах: основной лист df, сравнение AD и штатки, листы сервисов и отчет изменений.
+    
+    df и данные систем - DataFrame или ChunkedFrame (читается частями при записи).
+    """
+    # Все листы собираются в отчет и записываются в файл один раз
+    report = ReportWriter()
+    highlighting = service_highlighting(service_data, service_duplicates, results, len(df)) if REPORT_HIGHLIGHT else None
+    report.add_sheet(SHEET_NAME, df, highlighting)
     
     # Создание листа сравнения AD и Штатного расписания
-    shtat_names = shtat_data['Штатное_ФИО'].tolist() if not shtat_data.empty else []
-    comparison_count = create_comparison_sheet(employees_names, shtat_names, OUTPUT_FILE)
-    
-    # Создаем набор всех AD имен для сравнения
-    all_ad_names = set()
-    for col in ['AD_сотрудники', 'AD_ГПХ']:
-        if col in df.columns:
-            names = df[col].dropna().apply(normalize_name)
-            all_ad_names.update(names)
-    
-    # Сохранение результатов в отдельные листы
-    with pd.ExcelWriter(OUTPUT_FILE, engine='openpyxl', mode='a') as writer:
-        # Обрабатываем каждый сервис
-        services = [
-            {
-                'name': 'Контур',
-                'fio_col': 'Контур_ФИО',
-                'status_col': 'Контур_статус',
-                'active_value': 'активна',
-                'remove_sheet': 'удалить из Контура',
-                'duplicates_sheet': 'дубли в Контуре'
-            },
-            {
-                'name': 'Диадок',
-                'fio_col': 'Диадок_ФИО',
-                'status_col': 'Диадок_Активен',
-                'active_value': 'Да',
-                'remove_sheet': 'удалить из Диадока',
-                'duplicates_sheet': 'дубли в Диадоке'
-            },
-            {
-                'name': '1С',
-                'fio_col': '1C_ФИО',
-                'status_col': '1C_Активен',
-                'active_value': 'Да',
-                'remove_sheet': 'удалить из 1С',
-                'duplicates_sheet': 'дубли в 1С'
-            }
-        ]
+    comparison_count = add_comparison(report)
+    
+    # Результаты по сервисам в отдельные листы
+    for name, service in SERVICES.items():
+        data = service_data[name]
+        fio_col = service['fio_col']
+        remove_sheet = service['remove_sheet']
+        duplicates_sheet = service['duplicates_sheet']
         
-        for service in services:
-            fio_col = service['fio_col']
-            status_col = service['status_col']
-            active_value = service['active_value']
-            remove_sheet = service['remove_sheet']
-            duplicates_sheet = service['duplicates_sheet']
-            
-            # Пропускаем если столбцы не существуют
-            if fio_col not in df.columns:
-                print(f"Пропускаем {service['name']}: столбец {fio_col} не найден")
-                continue
-            
-            # 1. Поиск и сохранение дубликатов
-            service_fio_data = df[[fio_col]].dropna(subset=[fio_col])
-            duplicates = find_internal_duplicates(service_fio_data, fio_col)
-            if duplicates:
-                duplicate_df = service_fio_data[service_fio_data[fio_col].apply(normalize_name).isin(duplicates)]
-                if not duplicate_df.empty:
-                    duplicate_df.to_excel(writer, sheet_name=duplicates_sheet, index=False)
-                    print(f"Создан лист {duplicates_sheet} с {len(duplicate_df)} записями")
-            
-            # 2. Поиск и сохранение пользователей для удаления
-            if status_col not in df.columns:
-                print(f"Пропускаем {remove_sheet}: столбец {status_col} не найден")
-                continue
-                
-            # Берем только строки с заполненным ФИО
-            service_data = df[[fio_col, status_col]].dropna(subset=[fio_col])
-            # Приводим статус к строке и обрезаем пробелы
-            service_data.loc[:, status_col] = service_data[status_col].astype(str).str.strip()
-            
-            # Фильтруем: активные пользователи, которых нет в AD
-            mask = (service_data[status_col].str.lower() == active_value.lower()) & \
-                (~service_data[fio_col].apply(normalize_name).isin(all_ad_names))
-            users_to_remove = service_data[mask]
-            
-            if not users_to_remove.empty:
-                users_to_remove.to_excel(writer, sheet_name=remove_sheet, index=False)
-                print(f"Создан лист {remove_sheet} с {len(users_to_remove)} записями")
-            else:
-                print(f"Нет данных для листа {remove_sheet}")
+        # Пропускаем если столбцы не существуют
+        if fio_col not in data.columns:
+            print(f"Пропускаем {service['title']}: столбец {fio_col} не найден")
+            continue
+        
+        # 1. Сохранение дубликатов (найдены вместе с результатом сервиса)
+        duplicate_df = service_duplicates[name]
+        if duplicate_df is not None and not duplicate_df.empty:
+            report.add_sheet(duplicates_sheet, duplicate_df)
+            print(f"Создан лист {duplicates_sheet} с {len(duplicate_df)} записями")
+        
+        # 2. Сохранение пользователей для удаления (рассчитаны обработчиком сервиса)
+        remove_key = f"users_to_remove_{service['key']}"
+        if remove_key not in results:
+            print(f"Пропускаем {remove_sheet}: сервис не выбран")
+            continue
         
-        # Дополнительная проверка для Контура
-        if 'Контур_ФИО' in df.columns and 'Контур_статус' in df.columns:
-            kontur_data = df[['Контур_ФИО', 'Контур_статус']].dropna(subset=['Контур_ФИО'])
-            kontur_data.loc[:, 'Контур_статус'] = kontur_data['Контур_статус'].astype(str).str.strip()
-            
-            # Проверяем, есть ли активные пользователи в Контуре
-            active_kontur_users = kontur_data[kontur_data['Контур_статус'].str.lower() == 'активна']
-            print(f"Активных пользователей в Контуре: {len(active_kontur_users)}")
-            
-            # Проверяем, сколько из них нет в AD
-            kontur_users_not_in_ad = active_kontur_users[
-                ~active_kontur_users['Контур_ФИО'].apply(normalize_name).isin(all_ad_names)
-            ]
-            print(f"Активных пользователей в Контуре, которых нет в AD: {len(kontur_users_not_in_ad)}")
+        users_to_remove = results[remove_key]
         
-    return {'comparison_count': comparison_count}
\ No newline at end of file
+        if not users_to_remove.empty:
+            report.add_sheet(remove_sheet, users_to_remove)
+            print(f"Создан лист {remove_sheet} с {len(users_to_remove)} записями")
+        else:
+            print(f"Нет данных для листа {remove_sheet}")
+        
+        # 3. Похожие на AD записи со степенью сходства (только при нечетком сопоставлении)
+        fuzzy_matches = results.get(f"fuzzy_matches_{service['key']}")
+        if fuzzy_matches is not None and not fuzzy_matches.empty:
+            report.add_sheet(service['fuzzy_sheet'], fuzzy_matches)
+            print(f"Создан лист {service['fuzzy_sheet']} с {len(fuzzy_matches)} записями")
+
+        # 4. Дополнительная проверка для Контура: активные учетные записи и те из них, которых нет в AD
+        if name == 'kontur':
+            status_rule = (service['status_col'], service['active_value'])
+            service_active = sum(int(active_mask(chunk.dropna(subset=[fio_col]), status_rule).sum())
+                                 for chunk in sheet_chunks(data))
+            print(f"Активных пользователей в {service['title_in']}: {service_active}")
+            print(f"Активных пользователей в {service['title_in']}, которых нет в AD: {len(users_to_remove)}")
+    
+    # Запись отчета
+    with stage("write_report") as record:
+        report.save(output_file, formats)
+        record['rows'] = sum(len(df) for _, df in report.sheets)
+    
+    # Отчет изменений относительно прошлого запуска
+    if RUN_HISTORY_ENABLED:
+        with stage("delta_report"):
+            record_run(services_snapshot(results, service_duplicates), selected_options, employee_types, SERVICES,
+                       output_file, formats)
+    
+    results['comparison_count'] = comparison_count
+    return results
\ No newline at end of file
@@ -0,0 +1,151 @@
+# fuzzy_match.py
+import heapq
+from collections import Counter, defaultdict
+from config import FUZZY_THRESHOLD, FUZZY_CANDIDATES, FUZZY_MAX_POSTING
+
+# Латинские буквы, которые в ФИО выглядят как кириллические (ключи уже в верхнем регистре)
+LOOKALIKES = str.maketrans('ABCEHKMOPTXY', 'АВСЕНКМОРТХУ')
+
+# Окончания отчеств (и тюркские "оглы"/"кызы" отдельным словом)
+PATRONYMIC_ENDINGS = ('ВИЧ', 'ВНА', 'ИЧНА', 'ОГЛЫ', 'КЫЗЫ')
+
+def variants(key):
+    """Строки для сравнения ключа ФИО.
+
+    Слова сортируются (порядок фамилии и имени не важен), дефис считается
+    пробелом; для двойной фамилии добавляется вариант только с первой частью.
+    """
+    text = key.translate(LOOKALIKES)
+    words = text.split()
+    result = {' '.join(sorted(text.replace('-', ' ').split()))}
+    if words and '-' in words[0]:
+        result.add(' '.join(sorted([words[0].split('-')[0]] + words[1:])))
+    return result
+
+def name_words(key):
+    """Слова ключа ФИО: латиница заменена кириллицей, дефис - пробел"""
+    return key.translate(LOOKALIKES).replace('-', ' ').split()
+
+def patronymic(words):
+    return next((word for word in words if word.endswith(PATRONYMIC_ENDINGS)), None)
+
+def may_be_same_person(words, other_words):
+    """Похожие ФИО могут принадлежать одному человеку: отчества (если они есть у обоих)
+    совпадают, а без отчества совпадает хотя бы одно слово целиком"""
+    own, other = patronymic(words), patronymic(other_words)
+    if own and other:
+        return own == other
+    return not set(words).isdisjoint(other_words)
+
+def same_patronymic(name, other_name):
+    """Отчества полных ФИО совпадают или хотя бы в одном из них отчества нет"""
+    own = patronymic(name_words(str(name).upper().replace('Ё', 'Е')))
+    other = patronymic(name_words(str(other_name).upper().replace('Ё', 'Е')))
+    return own is None or other is None or own == other
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def levenshtein(a, b, max_distance):
+    """Расстояние Левенштейна; если оно больше max_distance, возвращается max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def similarity(a, b, threshold=0.0):
+    """Сходство строк от 0 до 1 (1 - расстояние Левенштейна / длина большей строки)"""
+    longest = max(len(a), len(b))
+    if not longest:
+        return 1.0
+    # Допуск на погрешность float: 15 * (1 - 14/15) должно дать 1, а не 0.999...
+    max_distance = int(longest * (1 - threshold) + 1e-9)
+    return max(0.0, 1 - levenshtein(a, b, max_distance) / longest)
+
+class FuzzyIndex:
+    """Триграммный индекс ключей ФИО для поиска похожих без сравнения всех пар.
+
+    Кандидаты - ключи с наибольшим числом общих триграмм; слишком частые
+    триграммы (длиннее FUZZY_MAX_POSTING) не используются, поэтому работа
+    на один запрос не растет с размером справочника.
+    """
+    
+    def __init__(self, keys, max_posting=FUZZY_MAX_POSTING):
+        self.max_posting = max_posting
+        self.entries = []  # (вариант, исходный ключ, слова ключа)
+        self.postings = defaultdict(list)
+        for key in keys:
+            if not key:
+                continue
+            words = name_words(key)
+            for variant in variants(key):
+                entry_id = len(self.entries)
+                self.entries.append((variant, key, words))
+                for gram in trigrams(variant):
+                    self.postings[gram].append(entry_id)
+    
+    def best_match(self, key, threshold=FUZZY_THRESHOLD, candidates=FUZZY_CANDIDATES):
+        """Самый похожий ключ справочника и сходство (None, если сходство ниже порога).
+
+        При равенстве (общих триграмм, затем сходства) выбирается меньший по алфавиту
+        ключ, поэтому результат не зависит от порядка обхода и от бэкенда сверки.
+        """
+        if not key:
+            return None
+        query_variants = sorted(variants(key))
+        query_words = name_words(key)
+        counts = Counter()
+        for variant in query_variants:
+            for gram in trigrams(variant):
+                entry_ids = self.postings.get(gram)
+                if entry_ids and len(entry_ids) <= self.max_posting:
+                    counts.update(entry_ids)
+        
+        ranked = heapq.nsmallest(candidates, counts.items(), key=lambda item: (-item[1], self.entries[item[0]][:2]))
+        best_key, best_score = None, threshold
+        for entry_id, _ in ranked:
+            candidate, candidate_key, candidate_words = self.entries[entry_id]
+            if not may_be_same_person(query_words, candidate_words):
+                continue
+            score = max(similarity(variant, candidate, best_score) for variant in query_variants)
+            if score < best_score:
+                continue
+            if best_key is None or score > best_score or candidate_key < best_key:
+                best_key, best_score = candidate_key, score
+        return (best_key, best_score) if best_key is not None else None
+
+def match_names(names, keys, reference_names, threshold=FUZZY_THRESHOLD):
+    """Похожие записи справочника для полных ФИО: [(позиция, ФИО справочника, сходство)].
+
+    keys - ключи ФИО записей (фамилия и имя), reference_names - ключ справочника ->
+    его полные ФИО в порядке строк. Из ФИО справочника с найденным ключом берется
+    первое с тем же отчеством; если таких нет, запись не считается похожей.
+    """
+    matches = fuzzy_matches(keys, reference_names.keys(), threshold)
+    result = []
+    for position, (name, key) in enumerate(zip(names, keys)):
+        match = matches.get(key)
+        if match is None:
+            continue
+        reference_name = next((other for other in reference_names[match[0]] if same_patronymic(name, other)), None)
+        if reference_name is not None:
+            result.append((position, reference_name, match[1]))
+    return result
+
+def fuzzy_matches(query_keys, reference_keys, threshold=FUZZY_THRESHOLD):
+    """Похожие ключи справочника: ключ запроса -> (ключ справочника, сходство)"""
+    index = FuzzyIndex(reference_keys)
+    result = {}
+    for key in set(query_keys):
+        match = index.best_match(key, threshold)
+        if match is not None:
+            result[key] = match
+    return result
@@ -0,0 +1,146 @@
+# input_cache.py
+import hashlib
+import json
+import logging
+import os
+import pickle
+import time
+import pandas as pd
+from pathlib import Path
+from config import INPUT_CACHE_DIR, INPUT_CACHE_ENABLED, INPUT_CACHE_MAX_AGE_DAYS, INPUT_CACHE_REFRESH
+
+# Версия формата кэша: увеличить при изменении логики разбора файлов
+CACHE_VERSION = 2
+
+def _parquet_available():
+    """Есть ли движок Parquet (pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """Хэш содержимого файла"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _manifest_path(source_name):
+    """Отдельный манифест на источник: параллельные загрузчики не пишут в один файл"""
+    return INPUT_CACHE_DIR / f"{source_name}.json"
+
+def _load_manifest(source_name):
+    try:
+        with open(_manifest_path(source_name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _save_manifest(source_name, manifest):
+    path = _manifest_path(source_name)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def file_fingerprint(path, manifest):
+    """Отпечаток файла: путь, размер, время изменения и хэш содержимого.
+
+    Хэш пересчитывается, только если размер или время изменения отличаются от манифеста.
+    """
+    stat = path.stat()
+    known = manifest.get('file', {})
+    if known.get('path') == str(path) and known.get('size') == stat.st_size \
+            and known.get('mtime_ns') == stat.st_mtime_ns and known.get('sha256'):
+        sha256 = known['sha256']
+    else:
+        sha256 = file_sha256(path)
+    return {'path': str(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': sha256}
+
+def source_sha256(path, source_name):
+    """Хэш файла источника (по манифесту кэша без повторного чтения, если файл не менялся)"""
+    return file_fingerprint(path, _load_manifest(source_name))['sha256']
+
+def _write_entry(df, entry_base):
+    """Сохранение DataFrame: Parquet при наличии pyarrow, иначе pickle"""
+    if _parquet_available():
+        entry = entry_base.with_suffix('.parquet')
+        try:
+            df.to_parquet(entry, index=True)
+            return entry
+        except Exception as e:
+            # Например, столбец со смешанными типами значений
+            logging.info(f"Parquet недоступен для {entry.name}, используется pickle: {e}")
+            entry.unlink(missing_ok=True)
+    entry = entry_base.with_suffix('.pkl')
+    with open(entry, 'wb') as f:
+        pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return entry
+
+def _read_entry(entry):
+    if entry.suffix == '.parquet':
+        return pd.read_parquet(entry)
+    with open(entry, 'rb') as f:
+        return pickle.load(f)
+
+def evict_stale_entries(source_name=None, keep=()):
+    """Удаление устаревших записей кэша: других версий файла источника и давно неиспользуемых"""
+    if not INPUT_CACHE_DIR.exists():
+        return 0
+    
+    removed = 0
+    max_age = INPUT_CACHE_MAX_AGE_DAYS * 24 * 3600
+    now = time.time()
+    keep = {str(path) for path in keep}
+    for entry in INPUT_CACHE_DIR.iterdir():
+        if entry.suffix not in ('.parquet', '.pkl') or str(entry) in keep:
+            continue
+        other_version = source_name is not None and entry.name.startswith(f"{source_name}_")
+        # Время изменения записи обновляется при каждом попадании в кэш
+        if other_version or now - entry.stat().st_mtime > max_age:
+            entry.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+def clear_input_cache():
+    """Полная очистка кэша входных файлов"""
+    if not INPUT_CACHE_DIR.exists():
+        return
+    for entry in INPUT_CACHE_DIR.iterdir():
+        if entry.is_file():
+            entry.unlink()
+
+def load_cached(path, source_name, parse_func, refresh=None):
+    """Разобранный DataFrame файла из кэша или через parse_func (с сохранением в кэш)"""
+    if refresh is None:
+        refresh = INPUT_CACHE_REFRESH
+    if not INPUT_CACHE_ENABLED:
+        return parse_func(path)
+    
+    INPUT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(source_name)
+    fingerprint = file_fingerprint(path, manifest)
+    entry_base = INPUT_CACHE_DIR / f"{source_name}_{fingerprint['sha256'][:24]}_v{CACHE_VERSION}"
+    
+    entry = manifest.get('entry')
+    if not refresh and entry and manifest.get('file', {}).get('sha256') == fingerprint['sha256'] \
+            and manifest.get('version') == CACHE_VERSION and os.path.exists(entry):
+        try:
+            df = _read_entry(Path(entry))
+            os.utime(entry)
+            logging.info(f"Кэш: {path.name} загружен без разбора XLSX")
+            manifest['file'] = fingerprint
+            _save_manifest(source_name, manifest)
+            return df
+        except Exception as e:
+            logging.warning(f"Кэш {entry} поврежден и будет перестроен: {e}")
+    
+    df = parse_func(path)
+    entry = _write_entry(df, entry_base)
+    evict_stale_entries(source_name, keep=[entry])
+    _save_manifest(source_name, {'version': CACHE_VERSION, 'file': fingerprint, 'entry': str(entry)})
+    logging.info(f"Кэш: {path.name} разобран и сохранен")
+    return df
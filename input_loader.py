@@ -0,0 +1,54 @@
+# input_loader.py
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config import LOAD_EXECUTOR, LOAD_WORKERS
+from source_registry import load_source
+from profiling import stage, add_record, enable_profiling, is_enabled
+
+def _timed_load(name, profile):
+    """Загрузка одного источника с замером времени (выполняется в рабочем процессе)"""
+    if profile != is_enabled():
+        enable_profiling(profile)
+    start = time.perf_counter()
+    # Замер возвращается вызывающему: из рабочего процесса общий профиль недоступен
+    with stage(f"load_{name}", detached=True) as record:
+        frame = load_source(name)
+        record['rows'] = len(frame)
+    return frame, time.perf_counter() - start, record
+
+def _run(executor, names):
+    """Запуск загрузок в пуле; ошибки собираются по источникам"""
+    frames, errors, timings = {}, {}, {}
+    with executor:
+        futures = {name: executor.submit(_timed_load, name, is_enabled()) for name in names}
+        for name, future in futures.items():
+            try:
+                frames[name], timings[name], record = future.result()
+                add_record(record)
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                errors[name] = e
+    return frames, errors, timings
+
+def load_sources(names, executor=None, workers=None):
+    """Параллельная загрузка источников: (кадры, ошибки) по имени источника"""
+    executor = executor or LOAD_EXECUTOR
+    workers = min(workers or LOAD_WORKERS, len(names)) or 1
+    
+    start = time.perf_counter()
+    if executor == "process" and len(names) > 1:
+        try:
+            frames, errors, timings = _run(ProcessPoolExecutor(max_workers=workers), names)
+        except (BrokenProcessPool, OSError, NotImplementedError) as e:
+            # Процессы недоступны (ограничения среды) - читаем в потоках
+            print(f"Пул процессов недоступен ({e}), загрузка в потоках")
+            frames, errors, timings = _run(ThreadPoolExecutor(max_workers=workers), names)
+    else:
+        frames, errors, timings = _run(ThreadPoolExecutor(max_workers=workers), names)
+    elapsed = time.perf_counter() - start
+    
+    details = ", ".join(f"{name} {seconds:.2f} с" for name, seconds in timings.items())
+    print(f"Источники загружены за {elapsed:.2f} с ({details})")
+    return frames, errors
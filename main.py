@@ -1,28 +1,36 @@
 # main.py
+import argparse
 import logging
-import pandas as pd
-from config import INPUT_DIR, OUTPUT_DIR, OUTPUT_FILE
-from excel_processor import process_excel_data
-from ad_export import export_ad_users
+import time
+from config import OUTPUT_DIR, WATCH_INTERVAL, REPORT_FORMATS, ensure_directories, report_file
+from tenants import load_tenants, run_tenants
+from source_registry import SERVICES
+from profiling import save_profile, is_enabled
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(OUTPUT_DIR / "processing.log", encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+# pandas, openpyxl и модули обработки импортируются при первом использовании:
+# меню, --help и запуск организаций (--tenants) их не загружают
+
+# Номера систем в меню (0 - все)
+SERVICE_OPTIONS = sorted(spec['option'] for spec in SERVICES.values())
+
+def setup_logging():
+    """Настройка логирования: processing.log в каталоге результатов и консоль"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler(OUTPUT_DIR / "processing.log", encoding='utf-8'),
+            logging.StreamHandler()
+        ]
+    )
 
 def get_user_choice():
     """Получение выбора пользователя"""
     print("\n" + "="*50)
     print("Выберите опции для проверки (через пробел):")
     print("0 - Всё")
-    print("1 - 1С")
-    print("2 - Сфера (Диадок)")
-    print("3 - Контур")
+    for spec in sorted(SERVICES.values(), key=lambda spec: spec['option']):
+        print(f"{spec['option']} - {spec['menu']}")
     print("="*50)
     
     while True:
@@ -35,14 +43,14 @@ def get_user_choice():
         choices = choice.split()
         
         # Проверка на валидность ввода
-        valid_choices = {'0', '1', '2', '3'}
+        valid_choices = {str(option) for option in [0] + SERVICE_OPTIONS}
         if all(c in valid_choices for c in choices):
             # Если выбран 0, добавляем все остальные опции
             if '0' in choices:
-                return {0, 1, 2, 3}
+                return {0, *SERVICE_OPTIONS}
             return set(int(c) for c in choices)
         else:
-            print("Некорректный ввод. Пожалуйста, используйте цифры 0, 1, 2, 3 через пробел")
+            print(f"Некорректный ввод. Пожалуйста, используйте цифры {', '.join(sorted(valid_choices))} через пробел")
 
 def get_employee_type_choice():
     """Получение выбора типа сотрудников"""
@@ -72,16 +80,45 @@ def get_employee_type_choice():
         else:
             print("Некорректный ввод. Пожалуйста, используйте цифры 0, 1, 2 через пробел")
 
-def main():
-    logging.info("Запуск обработки данных")
-    
-    # Получаем выбор пользователя
-    selected_options = get_user_choice()
-    selected_employee_types = get_employee_type_choice()
-    logging.info(f"Выбранные опции: {selected_options}")
-    logging.info(f"Выбранные типы сотрудников: {selected_employee_types}")
+def parse_args(argv=None):
+    """Параметры командной строки (без них выбор запрашивается интерактивно)"""
+    parser = argparse.ArgumentParser(description="Сверка пользователей AD с ЭДО, 1С и штатным расписанием")
+    systems = ", ".join(f"{spec['option']} - {spec['title']}" for spec in sorted(SERVICES.values(), key=lambda spec: spec['option']))
+    parser.add_argument('--options', type=int, nargs='+', choices=[0] + SERVICE_OPTIONS,
+                        help=f"Проверяемые системы: 0 - всё, {systems}")
+    parser.add_argument('--types', type=int, nargs='+', choices=[0, 1, 2],
+                        help="Типы сотрудников: 0 - все, 1 - сотрудники, 2 - ГПХ")
+    parser.add_argument('--no-ad-export', action='store_true',
+                        help="Не выгружать AD, использовать уже выгруженные файлы")
+    parser.add_argument('--watch', action='store_true',
+                        help="Следить за входными каталогами и пересчитывать отчет при изменениях")
+    parser.add_argument('--formats', nargs='+', metavar='FORMAT',
+                        help="Форматы отчета: xlsx - книга Excel, форматы report_writer.SHEET_FORMATS - файл на лист "
+                             f"(по умолчанию {', '.join(REPORT_FORMATS)})")
+    parser.add_argument('--tenants', metavar='FILE',
+                        help="JSON со списком организаций: каждая обрабатывается в своем процессе")
+    parser.add_argument('--workers', type=int,
+                        help="Сколько организаций обрабатывать одновременно (по умолчанию - число ядер)")
+    args = parser.parse_args(argv)
+    if args.tenants and args.watch:
+        parser.error("--watch нельзя использовать вместе с --tenants")
+    if args.formats:
+        # Форматы проверяются по report_writer (он тянет pandas и openpyxl - только если форматы заданы)
+        from report_writer import SHEET_FORMATS
+        choices = ['xlsx', *SHEET_FORMATS]
+        unknown = [fmt for fmt in args.formats if fmt not in choices]
+        if unknown:
+            parser.error(f"неизвестный формат отчета: {', '.join(unknown)} (доступны: {', '.join(choices)})")
+    return args
+
+def expand_choice(choice, all_values):
+    """Выбор из командной строки в том же виде, что и из интерактивного меню"""
+    return set(all_values) if 0 in choice else set(choice)
+
+def run_ad_export():
+    """Экспорт данных из AD; при ошибке обработка продолжается с прежними файлами"""
+    from ad_export import export_ad_users
     
-    # Экспорт данных из AD (всегда выполняется)
     try:
         logging.info("Экспорт пользователей из Active Directory")
         total_users, employees_count, gph_count = export_ad_users()
@@ -89,32 +126,93 @@ def main():
     except Exception as e:
         logging.error(f"Ошибка при экспорте из AD: {e}")
         logging.info("Продолжение обработки с пустыми данными AD")
-        total_users, employees_count, gph_count = 0, 0, 0
+
+def log_results(results, selected_options):
+    """Итоги обработки в лог"""
+    logging.info("Обработка завершена. Результаты:")
+    for spec in sorted(SERVICES.values(), key=lambda spec: spec['option']):
+        if spec['option'] not in selected_options and 0 not in selected_options:
+            continue
+        key = spec['key']
+        logging.info(f"- Дубликаты между AD и {spec['title']}: {results.get(f'duplicates_ad_{key}', 0)}")
+        logging.info(f"- Внутренние дубликаты в {spec['title_in']}: {results.get(f'internal_duplicates_{key}', 0)}")
+        logging.info(f"- Пользователей для удаления из {spec['title_of']}: {len(results.get(f'users_to_remove_{key}', ()))}")
+    logging.info(f"- Несоответствий между AD и Штатным расписанием: {results.get('comparison_count', 0)}")
+
+def run_watch(selected_options, selected_employee_types, state, formats):
+    """Режим наблюдения: пересчет только изменившихся источников и новый отчет"""
+    from excel_processor import process_excel_data
+    from report_writer import report_paths
+    from watcher import watch
+    
+    def on_change(changed):
+        logging.info(f"Изменились входные данные: {', '.join(sorted(changed))}")
+        output_file = report_file()
+        start = time.perf_counter()
+        results = process_excel_data(selected_options, selected_employee_types,
+                                     state=state, changed=changed, output_file=output_file, formats=formats)
+        log_results(results, selected_options)
+        logging.info(f"Отчет обновлен за {time.perf_counter() - start:.1f} с: "
+                     f"{', '.join(map(str, report_paths(output_file, formats)))}")
+    
+    logging.info(f"Наблюдение за входными каталогами (опрос каждые {WATCH_INTERVAL} с, Ctrl+C - выход)")
+    try:
+        watch(on_change)
+    except KeyboardInterrupt:
+        logging.info("Наблюдение остановлено")
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Каталоги и логирование создаются при запуске, а не при импорте модулей
+    ensure_directories()
+    setup_logging()
+    logging.info("Запуск обработки данных")
+    
+    # Получаем выбор пользователя (из командной строки или интерактивно)
+    if args.options:
+        selected_options = expand_choice(args.options, [0] + SERVICE_OPTIONS)
+    else:
+        selected_options = get_user_choice()
+    if args.types:
+        selected_employee_types = expand_choice(args.types, [0, 1, 2])
+    else:
+        selected_employee_types = get_employee_type_choice()
+    logging.info(f"Выбранные опции: {selected_options}")
+    logging.info(f"Выбранные типы сотрудников: {selected_employee_types}")
+    formats = args.formats or REPORT_FORMATS
+    
+    # Несколько организаций: экспорт AD и обработка каждой в отдельном процессе
+    if args.tenants:
+        run_tenants(load_tenants(args.tenants), selected_options, selected_employee_types,
+                    ad_export=not args.no_ad_export, workers=args.workers, formats=args.formats)
+        return
+    
+    # Экспорт данных из AD (выполняется, если не отключен параметром)
+    if not args.no_ad_export:
+        run_ad_export()
     
     # Обработка Excel данных
+    from excel_processor import process_excel_data, new_state
+    from report_writer import report_paths
+    
+    state = new_state()
+    output_file = report_file()
     try:
         logging.info("Обработка Excel данных")
-        results = process_excel_data(selected_options, selected_employee_types)
-        
-        logging.info("Обработка завершена. Результаты:")
-        if 1 in selected_options or 0 in selected_options:
-            logging.info(f"- Дубликаты между AD и 1С: {results.get('duplicates_ad_1c', 0)}")
-            logging.info(f"- Внутренние дубликаты в 1С: {results.get('internal_duplicates_1c', 0)}")
-            logging.info(f"- Пользователей для удаления из 1С: {len(results.get('users_to_remove_1c', pd.DataFrame()))}")
-        if 2 in selected_options or 0 in selected_options:
-            logging.info(f"- Дубликаты между AD и Диадок: {results.get('duplicates_ad_diadoc', 0)}")
-            logging.info(f"- Внутренние дубликаты в Диадоке: {results.get('internal_duplicates_diadoc', 0)}")
-            logging.info(f"- Пользователей для удаления из Диадока: {len(results.get('users_to_remove_diadoc', pd.DataFrame()))}")
-        if 3 in selected_options or 0 in selected_options:
-            logging.info(f"- Дубликаты между AD и Контур: {results.get('duplicates_ad_kontur', 0)}")
-            logging.info(f"- Внутренние дубликаты в Контуре: {results.get('internal_duplicates_kontur', 0)}")
-            logging.info(f"- Пользователей для удаления из Контура: {len(results.get('users_to_remove_kontur', pd.DataFrame()))}")
-        logging.info(f"- Несоответствий между AD и Штатным расписанием: {results.get('comparison_count', 0)}")
-        
+        results = process_excel_data(selected_options, selected_employee_types, state=state,
+                                     output_file=output_file, formats=formats)
+        log_results(results, selected_options)
     except Exception as e:
         logging.error(f"Ошибка при обработке Excel: {str(e)}")
     
-    logging.info(f"Результаты сохранены в файл: {OUTPUT_FILE}")
+    logging.info(f"Результаты сохранены в: {', '.join(map(str, report_paths(output_file, formats)))}")
+    
+    if args.watch:
+        run_watch(selected_options, selected_employee_types, state, formats)
+    
+    # Профиль этапов (если включены замеры)
+    if is_enabled():
+        logging.info(f"Профиль этапов сохранен в файл: {save_profile()}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
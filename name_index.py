@@ -0,0 +1,61 @@
+# name_index.py
+import numpy as np
+import pandas as pd
+
+class NameIndex:
+    """Индекс источника: нормализованный ключ ФИО -> позиции исходных строк.
+
+    Строится один раз за O(n); пересечение, разность и поиск дублей
+    работают по ключам, а исходные строки берутся по позициям.
+    """
+    
+    def __init__(self, keys):
+        self.keys = keys  # Series нормализованных ключей в порядке строк источника
+        self.positions = keys.groupby(keys.to_numpy(), sort=False).indices if len(keys) else {}
+    
+    @classmethod
+    def from_names(cls, names, normalize):
+        """Индекс по списку ФИО (normalize - векторная нормализация Series)"""
+        return cls(normalize(pd.Series(names, dtype=object)))
+    
+    def __len__(self):
+        """Число различных ключей"""
+        return len(self.positions)
+    
+    def __contains__(self, key):
+        return key in self.positions
+    
+    def key_set(self):
+        return set(self.positions)
+    
+    def count(self, key):
+        """Сколько строк источника с этим ключом"""
+        rows = self.positions.get(key)
+        return 0 if rows is None else len(rows)
+    
+    def intersection(self, other):
+        """Ключи, которые есть в обоих источниках"""
+        return self.positions.keys() & other.positions.keys()
+    
+    def difference(self, other):
+        """Ключи этого источника, которых нет в другом"""
+        return self.positions.keys() - other.positions.keys()
+    
+    def duplicates(self):
+        """Ключи, встречающиеся в источнике больше одного раза"""
+        return {key for key, rows in self.positions.items() if len(rows) > 1}
+    
+    def isin(self, keys):
+        """Маска строк источника, ключ которых входит в keys"""
+        return self.keys.isin(keys).to_numpy()
+    
+    def rows(self, keys):
+        """Позиции строк с данными ключами в исходном порядке"""
+        found = [self.positions[key] for key in keys if key in self.positions]
+        if not found:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(found))
+    
+    def first_row(self, key):
+        """Позиция первой строки с ключом"""
+        return self.positions[key][0]
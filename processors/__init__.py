@@ -1,2 +0,0 @@
-# processors/__init__.py
-# Пустой файл для создания пакета
@@ -0,0 +1,129 @@
+# profiling.py
+import cProfile
+import functools
+import json
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from config import PROFILE_ENABLED, PROFILE_CPROFILE_STAGE, OUTPUT_DIR, run_timestamp
+
+try:
+    import resource  # Есть только на Unix
+except ImportError:
+    resource = None
+
+_enabled = PROFILE_ENABLED
+_records = []
+_records_lock = threading.Lock()
+_local = threading.local()  # Стек вложенных этапов текущего потока
+
+def enable_profiling(enabled=True):
+    """Включение/выключение замеров этапов"""
+    global _enabled
+    _enabled = enabled
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def is_enabled():
+    return _enabled
+
+def _max_rss_mb():
+    """Пиковый RSS процесса в МБ (None, если недоступен)"""
+    if resource is None:
+        return None
+    # В Linux ru_maxrss в КБ
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+@contextmanager
+def stage(name, detached=False):
+    """Замер этапа: время, процессорное время, пик памяти; строки записываются в record['rows'].
+
+    detached=True - запись не попадает в общий профиль, а остается в record
+    (для этапов в рабочих процессах, которые передают замер обратно).
+    """
+    record = {'stage': name, 'rows': None}
+    if not _enabled:
+        yield record
+        return
+    
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    
+    # Пик памяти родительского этапа сохраняется до сброса счетчика
+    current, peak = tracemalloc.get_traced_memory()
+    if stack:
+        stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+    tracemalloc.reset_peak()
+    frame = {'peak': 0, 'start_memory': current}
+    stack.append(frame)
+    
+    profiler = cProfile.Profile() if name == PROFILE_CPROFILE_STAGE else None
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(OUTPUT_DIR / f"cprofile_{name.replace(':', '_')}.prof")
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        stack.pop()
+        peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        
+        record.update({
+            'wall_s': round(wall, 4),
+            'cpu_s': round(cpu, 4),
+            'peak_mb': round((peak - frame['start_memory']) / 2**20, 2),
+            'max_rss_mb': _max_rss_mb(),
+            'depth': len(stack),
+        })
+        if not detached:
+            add_record(record)
+
+def profiled(name, rows=None):
+    """Декоратор этапа; rows(result) - число строк результата"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    record['rows'] = rows(result)
+                return result
+        return wrapper
+    return decorator
+
+def add_record(record):
+    """Добавление замера в профиль (в том числе полученного из рабочего процесса)"""
+    if record is None or 'wall_s' not in record:
+        return
+    with _records_lock:
+        _records.append(record)
+
+def reset_profile():
+    with _records_lock:
+        _records.clear()
+
+def save_profile(filename=None):
+    """Запись профиля запуска в JSON"""
+    if not _enabled:
+        return None
+    filename = filename or OUTPUT_DIR / f"профиль_{run_timestamp()}.json"
+    with _records_lock:
+        stages = list(_records)
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump({'stages': stages}, f, ensure_ascii=False, indent=2)
+    return filename
@@ -0,0 +1,235 @@
+# report_writer.py
+import csv
+import json
+import logging
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+from profiling import stage
+
+class ChunkedFrame:
+    """Лист, строки которого читаются частями при каждой записи (например, курсором SQLite) -
+    таблица не собирается в памяти целиком.
+    
+    chunks - функция без аргументов, возвращающая итератор DataFrame со столбцами columns.
+    """
+    
+    def __init__(self, columns, rows, chunks):
+        self.columns = pd.Index(columns)
+        self.index = pd.RangeIndex(rows)  # Позиции строк (для подсветки)
+        self.chunks = chunks
+    
+    def __len__(self):
+        return len(self.index)
+
+def sheet_chunks(df):
+    """Части листа: ChunkedFrame читается частями, DataFrame - целиком"""
+    return df.chunks() if isinstance(df, ChunkedFrame) else [df]
+
+def side_by_side(frames):
+    """Листы рядом друг с другом (каждый своей длины): части листов с одинаковыми номерами
+    склеиваются по столбцам; части всех листов, кроме последних, должны быть одного размера"""
+    columns = [column for frame in frames for column in frame.columns]
+    rows = max((len(frame) for frame in frames), default=0)
+    
+    def chunks():
+        readers = [iter(sheet_chunks(frame)) for frame in frames]
+        while True:
+            parts = [next(reader, None) for reader in readers]
+            if all(part is None for part in parts):
+                return
+            yield pd.concat([
+                pd.DataFrame(columns=frame.columns) if part is None else part.reset_index(drop=True)
+                for frame, part in zip(frames, parts)
+            ], axis=1)
+    
+    return ChunkedFrame(columns, rows, chunks)
+
+class ReportWriter:
+    """Отчет из нескольких листов: листы накапливаются и записываются за один проход"""
+    
+    def __init__(self):
+        self.sheets = []  # Пары (имя листа, DataFrame или ChunkedFrame) в порядке добавления
+        self.highlighting = {}  # Имя листа -> подсветка: [(столбец, маска строк, цвет RGB)]
+    
+    def add_sheet(self, sheet_name, df, highlighting=None):
+        """Добавление листа в отчет (запись происходит в save).
+        
+        highlighting - заливка ячеек столбца в строках маски (только в xlsx); позже указанная
+        подсветка перекрывает раньше указанную.
+        """
+        self.sheets.append((sheet_name, df))
+        if highlighting:
+            self.highlighting[sheet_name] = list(highlighting)
+    
+    def sheet_names(self):
+        """Имена добавленных листов"""
+        return [sheet_name for sheet_name, _ in self.sheets]
+    
+    def save(self, filename, formats=None):
+        """Запись отчета в выбранных форматах (по умолчанию только xlsx); возвращает созданные пути.
+        
+        xlsx - одна книга filename; csv, jsonl, parquet - файл на лист в каталоге filename без расширения.
+        """
+        formats = formats or ['xlsx']
+        unknown = [fmt for fmt in formats if fmt != 'xlsx' and fmt not in SHEET_FORMATS]
+        if unknown:
+            raise ValueError(f"Неизвестный формат отчета: {', '.join(unknown)}")
+        paths = []
+        if 'xlsx' in formats:
+            self.save_workbook(filename)
+            paths.append(filename)
+        sheet_formats = [fmt for fmt in SHEET_FORMATS if fmt in formats]
+        if 'parquet' in sheet_formats and not parquet_available():
+            logging.warning("Для отчета в Parquet нужен pyarrow - листы в Parquet не записываются")
+            sheet_formats.remove('parquet')
+        if sheet_formats:
+            directory = sheets_directory(filename)
+            directory.mkdir(parents=True, exist_ok=True)
+            for sheet_name, df in self.sheets:
+                for fmt in sheet_formats:
+                    extension, write = SHEET_FORMATS[fmt]
+                    with stage(f"write_{fmt}:{sheet_name}") as record:
+                        write(df, directory / f"{sheet_file_name(sheet_name)}{extension}")
+                        record['rows'] = len(df)
+            paths.append(directory)
+        return paths
+    
+    def save_workbook(self, filename):
+        """Потоковая запись всех листов (openpyxl write-only, память не растет с числом строк)"""
+        workbook = Workbook(write_only=True)
+        for sheet_name, df in self.sheets:
+            with stage(f"write_sheet:{sheet_name}") as record:
+                worksheet = workbook.create_sheet(title=sheet_name)
+                write_frame(worksheet, df, self.highlighting.get(sheet_name, ()))
+                record['rows'] = len(df)
+        with stage("save_workbook"):
+            workbook.save(filename)
+
+# Оформление заголовка как у DataFrame.to_excel
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                       top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+def header_cells(worksheet, columns):
+    """Ячейки заголовка листа"""
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(worksheet, value=str(column))
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+def iter_rows(df):
+    """Строки листа со значениями, пригодными для записи (пропуски -> пустые ячейки)"""
+    for chunk in sheet_chunks(df):
+        values = chunk.astype(object)
+        values = values.where(chunk.notna(), None)
+        yield from values.itertuples(index=False, name=None)
+
+# Заливки по цвету RGB (одна на цвет - в книге получается один стиль)
+_fills = {}
+
+def solid_fill(color):
+    """Сплошная заливка цвета RGB"""
+    if color not in _fills:
+        hex_color = ''.join(f"{component:02X}" for component in color)
+        _fills[color] = PatternFill(start_color=hex_color, end_color=hex_color, fill_type='solid')
+    return _fills[color]
+
+def column_fills(df, highlighting):
+    """Подсветка, сведенная по столбцам: позиция столбца -> заливка каждой строки (None - без заливки)"""
+    fills = {}
+    for column, mask, color in highlighting:
+        if column not in df.columns:
+            continue
+        position = df.columns.get_loc(column)
+        if position not in fills:
+            fills[position] = np.full(len(df), None, dtype=object)
+        fills[position][np.asarray(mask, dtype=bool)] = solid_fill(color)
+    return fills
+
+def write_frame(worksheet, df, highlighting=()):
+    """Запись DataFrame в лист write-only книги"""
+    if len(df.columns) == 0:
+        return
+    worksheet.append(header_cells(worksheet, df.columns))
+    fills = column_fills(df, highlighting)
+    if not fills:
+        for row in iter_rows(df):
+            worksheet.append(row)
+        return
+    
+    # Маски подсветки посчитаны заранее: ячейка со стилем создается только для подсвеченных значений
+    marked = np.logical_or.reduce([pd.notna(column_fill) for column_fill in fills.values()])
+    for position, row in enumerate(iter_rows(df)):
+        if marked[position]:
+            row = list(row)
+            for column, column_fill in fills.items():
+                fill = column_fill[position]
+                if fill is not None:
+                    cell = WriteOnlyCell(worksheet, value=row[column])
+                    cell.fill = fill
+                    row[column] = cell
+        worksheet.append(row)
+
+def sheets_directory(filename):
+    """Каталог файлов листов для отчета filename"""
+    return filename.with_suffix('')
+
+def report_paths(filename, formats):
+    """Пути, по которым будет записан отчет в выбранных форматах"""
+    formats = formats or ['xlsx']
+    paths = [filename] if 'xlsx' in formats else []
+    if any(fmt in SHEET_FORMATS for fmt in formats):
+        paths.append(sheets_directory(filename))
+    return paths
+
+def sheet_file_name(sheet_name):
+    """Имя файла листа (символы, недопустимые в именах файлов, заменяются на _)"""
+    return ''.join('_' if char in '\\/:*?"<>|' else char for char in sheet_name)
+
+def write_csv(df, path):
+    """Потоковая запись листа в CSV (UTF-8 с BOM - открывается в Excel без перекодировки)"""
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        if len(df.columns) == 0:
+            return
+        writer = csv.writer(f)
+        writer.writerow([str(column) for column in df.columns])
+        writer.writerows(iter_rows(df))
+
+def write_jsonl(df, path):
+    """Потоковая запись листа в JSON Lines: объект на строку, пропуски - null"""
+    columns = [str(column) for column in df.columns]
+    with open(path, 'w', encoding='utf-8') as f:
+        for row in iter_rows(df):
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + '\n')
+
+def write_parquet(df, path):
+    """Запись листа в Parquet (значения столбцов смешанных типов сохраняются текстом)"""
+    # Таблица Parquet записывается целиком
+    df = pd.concat(list(sheet_chunks(df)), ignore_index=True) if isinstance(df, ChunkedFrame) else df.copy()
+    df.columns = [str(column) for column in df.columns]
+    for column in df.columns[df.dtypes == object]:
+        df[column] = df[column].where(df[column].isna(), df[column].astype(str))
+    df.to_parquet(path, index=False)
+
+def parquet_available():
+    """Есть ли движок Parquet (pyarrow)"""
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+# Форматы с отдельным файлом на лист: расширение и функция записи
+SHEET_FORMATS = {
+    'csv': ('.csv', write_csv),
+    'jsonl': ('.jsonl', write_jsonl),
+    'parquet': ('.parquet', write_parquet)
+}
@@ -0,0 +1,71 @@
+# result_cache.py
+import hashlib
+import json
+import logging
+import os
+import pickle
+from config import RESULT_CACHE_DIR, RESULT_CACHE_ENABLED, RESULT_CACHE_KEEP, INPUT_CACHE_REFRESH
+from config import FUZZY_MATCHING, FUZZY_THRESHOLD, FUZZY_CANDIDATES, FUZZY_MAX_POSTING
+from input_cache import file_sha256, source_sha256
+
+# Версия формата результатов: увеличить при изменении логики сравнения или обработчиков
+RESULT_CACHE_VERSION = 2
+
+def ad_fingerprint(paths):
+    """Хэши файлов экспорта AD, по которым выполняется сравнение"""
+    return {path.name: file_sha256(path) if path.exists() else None for path in paths}
+
+def result_key(service, input_file, ad, employee_types):
+    """Ключ результата сервиса: его входной файл, AD, типы сотрудников и настройки сопоставления"""
+    parts = {
+        'version': RESULT_CACHE_VERSION,
+        'service': service,
+        'input': source_sha256(input_file, service) if input_file else None,
+        'ad': ad,
+        'employee_types': sorted(employee_types),
+        'fuzzy': [FUZZY_MATCHING, FUZZY_THRESHOLD, FUZZY_CANDIDATES, FUZZY_MAX_POSTING]
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _entry_path(service, key):
+    return RESULT_CACHE_DIR / f"{service}_{key[:24]}.pkl"
+
+def load_result(service, key):
+    """Сохраненный результат сервиса или None, если его нет"""
+    if not RESULT_CACHE_ENABLED or INPUT_CACHE_REFRESH:
+        return None
+    entry = _entry_path(service, key)
+    if not entry.exists():
+        return None
+    try:
+        with open(entry, 'rb') as f:
+            result = pickle.load(f)
+        os.utime(entry)
+        return result
+    except Exception as e:
+        logging.warning(f"Кэш результатов {entry.name} поврежден и будет перестроен: {e}")
+        return None
+
+def save_result(service, key, result):
+    """Сохранение результата сервиса; хранятся только RESULT_CACHE_KEEP последних вариантов"""
+    if not RESULT_CACHE_ENABLED:
+        return
+    RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    entry = _entry_path(service, key)
+    tmp_path = entry.with_suffix('.tmp')
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, entry)
+    
+    # Время изменения записи обновляется при каждом попадании в кэш
+    entries = sorted(RESULT_CACHE_DIR.glob(f"{service}_*.pkl"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for stale in entries[RESULT_CACHE_KEEP:]:
+        stale.unlink(missing_ok=True)
+
+def clear_result_cache():
+    """Полная очистка кэша результатов"""
+    if not RESULT_CACHE_DIR.exists():
+        return
+    for entry in RESULT_CACHE_DIR.iterdir():
+        if entry.is_file():
+            entry.unlink()
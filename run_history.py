@@ -0,0 +1,178 @@
+# run_history.py
+import gzip
+import json
+import logging
+from datetime import datetime
+import pandas as pd
+from config import RUN_HISTORY_DIR, RUN_HISTORY_KEEP
+from config import FUZZY_MATCHING, FUZZY_THRESHOLD, FUZZY_CANDIDATES, FUZZY_MAX_POSTING
+from report_writer import ReportWriter
+
+# Версия формата снимка результатов
+HISTORY_VERSION = 2
+
+# Лист со сводкой изменений по сервисам
+DELTA_SUMMARY_SHEET = "сводка изменений"
+
+# Листы изменений: ключ изменений, префикс имени листа, лист удаления (True) или дублей (False)
+DELTA_SHEETS = [
+    ('new_remove', 'новые - ', True),
+    ('resolved_remove', 'ушли - ', True),
+    ('new_duplicates', 'новые ', False),
+    ('resolved_duplicates', 'устраненные ', False)
+]
+
+def full_name_keys(series):
+    """Ключи записей: полное ФИО в верхнем регистре, ё -> е, одиночные пробелы"""
+    text = series.astype(str).str.upper().str.replace('Ё', 'Е', regex=False)
+    return text.str.split().str.join(' ')
+
+def keyed_rows(df, fio_col, status_col=None):
+    """Записи листа результата по ключу ФИО: {ключ: [ФИО, статус]} (первое вхождение)"""
+    if df is None or df.empty or fio_col not in df.columns:
+        return {}
+    df = df.dropna(subset=[fio_col])
+    names = df[fio_col].astype(str).tolist()
+    if status_col in df.columns:
+        statuses = df[status_col].where(df[status_col].notna(), None).astype(object).tolist()
+    else:
+        statuses = [None] * len(names)
+    rows = {}
+    for key, name, status in zip(full_name_keys(df[fio_col]), names, statuses):
+        rows.setdefault(key, [name, status if status is None else str(status)])
+    return rows
+
+def run_settings(selected_options, employee_types, sheets):
+    """Настройки, от которых зависят результаты: сравниваются только запуски с одинаковыми настройками"""
+    settings = {
+        'options': sorted(selected_options),
+        'employee_types': sorted(employee_types),
+        'status_rules': {name: [service['status_col'], service['active_value']] for name, service in sheets.items()},
+        'fuzzy': [FUZZY_MATCHING, FUZZY_THRESHOLD, FUZZY_CANDIDATES, FUZZY_MAX_POSTING]
+    }
+    # Вид после чтения из JSON, чтобы настройки сравнивались с сохраненными как есть
+    return json.loads(json.dumps(settings))
+
+def run_snapshot(services, settings):
+    """Компактный снимок результатов запуска: ключи записей на удаление и дубликатов по сервисам"""
+    return {
+        'version': HISTORY_VERSION,
+        'time': datetime.now().isoformat(timespec='seconds'),
+        'settings': settings,
+        'services': services
+    }
+
+def save_snapshot(snapshot, filename):
+    """Запись снимка (JSON в gzip); хранятся только RUN_HISTORY_KEEP последних снимков"""
+    RUN_HISTORY_DIR.mkdir(parents=True, exist_ok=True)
+    path = RUN_HISTORY_DIR / filename
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+    
+    for stale in sorted(RUN_HISTORY_DIR.glob("запуск_*.json.gz"), reverse=True)[RUN_HISTORY_KEEP:]:
+        stale.unlink(missing_ok=True)
+    return path
+
+def latest_snapshot(settings):
+    """Последний сохраненный снимок с теми же настройками (или None)"""
+    if not RUN_HISTORY_DIR.exists():
+        return None
+    # Имена снимков содержат время запуска, поэтому сортируются по времени
+    for path in sorted(RUN_HISTORY_DIR.glob("запуск_*.json.gz"), reverse=True):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            logging.warning(f"Снимок запуска {path.name} не читается и пропущен: {e}")
+            continue
+        if snapshot.get('version') == HISTORY_VERSION and snapshot.get('settings') == settings:
+            return snapshot
+    return None
+
+def diff_rows(previous, current):
+    """Записи, появившиеся в current, и записи, ушедшие из previous"""
+    added = [row for key, row in current.items() if key not in previous]
+    resolved = [row for key, row in previous.items() if key not in current]
+    return added, resolved
+
+def diff_runs(previous, current):
+    """Изменения по сервисам, которые проверялись в обоих запусках"""
+    delta = {}
+    for name, service in current['services'].items():
+        before = previous['services'].get(name)
+        if before is None:
+            continue
+        new_remove, resolved_remove = diff_rows(before['remove'], service['remove'])
+        new_duplicates, resolved_duplicates = diff_rows(before['duplicates'], service['duplicates'])
+        delta[name] = {
+            'new_remove': new_remove,
+            'resolved_remove': resolved_remove,
+            'new_duplicates': new_duplicates,
+            'resolved_duplicates': resolved_duplicates
+        }
+    return delta
+
+def _rows_frame(rows, fio_col, status_col=None):
+    if status_col is None:
+        return pd.DataFrame([row[0] for row in rows], columns=[fio_col])
+    return pd.DataFrame(rows, columns=[fio_col, status_col])
+
+def write_delta_report(delta, sheets, previous_time, filename, formats=None):
+    """Отчет изменений: сводка и листы только с изменившимися записями.
+    
+    sheets - описание сервисов (title, fio_col, status_col, remove_sheet, duplicates_sheet);
+    formats - форматы отчета, как у основного отчета.
+    """
+    report = ReportWriter()
+    summary = []
+    for name, changes in delta.items():
+        service = sheets[name]
+        summary.append({
+            'Система': service['title'],
+            'Новые на удаление': len(changes['new_remove']),
+            'Больше не на удаление': len(changes['resolved_remove']),
+            'Новые дубли': len(changes['new_duplicates']),
+            'Устраненные дубли': len(changes['resolved_duplicates'])
+        })
+    report.add_sheet(DELTA_SUMMARY_SHEET, pd.DataFrame(summary))
+    
+    for name, changes in delta.items():
+        service = sheets[name]
+        for key, prefix, status in DELTA_SHEETS:
+            sheet_name = prefix + (service['remove_sheet'] if status else service['duplicates_sheet'])
+            if changes[key]:
+                report.add_sheet(sheet_name, _rows_frame(
+                    changes[key], service['fio_col'], service['status_col'] if status else None
+                ))
+    report.save(filename, formats)
+    
+    changes = ", ".join(
+        f"{row['Система']}: +{row['Новые на удаление']}/-{row['Больше не на удаление']} на удаление, "
+        f"+{row['Новые дубли']}/-{row['Устраненные дубли']} дублей"
+        for row in summary
+    )
+    logging.info(f"Изменения с запуска {previous_time}: {changes or 'нет общих сервисов'}")
+    return filename
+
+def delta_file_for(output_file):
+    """Имя отчета изменений рядом с основным отчетом"""
+    stem = output_file.stem.replace("результат_обработки_", "", 1)
+    return output_file.with_name(f"изменения_{stem}{output_file.suffix}")
+
+def record_run(services, selected_options, employee_types, sheets, output_file, formats=None):
+    """Отчет изменений относительно прошлого запуска и снимок текущего (возвращает файл отчета или None)"""
+    settings = run_settings(selected_options, employee_types, sheets)
+    previous = latest_snapshot(settings)
+    snapshot = run_snapshot(services, settings)
+    delta_file = None
+    if previous is None and RUN_HISTORY_DIR.exists() and any(RUN_HISTORY_DIR.glob("запуск_*.json.gz")):
+        # Другие типы, системы или нечеткое сопоставление дали бы изменения, не связанные с каталогом
+        logging.info("Снимков прошлых запусков с теми же настройками нет, база сравнения сброшена; "
+                     "отчет изменений будет создан при следующем запуске с этими настройками")
+    elif previous is None:
+        logging.info("Снимок прошлого запуска не найден, отчет изменений будет создан при следующем запуске")
+    else:
+        delta_file = write_delta_report(diff_runs(previous, snapshot), sheets, previous['time'],
+                                        delta_file_for(output_file), formats)
+    save_snapshot(snapshot, f"запуск_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.json.gz")
+    return delta_file
\ No newline at end of file
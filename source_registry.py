@@ -0,0 +1,220 @@
+# source_registry.py
+from config import SHTAT_DIR, KONTUR_DIR, DIADOC_DIR, ONEC_DIR, FUZZY_MATCHING
+from profiling import stage
+
+# Реестр нужен меню, --help и режиму наблюдения, поэтому pandas, чтение XLSX
+# и функции сверки импортируются в функциях при первом использовании
+
+def yes_no(series):
+    """Булевы значения -> "да"/"нет" (прочие значения не меняются)"""
+    return series.astype(str).apply(
+        lambda x: 'да' if x.lower() in ['true', 'истина', '1', 'yes', 'да']
+        else 'нет' if x.lower() in ['false', 'ложь', '0', 'no', 'нет']
+        else x
+    )
+
+def filled(filled_value, empty_value):
+    """Статус по заполненности ячейки: непустая -> filled_value, пустая -> empty_value"""
+    def convert(series):
+        import pandas as pd
+        
+        return series.apply(lambda x: filled_value if pd.notna(x) and str(x).strip() != '' else empty_value)
+    return convert
+
+# Входные источники сверки. Новая система - новая запись:
+#   directory, pattern - где искать выгрузку (берется самый новый актуальный файл)
+#   columns - столбцы файла -> столбцы отчета (порядок задает порядок в отчете)
+#   converters - преобразование значений столбца отчета; drop_empty_names - отбросить строки без ФИО
+#   fio_col, status_col, active_value - ФИО и правило "учетная запись активна"
+#   option - номер системы в меню; employee_type - для источников без опции (нужен, если выбран этот тип)
+#   key - суффикс показателей в результатах (duplicates_ad_<key>, users_to_remove_<key>, ...)
+#   title, title_in, title_of - название для сообщений ("Контур", "в Контуре", "из Контура")
+SOURCES = {
+    'shtat': {
+        'title': 'штатное расписание',
+        'title_of': 'штатного расписания',
+        'directory': SHTAT_DIR,
+        'pattern': "*.xlsx",
+        'columns': {'Ф.И.О.': 'Штатное_ФИО'},
+        'fio_col': 'Штатное_ФИО',
+        'employee_type': 1  # Штатное расписание сверяется с сотрудниками AD
+    },
+    'kontur': {
+        'title': 'Контур',
+        'title_in': 'Контуре',
+        'title_of': 'Контура',
+        'menu': 'Контур',
+        'option': 3,
+        'key': 'kontur',
+        'directory': KONTUR_DIR,
+        'pattern': "*.xlsx",
+        'columns': {'ФИО': 'Контур_ФИО', 'Администратор': 'Контур_Администратор', 'Дата блокировки': 'Контур_статус'},
+        # Заполненная дата блокировки - учетная запись заблокирована
+        'converters': {'Контур_Администратор': yes_no, 'Контур_статус': filled('заблокирована', 'активна')},
+        'fio_col': 'Контур_ФИО',
+        'status_col': 'Контур_статус',
+        'active_value': 'активна',
+        'remove_sheet': 'удалить из Контура',
+        'duplicates_sheet': 'дубли в Контуре',
+        'fuzzy_sheet': 'похожие в Контуре'
+    },
+    'diadoc': {
+        'title': 'Диадок',
+        'title_in': 'Диадоке',
+        'title_of': 'Диадока',
+        'menu': 'Сфера (Диадок)',
+        'option': 2,
+        'key': 'diadoc',
+        'directory': DIADOC_DIR,
+        'pattern': "*.xlsx",
+        'columns': {'ФИО': 'Диадок_ФИО', 'Активен': 'Диадок_Активен', 'Администратор': 'Диадок_Администратор'},
+        'fio_col': 'Диадок_ФИО',
+        'status_col': 'Диадок_Активен',
+        'active_value': 'Да',
+        'remove_sheet': 'удалить из Диадока',
+        'duplicates_sheet': 'дубли в Диадоке',
+        'fuzzy_sheet': 'похожие в Диадоке'
+    },
+    'onec': {
+        'title': '1С',
+        'title_in': '1С',
+        'title_of': '1С',
+        'menu': '1С',
+        'option': 1,
+        'key': '1c',
+        'directory': ONEC_DIR,
+        'pattern': "*.xlsx",
+        'columns': {'Полное имя': '1C_ФИО', 'Вход в приложение разрешен': '1C_Активен'},
+        'drop_empty_names': True,
+        'converters': {'1C_Активен': filled('Да', 'Нет')},
+        'fio_col': '1C_ФИО',
+        'status_col': '1C_Активен',
+        'active_value': 'Да',
+        'remove_sheet': 'удалить из 1С',
+        'duplicates_sheet': 'дубли в 1С',
+        'fuzzy_sheet': 'похожие в 1С'
+    }
+}
+
+# Системы, которые сверяются с AD (выбираются в меню), в порядке листов отчета
+SERVICES = {name: spec for name, spec in SOURCES.items() if spec.get('option')}
+
+def type_selected(employee_type, employee_types):
+    """Выбран ли тип сотрудников (0 - все)"""
+    return 0 in employee_types or employee_type in employee_types
+
+def source_selected(spec, selected_options, employee_types):
+    """Нужен ли источник для выбранных систем и типов сотрудников"""
+    if spec.get('option') is None:
+        return type_selected(spec['employee_type'], employee_types)
+    return 0 in selected_options or spec['option'] in selected_options
+
+def selected_sources(selected_options, employee_types):
+    """Источники, которые нужно прочитать (остальные не читаются вовсе)"""
+    return [name for name, spec in SOURCES.items() if source_selected(spec, selected_options, employee_types)]
+
+def source_file(name):
+    """Самый новый актуальный файл источника (или None)"""
+    from utils import find_latest_file
+    
+    spec = SOURCES[name]
+    return find_latest_file(spec['directory'], spec['pattern'])
+
+def empty_frame(name):
+    """Пустые данные источника с его столбцами отчета"""
+    import pandas as pd
+    
+    return pd.DataFrame(columns=list(SOURCES[name]['columns'].values()))
+
+def read_source_file(name, path):
+    """Разбор файла источника: только нужные столбцы, переименование и преобразование значений"""
+    from xlsx_reader import read_columns
+    
+    return convert_frame(name, read_columns(path, list(SOURCES[name]['columns'])))
+
+def iter_source_chunks(name, path, chunk_size):
+    """Разбор файла источника частями по chunk_size строк (ё в ФИО уже заменена на е)"""
+    from utils import replace_yo
+    from xlsx_reader import iter_column_chunks
+    
+    spec = SOURCES[name]
+    for chunk in iter_column_chunks(path, list(spec['columns']), chunk_size):
+        df = convert_frame(name, chunk)
+        df[spec['fio_col']] = df[spec['fio_col']].apply(replace_yo)
+        yield df
+
+def convert_frame(name, df):
+    """Столбцы файла -> столбцы отчета с преобразованием значений"""
+    spec = SOURCES[name]
+    df = df.rename(columns=spec['columns'])[list(spec['columns'].values())]
+    if spec.get('drop_empty_names'):
+        df = df.dropna(subset=[spec['fio_col']])
+    df = df.copy()
+    for column, convert in spec.get('converters', {}).items():
+        df[column] = convert(df[column])
+    return df
+
+def load_source(name):
+    """Загрузка источника (через кэш разобранных файлов); ё в ФИО заменяется на е"""
+    from utils import replace_yo
+    from input_cache import load_cached
+    from xlsx_reader import HeaderNotFoundError
+    
+    spec = SOURCES[name]
+    try:
+        path = source_file(name)
+        if not path:
+            print(f"Актуальный файл {spec['title_of']} не найден")
+            return empty_frame(name)
+        df = load_cached(path, name, lambda path: read_source_file(name, path))
+    except HeaderNotFoundError:
+        # Изменившийся формат выгрузки не должен давать молча пустые данные
+        raise
+    except Exception as e:
+        print(f"Ошибка при загрузке данных {spec['title_of']}: {e}")
+        return empty_frame(name)
+    
+    df[spec['fio_col']] = df[spec['fio_col']].apply(replace_yo)
+    return df
+
+def process_source(name, data, ad_employees_df, ad_all_df=None):
+    """Сверка системы с AD: дубликаты, внутренние дубликаты и пользователи для удаления.
+    
+    ad_employees_df - AD выбранных типов сотрудников (дубликаты с AD), ad_all_df - все
+    пользователи AD (поиск на удаление; по умолчанию тот же ad_employees_df).
+    """
+    import pandas as pd
+    from utils import find_duplicates, find_internal_duplicates, find_users_to_remove, find_fuzzy_matches
+    
+    spec = SOURCES[name]
+    key = spec['key']
+    fio_col = spec['fio_col']
+    status_rule = (spec['status_col'], spec['active_value'])
+    
+    with stage(f"process_{name}") as record:
+        record['rows'] = len(data)
+        print(f"Обработка данных {spec['title_of']}...")
+        
+        results = {
+            f'duplicates_ad_{key}': 0,
+            f'internal_duplicates_{key}': 0,
+            f'users_to_remove_{key}': pd.DataFrame()
+        }
+        
+        if ad_all_df is None:
+            ad_all_df = ad_employees_df
+        
+        # Проверяем наличие необходимых данных в AD
+        if ad_all_df.empty or 'AD_ФИО' not in ad_all_df.columns:
+            print("Предупреждение: AD DataFrame пуст или не содержит столбец 'AD_ФИО'")
+            return results
+        
+        service_df = data[[fio_col, spec['status_col']]].dropna(subset=[fio_col])
+        results[f'duplicates_ad_{key}'] = len(find_duplicates(ad_employees_df, service_df, 'AD_ФИО', fio_col))
+        results[f'internal_duplicates_{key}'] = len(find_internal_duplicates(service_df, fio_col))
+        # На удаление - только те, кого нет в AD совсем, независимо от выбранных типов сотрудников
+        results[f'users_to_remove_{key}'] = find_users_to_remove(service_df, ad_all_df, ad_all_df, status_rule)
+        # Кандидаты, похожие на кого-то в AD (опечатки, латиница, порядок слов), - подсказка для проверки вручную
+        if FUZZY_MATCHING:
+            results[f'fuzzy_matches_{key}'] = find_fuzzy_matches(service_df, ad_all_df, ad_all_df, status_rule)
+        return results
@@ -0,0 +1,442 @@
+# sqlite_store.py
+import argparse
+import sqlite3
+from datetime import datetime
+from itertools import islice
+import pandas as pd
+from config import SQLITE_FILE, SQLITE_CHUNK_ROWS, EMPLOYEES_FILE, GPH_FILE, AD_SNAPSHOT_FILE, AD_EXPORT_TXT_FILE
+from config import SQLITE_SHEET_ROWS, FUZZY_MATCHING, ensure_directories
+from utils import normalize_names, active_mask, replace_yo, iter_names_and_statuses
+from fuzzy_match import fuzzy_matches, match_names
+from input_cache import CACHE_VERSION, file_sha256, source_sha256
+from ad_snapshot import load_snapshot
+from source_registry import SOURCES, SERVICES, source_file, iter_source_chunks, selected_sources, type_selected
+from xlsx_reader import HeaderNotFoundError
+from report_writer import ChunkedFrame, side_by_side
+from profiling import stage
+
+STORE_VERSION = 1  # Меняется при изменении схемы таблиц (таблицы загружаются заново)
+
+# Файлы экспорта AD по типу сотрудников: таблица, файл и столбцы основного листа
+AD_TABLES = {
+    1: ('ad_employees', EMPLOYEES_FILE, 'AD_сотрудники', 'AD_Статус_сотрудники'),
+    2: ('ad_gph', GPH_FILE, 'AD_ГПХ', 'AD_Статус_ГПХ')
+}
+AD_COLUMNS = ['AD_ФИО', 'AD_Статус']
+
+# Все пользователи AD (включая заблокированных) из полной выгрузки или снимка - для произвольных запросов
+AD_USERS_TABLE = 'ad_users'
+AD_USER_COLUMNS = ['Name', 'SamAccountName', 'Enabled', 'EmailAddress', 'Company', 'DistinguishedName']
+
+# Заблокированные в AD пользователи, учетные записи которых активны в системах
+BLOCKED_VIEW = 'blocked_in_ad_active'
+
+def quote(name):
+    """Имя таблицы или столбца в SQL"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+def sql_value(value):
+    """Значение ячейки для SQLite (неизвестные типы сохраняются текстом)"""
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+def with_keys(df, fio_col, active):
+    """Части таблицы: ключ ФИО (пустая строка для пропусков) и признак активной записи"""
+    return df.assign(name_key=normalize_names(df[fio_col]), active=active)
+
+def table_rows(df, columns, start):
+    """Строки для вставки: номер строки источника, ключ, активность и значения столбцов"""
+    values = df[columns].astype(object)
+    values = values.where(df[columns].notna(), None)
+    for row, key, active, cells in zip(range(start, start + len(df)), df['name_key'], df['active'],
+                                       values.itertuples(index=False, name=None)):
+        yield (row, key, int(bool(active)), *[sql_value(value) for value in cells])
+
+def record_chunks(records, columns, chunk_size):
+    """Записи (словари или кортежи) частями по chunk_size строк в виде DataFrame"""
+    records = iter(records)
+    while True:
+        df = pd.DataFrame(list(islice(records, chunk_size)), columns=columns)
+        if df.empty:
+            return
+        yield df
+
+def ad_users_file():
+    """Источник таблицы ad_users: полная выгрузка "txt" (пишется при любом экспорте), иначе снимок AD"""
+    return AD_EXPORT_TXT_FILE if AD_EXPORT_TXT_FILE.exists() else AD_SNAPSHOT_FILE
+
+def iter_export_records(filename):
+    """Потоковое чтение полной выгрузки "txt": блоки строк "Поле: значение" после разделителя"""
+    user = None
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if line.startswith('=' * 80):
+                if user is not None:
+                    yield user
+                user = {}
+                continue
+            field, separator, value = line.partition(': ')
+            if user is not None and separator and field in AD_USER_COLUMNS:
+                user[field] = value == "Активна" if field == 'Enabled' else value or None
+    if user is not None:
+        yield user
+
+class ReconciliationStore:
+    """Источники сверки в SQLite: таблица на источник с индексом по ключу ФИО.
+
+    Таблица загружается заново, только если изменился отпечаток ее входного файла;
+    источники читаются частями, поэтому объем данных не ограничен памятью.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename or SQLITE_FILE
+        # Транзакции открываются явно (загрузка таблицы - одна транзакция вместе с DDL)
+        self.connection = sqlite3.connect(self.filename, isolation_level=None)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints "
+            "(name TEXT PRIMARY KEY, fingerprint TEXT, rows INTEGER, loaded_at TEXT)"
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def query(self, sql, params=()):
+        """Результат запроса в виде DataFrame"""
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def scalar(self, sql, params=()):
+        return self.connection.execute(sql, params).fetchone()[0]
+
+    def tables(self):
+        return {row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+    def row_count(self, name):
+        """Число строк загруженной таблицы (0, если таблицы нет)"""
+        row = self.connection.execute("SELECT rows FROM fingerprints WHERE name = ?", (name,)).fetchone()
+        return row[0] if row and name in self.tables() else 0
+
+    def stored_fingerprint(self, name):
+        row = self.connection.execute("SELECT fingerprint FROM fingerprints WHERE name = ?", (name,)).fetchone()
+        return row[0] if row and name in self.tables() else None
+
+    def replace_table(self, name, columns, chunks, fingerprint):
+        """Загрузка таблицы заново из частей (DataFrame со столбцами columns, name_key и active)"""
+        table = quote(name)
+        definition = ', '.join(['row INTEGER PRIMARY KEY', 'name_key TEXT', 'active INTEGER']
+                               + [quote(column) for column in columns])
+        insert = f"INSERT INTO {table} VALUES ({', '.join(['?'] * (len(columns) + 3))})"
+        rows = 0
+        self.connection.execute("BEGIN")
+        try:
+            self.connection.execute(f"DROP TABLE IF EXISTS {table}")
+            self.connection.execute(f"CREATE TABLE {table} ({definition})")
+            for chunk in chunks:
+                self.connection.executemany(insert, table_rows(chunk, columns, rows))
+                rows += len(chunk)
+            # Индекс строится после вставки: так быстрее, чем поддерживать его на каждой строке
+            self.connection.execute(f"CREATE INDEX {quote(name + '_name_key')} ON {table} (name_key)")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?)",
+                (name, fingerprint, rows, datetime.now().isoformat(timespec='seconds'))
+            )
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        return rows
+
+    def source_fingerprint(self, name):
+        """Отпечаток таблицы: входной файл, его хэш и версии формата"""
+        if name in SOURCES:
+            path = source_file(name)
+            if not path:
+                return None, f"нет файла:v{STORE_VERSION}"
+            return path, f"{path}:{source_sha256(path, name)}:v{CACHE_VERSION}.{STORE_VERSION}"
+        path = ad_users_file() if name == AD_USERS_TABLE else ad_table_file(name)
+        if not path.exists():
+            return None, f"нет файла:v{STORE_VERSION}"
+        return path, f"{path}:{file_sha256(path)}:v{STORE_VERSION}"
+
+    def source_chunks(self, name, path):
+        """Части таблицы источника из его входного файла"""
+        if path is None:
+            return
+        if name in SOURCES:
+            spec = SOURCES[name]
+            for df in iter_source_chunks(name, path, SQLITE_CHUNK_ROWS):
+                active = active_mask(df, (spec['status_col'], spec['active_value'])) if spec.get('status_col') else False
+                yield with_keys(df, spec['fio_col'], active)
+        elif name == AD_USERS_TABLE:
+            if path == AD_SNAPSHOT_FILE:
+                snapshot = load_snapshot(path)
+                records = snapshot['users'].records() if snapshot else iter(())
+            else:
+                records = iter_export_records(path)
+            for df in record_chunks(records, AD_USER_COLUMNS, SQLITE_CHUNK_ROWS):
+                yield with_keys(df, 'Name', df['Enabled'])
+        else:
+            # В файлах экспорта AD только активные пользователи выбранной категории (читаются построчно)
+            for df in record_chunks(iter_names_and_statuses(path), AD_COLUMNS, SQLITE_CHUNK_ROWS):
+                yield with_keys(df, 'AD_ФИО', True)
+
+    def load_table(self, name):
+        """Загрузка таблицы, если изменился ее входной файл; True - таблица загружена заново"""
+        path, fingerprint = self.source_fingerprint(name)
+        if fingerprint == self.stored_fingerprint(name):
+            return False
+        columns = table_columns(name)
+        if name in SOURCES and path is None:
+            print(f"Актуальный файл {SOURCES[name]['title_of']} не найден")
+        try:
+            self.replace_table(name, columns, self.source_chunks(name, path), fingerprint)
+        except HeaderNotFoundError:
+            # Изменившийся формат выгрузки не должен давать молча пустые данные
+            raise
+        except Exception as e:
+            print(f"Ошибка при загрузке данных {SOURCES[name]['title_of'] if name in SOURCES else name}: {e}")
+            # Пустая таблица без отпечатка: при следующем запуске файл читается снова
+            self.replace_table(name, columns, [], None)
+        return True
+
+    def sync(self, names=None):
+        """Загрузка изменившихся таблиц (по умолчанию всех); таблицы без изменений переиспользуются"""
+        if names is None:
+            names = [*SOURCES, *(table for table, *_ in AD_TABLES.values()), AD_USERS_TABLE]
+        with stage("sqlite_sync") as record:
+            loaded = [name for name in names if self.load_table(name)]
+            record['rows'] = sum(self.row_count(name) for name in loaded)
+        reused = [name for name in names if name not in loaded]
+        print(f"SQLite {self.filename.name}: загружено {len(loaded)} ({', '.join(loaded) or '-'}), "
+              f"без изменений {len(reused)} ({', '.join(reused) or '-'})")
+        self.create_views()
+        return loaded
+
+    def create_views(self):
+        """Представление "заблокирован в AD, но активен в системе" по загруженным таблицам"""
+        tables = self.tables()
+        self.connection.execute(f"DROP VIEW IF EXISTS {BLOCKED_VIEW}")
+        services = [name for name in SERVICES if name in tables]
+        if AD_USERS_TABLE not in tables or not services:
+            return
+        parts = [
+            f"SELECT '{spec['title']}' AS система, s.{quote(spec['fio_col'])} AS ФИО, "
+            f"a.SamAccountName AS логин, a.DistinguishedName AS DN "
+            f"FROM {quote(name)} s JOIN {AD_USERS_TABLE} a ON a.name_key = s.name_key "
+            f"WHERE a.active = 0 AND s.active = 1"
+            for name, spec in SERVICES.items() if name in services
+        ]
+        self.connection.execute(f"CREATE VIEW {BLOCKED_VIEW} AS " + " UNION ALL ".join(parts))
+
+    def sheet(self, name, columns, sheet_columns=None, convert=None):
+        """Столбцы таблицы в порядке строк источника как лист, который читается курсором частями.
+        
+        sheet_columns - имена столбцов на листе, convert - столбец листа -> преобразование значения.
+        """
+        sheet_columns = sheet_columns or columns
+        sql = f"SELECT {', '.join(quote(column) for column in columns)} FROM {quote(name)} ORDER BY row"
+        
+        def chunks():
+            cursor = self.connection.execute(sql)
+            while True:
+                rows = cursor.fetchmany(SQLITE_SHEET_ROWS)
+                if not rows:
+                    return
+                df = pd.DataFrame(rows, columns=sheet_columns, dtype=object)
+                for column, function in (convert or {}).items():
+                    df[column] = df[column].map(function)
+                yield df
+        
+        return ChunkedFrame(sheet_columns, self.row_count(name), chunks)
+
+    def in_ad(self, ad_tables, alias):
+        """Условие "ключ строки есть в AD" (поиск по индексу name_key таблиц AD)"""
+        if not ad_tables:
+            return "0"
+        return '(' + ' OR '.join(
+            f"EXISTS (SELECT 1 FROM {quote(table)} ad WHERE ad.name_key = {alias}.name_key)"
+            for table in ad_tables
+        ) + ')'
+
+    def ad_originals(self, ad_tables):
+        """Ключи ФИО из AD -> исходные написания с этим ключом (в порядке строк, сотрудники раньше ГПХ)"""
+        originals = {}
+        for table in ad_tables:
+            for key, name in self.connection.execute(
+                f"SELECT name_key, AD_ФИО FROM {quote(table)} "
+                f"WHERE row IN (SELECT MIN(row) FROM {quote(table)} GROUP BY name_key, AD_ФИО) ORDER BY row"
+            ):
+                names = originals.setdefault(key, [])
+                if name not in names:
+                    names.append(name)
+        return originals
+
+    def service_results(self, name, ad_tables, all_ad_tables=None):
+        """Сверка системы с AD запросами к таблицам (те же показатели, что и process_source).
+        
+        ad_tables - таблицы AD выбранных типов (дубликаты с AD), all_ad_tables - все таблицы AD
+        (поиск на удаление; по умолчанию ad_tables).
+        """
+        if all_ad_tables is None:
+            all_ad_tables = ad_tables
+        spec = SERVICES[name]
+        key = spec['key']
+        table = quote(name)
+        fio = quote(spec['fio_col'])
+        status = quote(spec['status_col'])
+
+        with stage(f"process_{name}") as record:
+            record['rows'] = self.row_count(name)
+            print(f"Обработка данных {spec['title_of']}...")
+
+            results = {
+                f'duplicates_ad_{key}': 0,
+                f'internal_duplicates_{key}': 0,
+                f'users_to_remove_{key}': pd.DataFrame()
+            }
+
+            # Проверяем наличие необходимых данных в AD
+            if not sum(self.row_count(table_name) for table_name in all_ad_tables):
+                print("Предупреждение: таблицы AD пусты")
+                return results
+
+            in_ad = self.in_ad(ad_tables, 's')
+            common = self.scalar(f"SELECT COUNT(DISTINCT name_key) FROM {table} s WHERE {fio} IS NOT NULL AND {in_ad}")
+            if FUZZY_MATCHING:
+                # Нечетко сравниваются только ключи без точного совпадения
+                missing = [row[0] for row in self.connection.execute(
+                    f"SELECT DISTINCT name_key FROM {table} s WHERE {fio} IS NOT NULL AND NOT {in_ad}"
+                )]
+                common += len(fuzzy_matches(missing, self.ad_originals(ad_tables).keys()))
+            results[f'duplicates_ad_{key}'] = common
+            results[f'internal_duplicates_{key}'] = self.scalar(
+                f"SELECT COUNT(*) FROM (SELECT name_key FROM {table} WHERE {fio} IS NOT NULL "
+                f"GROUP BY name_key HAVING COUNT(*) > 1)"
+            )
+
+            # Кандидаты на удаление: ФИО заполнено, учетная запись активна и ее нет в AD (ни в одном типе)
+            candidates = self.query(
+                f"SELECT row, name_key, {fio}, {status} FROM {table} s "
+                f"WHERE {fio} IS NOT NULL AND active = 1 AND NOT {self.in_ad(all_ad_tables, 's')} ORDER BY row"
+            ).set_index('row')
+            candidates.index.name = None
+            if FUZZY_MATCHING:
+                # Кандидаты, похожие на кого-то в AD, - подсказка для проверки вручную (остаются в списке на удаление)
+                matches = match_names(
+                    candidates[spec['fio_col']].tolist(), candidates['name_key'].tolist(), self.ad_originals(all_ad_tables)
+                )
+                positions = [position for position, _, _ in matches]
+                results[f'fuzzy_matches_{key}'] = pd.DataFrame({
+                    spec['fio_col']: candidates[spec['fio_col']].iloc[positions],
+                    'AD_ФИО': [name for _, name, _ in matches],
+                    'Сходство': [round(score, 2) for _, _, score in matches]
+                }, index=candidates.index[positions], columns=[spec['fio_col'], 'AD_ФИО', 'Сходство'])
+            results[f'users_to_remove_{key}'] = candidates[[spec['fio_col'], spec['status_col']]]
+            return results
+
+    def service_duplicates(self, name):
+        """Строки системы с повторяющимся ключом ФИО (None, если дубликатов нет)"""
+        fio = quote(SERVICES[name]['fio_col'])
+        table = quote(name)
+        duplicate_df = self.query(
+            f"SELECT row, {fio} FROM {table} WHERE {fio} IS NOT NULL AND name_key IN "
+            f"(SELECT name_key FROM {table} WHERE {fio} IS NOT NULL GROUP BY name_key HAVING COUNT(*) > 1) "
+            f"ORDER BY row"
+        ).set_index('row')
+        duplicate_df.index.name = None
+        return duplicate_df if not duplicate_df.empty else None
+
+    def missing_in_shtat(self):
+        """Сотрудники AD (исходное написание, в порядке AD), ключа которых нет в штатном расписании"""
+        return [row[0] for row in self.connection.execute(
+            "SELECT a.AD_ФИО FROM ad_employees a WHERE a.row IN ("
+            "SELECT MIN(row) FROM ad_employees e "
+            "WHERE NOT EXISTS (SELECT 1 FROM shtat s WHERE s.name_key = e.name_key) "
+            "GROUP BY name_key) ORDER BY a.row"
+        )]
+
+    def reconcile(self, selected_options, employee_types):
+        """Сверка по таблицам хранилища: основной лист, данные систем, дубликаты и результаты сервисов.
+
+        Загружаются таблицы выбранных систем, все таблицы AD (кандидаты на удаление ищутся
+        по всем пользователям AD, а выбор типов действует на листы сравнения и дубликаты с AD)
+        и ad_users для представления blocked_in_ad_active. Основной лист и данные систем -
+        листы ChunkedFrame: строки читаются курсором при записи отчета, пока хранилище открыто.
+        """
+        needed = selected_sources(selected_options, employee_types)
+        ad_selected = {employee_type: type_selected(employee_type, employee_types) for employee_type in AD_TABLES}
+        ad_tables = [table for employee_type, (table, *_) in AD_TABLES.items() if ad_selected[employee_type]]
+        all_ad_tables = [table for table, *_ in AD_TABLES.values()]
+        self.sync(needed + all_ad_tables + [AD_USERS_TABLE])
+
+        # Основной лист: штатка и AD выбранных типов, затем данные систем (невыбранные - пустые)
+        shtat_sheet = self.sheet('shtat', ['Штатное_ФИО']) if 'shtat' in needed else empty_sheet(['Штатное_ФИО'])
+        ad_sheets = []
+        for employee_type, (table, _, name_col, status_col) in AD_TABLES.items():
+            if ad_selected[employee_type]:
+                ad_sheets.append(self.sheet(table, AD_COLUMNS, [name_col, status_col], {name_col: replace_yo}))
+            else:
+                ad_sheets.append(empty_sheet([name_col, status_col]))
+
+        results = {}
+        service_data = {}
+        service_duplicates = {}
+        for name in SERVICES:
+            if name not in needed:
+                service_data[name] = empty_sheet(table_columns(name))
+                service_duplicates[name] = None
+                continue
+            service_data[name] = self.sheet(name, table_columns(name))
+            results.update(self.service_results(name, ad_tables, all_ad_tables))
+            service_duplicates[name] = self.service_duplicates(name)
+
+        # Сравнение AD и штатки - только если штатное расписание загружено и не пусто
+        missing_in_shtat = self.missing_in_shtat() if 'shtat' in needed and self.row_count('shtat') else None
+        return {
+            'main_sheet': side_by_side([shtat_sheet, *ad_sheets, *service_data.values()]),
+            'missing_in_shtat': missing_in_shtat,
+            'service_data': service_data,
+            'service_duplicates': service_duplicates,
+            'results': results
+        }
+
+def empty_sheet(columns):
+    """Пустой лист с заданными столбцами"""
+    return ChunkedFrame(columns, 0, lambda: iter(()))
+
+def ad_table_file(name):
+    """Файл экспорта AD таблицы"""
+    for table, filename, *_ in AD_TABLES.values():
+        if table == name:
+            return filename
+    raise KeyError(name)
+
+def table_columns(name):
+    """Столбцы таблицы источника (без служебных row, name_key и active)"""
+    if name in SOURCES:
+        return list(SOURCES[name]['columns'].values())
+    if name == AD_USERS_TABLE:
+        return AD_USER_COLUMNS
+    ad_table_file(name)
+    return AD_COLUMNS
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Произвольные запросы к хранилищу сверки SQLite")
+    parser.add_argument("sql", nargs="?", help="SQL-запрос (без него - список таблиц и их отпечатков)")
+    parser.add_argument("--sync", action="store_true", help="Перед запросом загрузить изменившиеся источники")
+    args = parser.parse_args()
+
+    ensure_directories()
+    with ReconciliationStore() as store:
+        if args.sync:
+            store.sync()
+        sql = args.sql or "SELECT name, rows, loaded_at FROM fingerprints ORDER BY name"
+        with pd.option_context('display.max_rows', None, 'display.width', None):
+            print(store.query(sql).to_string(index=False))
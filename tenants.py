@@ -0,0 +1,120 @@
+# tenants.py
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from config import TENANT_WORKERS
+
+# Настройки организации -> переменные окружения, которые читает config.py
+TENANT_ENVIRONMENT = {
+    'base_dir': "USERS_CLEANER_BASE_DIR",
+    'input_dir': "USERS_CLEANER_INPUT_DIR",
+    'output_dir': "USERS_CLEANER_OUTPUT_DIR",
+    'ad_backend': "USERS_CLEANER_AD_BACKEND",
+    'ad_server': "USERS_CLEANER_AD_SERVER",
+    'ldap_server': "USERS_CLEANER_LDAP_SERVER",
+    'ldap_base_dn': "USERS_CLEANER_LDAP_BASE_DN"
+}
+PATH_KEYS = ('base_dir', 'input_dir', 'output_dir')
+
+# Вывод процесса организации (лог, print, прогресс экспорта) - в ее каталоге результатов
+CONSOLE_LOG = "консоль.log"
+
+def load_tenants(filename):
+    """Список организаций из JSON-файла; относительные пути считаются от каталога файла"""
+    filename = Path(filename)
+    with open(filename, 'r', encoding='utf-8') as f:
+        tenants = json.load(f)
+    
+    names = set()
+    for tenant in tenants:
+        name = tenant.get('name')
+        if not name:
+            raise ValueError(f"{filename}: у организации не указано имя (name)")
+        if name in names:
+            raise ValueError(f"{filename}: организация {name} указана дважды")
+        names.add(name)
+        if not tenant.get('base_dir') and not (tenant.get('input_dir') and tenant.get('output_dir')):
+            raise ValueError(f"{filename}: для {name} нужен base_dir или input_dir и output_dir")
+        for key in PATH_KEYS:
+            if tenant.get(key):
+                tenant[key] = str(filename.parent / tenant[key])
+    return tenants
+
+def tenant_output_dir(tenant):
+    """Каталог результатов организации (как его вычислит config.py)"""
+    return Path(tenant.get('output_dir') or Path(tenant['base_dir']) / "вывод")
+
+def tenant_environment(tenant):
+    """Окружение процесса организации: ее каталоги, правила DN и параметры AD"""
+    env = dict(os.environ)
+    # Параметры родительского процесса не должны перейти к организации
+    for variable in list(TENANT_ENVIRONMENT.values()) + ["USERS_CLEANER_DN_RULES"]:
+        env.pop(variable, None)
+    for key, variable in TENANT_ENVIRONMENT.items():
+        if tenant.get(key):
+            env[variable] = str(tenant[key])
+    if tenant.get('dn_rules'):
+        env["USERS_CLEANER_DN_RULES"] = json.dumps(tenant['dn_rules'], ensure_ascii=False)
+    # Параллельность - между организациями, внутри процесса источники читаются в потоках
+    env["USERS_CLEANER_LOAD_EXECUTOR"] = "thread"
+    env.update({key: str(value) for key, value in tenant.get('env', {}).items()})
+    return env
+
+def tenant_command(tenant, selected_options, employee_types, ad_export, formats=None):
+    """Командная строка обработки одной организации (main.py в отдельном процессе)"""
+    options = tenant.get('options') or sorted(selected_options)
+    types = tenant.get('types') or sorted(employee_types)
+    command = [sys.executable, str(Path(__file__).with_name("main.py")),
+               '--options', *map(str, options), '--types', *map(str, types)]
+    if not tenant.get('ad_export', ad_export):
+        command.append('--no-ad-export')
+    formats = tenant.get('formats') or formats
+    if formats:
+        command += ['--formats', *formats]
+    return command
+
+def run_tenant(tenant, selected_options, employee_types, ad_export=True, formats=None):
+    """Обработка одной организации в отдельном процессе со своими config и логами"""
+    output_dir = tenant_output_dir(tenant)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start_time = time.time()
+    start = time.perf_counter()
+    with open(output_dir / CONSOLE_LOG, 'a', encoding='utf-8') as console:
+        completed = subprocess.run(
+            tenant_command(tenant, selected_options, employee_types, ad_export, formats),
+            env=tenant_environment(tenant), stdout=console, stderr=subprocess.STDOUT
+        )
+    
+    # Отчет, созданный этим запуском: книга или каталог листов (main.py пишет ошибки обработки в лог и не падает)
+    reports = [path for path in output_dir.glob("результат_обработки_*") if path.stat().st_mtime >= start_time - 1]
+    return {
+        'name': tenant['name'],
+        'returncode': completed.returncode,
+        'seconds': round(time.perf_counter() - start, 1),
+        'report': str(max(reports, key=lambda path: path.stat().st_mtime)) if reports else None,
+        'log': str(output_dir / CONSOLE_LOG)
+    }
+
+def run_tenants(tenants, selected_options, employee_types, ad_export=True, workers=None, formats=None):
+    """Параллельная обработка организаций: не более workers процессов одновременно"""
+    workers = min(workers or TENANT_WORKERS, len(tenants)) or 1
+    logging.info(f"Организаций: {len(tenants)}, одновременно обрабатывается: {workers}")
+    
+    summaries = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_tenant, tenant, selected_options, employee_types, ad_export, formats)
+                   for tenant in tenants]
+        for future in futures:
+            summary = future.result()
+            summaries.append(summary)
+            if summary['returncode'] == 0 and summary['report']:
+                logging.info(f"[{summary['name']}] готово за {summary['seconds']} с: {summary['report']}")
+            else:
+                logging.error(f"[{summary['name']}] обработка не удалась (код {summary['returncode']}), "
+                              f"подробности: {summary['log']}")
+    return summaries
@@ -1,12 +1,14 @@
 # utils.py
 import re
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.styles import PatternFill
 import os
 from pathlib import Path
-from config import SHTAT_DIR, KONTUR_DIR, DIADOC_DIR, ONEC_DIR, MAX_FILE_AGE_DAYS, MAX_ROWS
+from config import MAX_FILE_AGE_DAYS, COMPARISON_SHEET, FUZZY_MATCHING, RED_COLOR, YELLOW_COLOR
 from datetime import datetime, timedelta
+from profiling import profiled
+from name_index import NameIndex
+from fuzzy_match import fuzzy_matches, match_names
+from report_writer import ReportWriter
 
 def is_file_recent(file_path):
     """Проверяет, актуален ли файл (создан/изменен не более MAX_FILE_AGE_DAYS дней назад)"""
@@ -28,21 +30,39 @@ def find_latest_file(directory, pattern):
     
     return max(files, key=os.path.getmtime)
 
-def get_onec_file():
-    """Находит файл 1С"""
-    return find_latest_file(ONEC_DIR, "*.xlsx")
-
-def get_kontur_file():
-    """Находит файл Контура"""
-    return find_latest_file(KONTUR_DIR, "*.xlsx")
-
-def get_diadoc_file():
-    """Находит файл Диадока"""
-    return find_latest_file(DIADOC_DIR, "*.xlsx")
+def iter_names_and_statuses(filename):
+    """Потоковое чтение пар (имя, статус) из файла в формате 'Name: ФИО' и 'Status: Статус'"""
+    current_name = None
+    current_status = "Неизвестно"
+    
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('Name:'):
+                # Если уже есть текущее имя, отдаем его с текущим статусом
+                if current_name is not None:
+                    yield current_name, current_status
+                current_name = line.split(':', 1)[1].strip()
+                current_status = "Неизвестно"  # Сбрасываем статус для нового имени
+            elif line.startswith('Status:'):
+                current_status = line.split(':', 1)[1].strip()
+    
+    # Последнее имя, если оно есть
+    if current_name is not None:
+        yield current_name, current_status
 
-def get_shtat_file():
-    """Находит файл штатного расписания"""
-    return find_latest_file(SHTAT_DIR, "*.xlsx")
+def read_names_and_statuses_from_file(filename):
+    """Чтение имен и статусов из файла в формате 'Name: ФИО' и 'Status: Статус'"""
+    names = []
+    statuses = []
+    try:
+        for name, status in iter_names_and_statuses(filename):
+            names.append(name)
+            statuses.append(status)
+        return names, statuses
+    except Exception as e:
+        print(f"Ошибка при чтении файла {filename}: {e}")
+        return [], []
 
 def replace_yo(text):
     """Замена ё на е"""
@@ -64,166 +84,111 @@ def normalize_name(full_name):
         return parts[0].upper()
     return ""
 
-def highlight_duplicates(df, column, duplicate_names, color='red'):
-    """Подсветка дубликатов в DataFrame"""
-    if color == 'red':
-        fill = PatternFill(start_color='FFC7CE', end_color='FFC7CE', fill_type='solid')
-    else:  # yellow
-        fill = PatternFill(start_color='FFEB9C', end_color='FFEB9C', fill_type='solid')
-    
-    for idx, row in df.iterrows():
-        normalized_name = normalize_name(row[column])
-        if normalized_name in duplicate_names:
-            yield fill
-        else:
-            yield None
-
-def save_with_formatting(df, filename, sheet_name, highlighting):
-    """Сохранение DataFrame с форматированием"""
-    df.to_excel(filename, sheet_name=sheet_name, index=False)
+@profiled("normalize_names", rows=len)
+def normalize_names(series):
+    """Векторная нормализация столбца ФИО (то же, что normalize_name, но для всей Series)"""
+    result = pd.Series("", index=series.index, dtype=object)
+    present = series.notna()
+    if not present.any():
+        return result
     
-    # Применяем форматирование
-    wb = load_workbook(filename)
-    ws = wb[sheet_name]
+    # Повторяющиеся ФИО нормализуем один раз
+    codes, uniques = pd.factorize(series[present].astype(str))
+    text = pd.Series(uniques, dtype=object).str.upper().str.replace('Ё', 'Е', regex=False)
     
-    for idx, fill in enumerate(highlighting, 1):
-        if fill:
-            for row in range(2, len(df) + 2):  # Начинаем со второй строки (первая - заголовок)
-                ws.cell(row=row, column=idx).fill = fill
+    # Первые два слова: фамилия и имя (отчество отбрасываем)
+    parts = text.str.split(n=2, expand=True).reindex(columns=[0, 1])
+    keys = parts[0].fillna('').astype(object)
+    second = parts[1]
+    has_second = second.notna()
+    keys[has_second] = keys[has_second] + ' ' + second[has_second]
     
-    wb.save(filename)
+    result[present] = keys.to_numpy(dtype=object)[codes]
+    return result
 
-def load_kontur_data():
-    """Загрузка данных из Контура"""
-    try:
-        kontur_file = get_kontur_file()
-        if not kontur_file or not is_file_recent(kontur_file):
-            print("Актуальный файл Контура не найден")
-            return pd.DataFrame(columns=['Контур_ФИО', 'Контур_Администратор', 'Контур_статус'])
-        
-        # Читаем данные
-        df = pd.read_excel(kontur_file)
-        
-        # Переименовываем колонки
-        df = df.rename(columns={
-            'ФИО': 'Контур_ФИО',
-            'Администратор': 'Контур_Администратор',
-            'Дата блокировки': 'Контур_статус'
-        })
-        
-        # Создаем копию для безопасного изменения
-        result_df = df[['Контур_ФИО', 'Контур_Администратор', 'Контур_статус']].copy()
-        
-        # Преобразуем булевы значения в "да"/"нет" для Контур_Администратор
-        if 'Контур_Администратор' in result_df.columns:
-            # Преобразуем в строки и применяем логику
-            admin_series = result_df['Контур_Администратор'].astype(str)
-            admin_series = admin_series.apply(
-                lambda x: 'да' if x.lower() in ['true', 'истина', '1', 'yes', 'да'] 
-                else 'нет' if x.lower() in ['false', 'ложь', '0', 'no', 'нет'] 
-                else x
-            )
-            result_df = result_df.assign(Контур_Администратор=admin_series)
-        
-        # Преобразуем даты блокировки в статусы для Контур_статус
-        if 'Контур_статус' in result_df.columns:
-            # Правильная логика: если в ячейке есть данные (не пустая и не NaN) - пользователь заблокирован
-            # Если ячейка пустая или NaN - пользователь активен
-            status_series = result_df['Контур_статус'].apply(
-                lambda x: 'заблокирована' if pd.notna(x) and str(x).strip() != '' 
-                else 'активна'
-            )
-            result_df = result_df.assign(Контур_статус=status_series)
-        
-        return result_df
-        
-    except Exception as e:
-        print(f"Ошибка при загрузке данных Контура: {e}")
-        return pd.DataFrame(columns=['Контур_ФИО', 'Контур_Администратор', 'Контур_статус'])
+# Кэш нормализованных ключей на время одного запуска: имя столбца -> (исходные значения, ключи)
+_name_key_cache = {}
+# Индексы ключей по столбцам: имя столбца -> NameIndex
+_name_index_cache = {}
+
+def reset_name_cache(column=None):
+    """Сброс кэша нормализованных ключей (целиком или для одного столбца)"""
+    if column is None:
+        _name_key_cache.clear()
+        _name_index_cache.clear()
+    else:
+        _name_key_cache.pop(column, None)
+        _name_index_cache.pop(column, None)
+
+def normalized_column(df, column):
+    """Нормализованные ключи столбца; каждый столбец источника нормализуется один раз за запуск"""
+    series = df[column]
+    cached = _name_key_cache.get(column)
+    if cached is not None:
+        source, keys = cached
+        # Подмножество строк исходного столбца (например, после dropna) берем из кэша
+        if series.index.isin(source.index).all():
+            if series.index.equals(source.index):
+                same = series.equals(source)
+            else:
+                same = series.equals(source.loc[series.index])
+            if same:
+                return keys if series.index.equals(keys.index) else keys.loc[series.index]
     
-def load_diadoc_data():
-    """Загрузка данных из Диадока"""
-    try:
-        diadoc_file = get_diadoc_file()
-        if not diadoc_file or not is_file_recent(diadoc_file):
-            print("Актуальный файл Диадока не найден")
-            return pd.DataFrame(columns=['Диадок_ФИО', 'Диадок_Активен', 'Диадок_Администратор'])
-        
-        df = pd.read_excel(diadoc_file)
-        # Переименовываем колонки для удобства
-        df = df.rename(columns={
-            'ФИО': 'Диадок_ФИО',
-            'Активен': 'Диадок_Активен',
-            'Администратор': 'Диадок_Администратор'
-        })
-        return df[['Диадок_ФИО', 'Диадок_Активен', 'Диадок_Администратор']]
-    except Exception as e:
-        print(f"Ошибка при загрузке данных Диадока: {e}")
-        return pd.DataFrame(columns=['Диадок_ФИО', 'Диадок_Активен', 'Диадок_Администратор'])
+    keys = normalize_names(series)
+    if series.index.is_unique:
+        _name_key_cache[column] = (series, keys)
+    return keys
 
-def load_shtat_data():
-    """Загрузка данных из штатного расписания"""
-    try:
-        shtat_file = get_shtat_file()
-        if not shtat_file or not is_file_recent(shtat_file):
-            print("Актуальный файл штатного расписания не найден")
-            return pd.DataFrame(columns=['Штатное_ФИО'])
-        
-        df = pd.read_excel(shtat_file)
-        # Переименовываем колонки для удобства
-        df = df.rename(columns={'Ф.И.О.': 'Штатное_ФИО'})
-        return df[['Штатное_ФИО']]
-    except Exception as e:
-        print(f"Ошибка при загрузке данных штатного расписания: {e}")
-        return pd.DataFrame(columns=['Штатное_ФИО'])
+def name_index(df, column):
+    """Индекс ключей ФИО столбца; строится заново, только если изменились ключи"""
+    keys = normalized_column(df, column)
+    cached = _name_index_cache.get(column)
+    if cached is not None and cached.keys is keys:
+        return cached
+    index = NameIndex(keys)
+    _name_index_cache[column] = index
+    return index
 
-def load_onec_data():
-    """Загрузка данных из 1С"""
-    try:
-        onec_file = get_onec_file()
-        if not onec_file or not is_file_recent(onec_file):
-            print("Актуальный файл 1С не найден")
-            return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
-        
-        # Читаем файл, пропускаем первые 3 строки (заголовки)
-        df = pd.read_excel(onec_file, skiprows=3)
-        
-        # Переименовываем колонки для удобства
-        df = df.rename(columns={
-            'Полное имя': '1C_ФИО',
-            'Вход в приложение разрешен': '1C_Активен'
-        })
-        
-        # Оставляем только нужные колонки и фильтруем пустые значения
-        df = df[['1C_ФИО', '1C_Активен']].dropna(subset=['1C_ФИО'])
-        
-        # Преобразуем статус активности в понятный формат
-        df_processed = df.copy()
-        df_processed.loc[:, '1C_Активен'] = df_processed['1C_Активен'].apply(
-            lambda x: 'Да' if pd.notna(x) and str(x).strip() != '' else 'Нет'
-        )
-        
-        return df_processed
-    except Exception as e:
-        print(f"Ошибка при загрузке данных 1С: {e}")
-        return pd.DataFrame(columns=['1C_ФИО', '1C_Активен'])
+# Цвета подсветки по названию
+HIGHLIGHT_COLORS = {'red': RED_COLOR, 'yellow': YELLOW_COLOR}
+
+def highlight_duplicates(df, column, duplicate_names, color='red'):
+    """Подсветка ячеек столбца, ключ ФИО которых входит в duplicate_names.
+    
+    Маска строк считается сразу по всему столбцу (по индексу ключей), заливка
+    применяется при записи листа: (столбец, маска строк, цвет RGB).
+    """
+    return column, name_index(df, column).isin(duplicate_names), HIGHLIGHT_COLORS.get(color, color)
+
+def save_with_formatting(df, filename, sheet_name, highlighting):
+    """Сохранение DataFrame с подсветкой (highlighting - результаты highlight_duplicates) за одну запись"""
+    report = ReportWriter()
+    report.add_sheet(sheet_name, df, highlighting)
+    report.save(filename)
 
-def create_comparison_sheet(ad_employees, shtat_employees, filename):
+@profiled("comparison_sheet", rows=lambda count: count)
+def create_comparison_sheet(ad_employees, shtat_employees, report):
     """Создание листа сравнения AD и Штатного расписания"""
     if not shtat_employees:
         return 0
     
     # Находим сотрудников, которые есть в AD, но нет в штатном расписании
-    ad_set = set(normalize_name(name) for name in ad_employees)
-    shtat_set = set(normalize_name(name) for name in shtat_employees)
+    ad_index = NameIndex.from_names(ad_employees, normalize_names)
+    shtat_index = NameIndex.from_names(shtat_employees, normalize_names)
     
-    missing_in_shtat = ad_set - shtat_set
+    missing_in_shtat = ad_index.difference(shtat_index)
     
-    # Создаем DataFrame для результатов сравнения
+    # Оригинальное написание - первая строка AD с этим ключом (в порядке AD)
+    return add_comparison_sheet(
+        [ad_employees[position] for position in sorted(ad_index.first_row(name) for name in missing_in_shtat)],
+        report
+    )
+
+def add_comparison_sheet(missing_names, report):
+    """Лист сравнения: сотрудники AD, которых нет в штатном расписании"""
     comparison_data = []
-    for name in missing_in_shtat:
-        # Находим оригинальное имя из AD
-        original_name = next((n for n in ad_employees if normalize_name(n) == name), name)
+    for original_name in missing_names:
         comparison_data.append({
             'ФИО_AD': original_name,
             'Статус': 'Активен в AD, но отсутствует в штатном расписании'
@@ -231,56 +196,88 @@ def create_comparison_sheet(ad_employees, shtat_employees, filename):
     
     comparison_df = pd.DataFrame(comparison_data)
     
-    # Сохраняем в файл
-    with pd.ExcelWriter(filename, engine='openpyxl', mode='a') as writer:
-        comparison_df.to_excel(writer, sheet_name='сравнение AD и Штатки', index=False)
+    # Лист записывается вместе с остальными листами отчета
+    report.add_sheet(COMPARISON_SHEET, comparison_df)
     
-    return len(missing_in_shtat)
+    return len(missing_names)
 
-def find_duplicates(df1, df2, col1, col2):
-    """Поиск дубликатов между двумя DataFrame"""
-    names1 = set(df1[col1].apply(normalize_name).dropna())
-    names2 = set(df2[col2].apply(normalize_name).dropna())
-    
-    return names1.intersection(names2)
+def find_duplicates(df1, df2, col1, col2, fuzzy=None):
+    """Поиск дубликатов между двумя DataFrame (fuzzy - учитывать и похожие ФИО)"""
+    if fuzzy is None:
+        fuzzy = FUZZY_MATCHING
+    index1 = name_index(df1, col1)
+    index2 = name_index(df2, col2)
+    common = index1.intersection(index2)
+    if fuzzy:
+        # Нечетко сравниваются только ключи без точного совпадения
+        common |= set(fuzzy_matches(index2.difference(index1), index1.key_set()))
+    return common
 
 def find_internal_duplicates(df, column):
     """Поиск дубликатов внутри одного столбца"""
-    normalized_names = df[column].apply(normalize_name)
-    value_counts = normalized_names.value_counts()
-    return set(value_counts[value_counts > 1].index)
+    return name_index(df, column).duplicates()
+
+def active_mask(edo_df, status_rule):
+    """Маска активных учетных записей; status_rule - (столбец статуса, значение "активна") системы"""
+    status_col, active_value = status_rule
+    if status_col not in edo_df.columns:
+        return pd.Series(False, index=edo_df.index)
+    status = edo_df[status_col].astype(str).str.strip().str.lower()
+    return status == active_value.lower()
 
-def find_users_to_remove(edo_df, staff_df, gph_df):
+def removal_mask(edo_df, fio_column, ad_names, status_rule):
+    """Маска пользователей для удаления: ФИО заполнено, нет в AD и учетная запись активна"""
+    has_name = edo_df[fio_column].notna()
+    not_in_ad = ~name_index(edo_df, fio_column).isin(ad_names)
+    return has_name & not_in_ad & active_mask(edo_df, status_rule)
+
+def ad_original_names(staff_df, gph_df):
+    """Ключи ФИО из AD -> исходные написания с этим ключом (в порядке строк, без повторов)"""
+    originals = {}
+    seen = set()
+    for ad_df in (staff_df, gph_df):
+        if ad_df.empty or 'AD_ФИО' not in ad_df.columns:
+            continue
+        keys = name_index(ad_df, 'AD_ФИО').keys
+        for key, name in zip(keys, ad_df.loc[keys.index, 'AD_ФИО']):
+            if (key, name) not in seen:
+                seen.add((key, name))
+                originals.setdefault(key, []).append(name)
+    return originals
+
+def find_users_to_remove(edo_df, staff_df, gph_df, status_rule):
     """Поиск пользователей для удаления из ЭДО"""
     # Создаем объединенный набор всех valid names
     all_valid_names = set()
     
     if not staff_df.empty and 'AD_ФИО' in staff_df.columns:
-        all_valid_names.update(staff_df['AD_ФИО'].apply(normalize_name).dropna())
+        all_valid_names.update(name_index(staff_df, 'AD_ФИО').key_set())
     
     if not gph_df.empty and 'AD_ФИО' in gph_df.columns:
-        all_valid_names.update(gph_df['AD_ФИО'].apply(normalize_name).dropna())
+        all_valid_names.update(name_index(gph_df, 'AD_ФИО').key_set())
     
-    users_to_remove = []
+    if edo_df.empty:
+        return edo_df.copy()
     
-    for _, row in edo_df.iterrows():
-        # Первый столбец - ФИО
-        fio_column = edo_df.columns[0]
-        if pd.isna(row[fio_column]):
-            continue
-            
-        normalized_name = normalize_name(row[fio_column])
-        
-        # Проверяем условия для удаления (нет в AD и активен/не заблокирован)
-        if normalized_name not in all_valid_names:
-            # Для Контура проверяем статус
-            if 'Контур_статус' in edo_df.columns and row['Контур_статус'] == 'активна':
-                users_to_remove.append(row)
-            # Для Диадока проверяем активность
-            elif 'Диадок_Активен' in edo_df.columns and row['Диадок_Активен'] == 'Да':
-                users_to_remove.append(row)
-            # Для 1С проверяем активность
-            elif '1C_Активен' in edo_df.columns and row['1C_Активен'] == 'Да':
-                users_to_remove.append(row)
+    # Первый столбец - ФИО
+    fio_column = edo_df.columns[0]
+    return edo_df[removal_mask(edo_df, fio_column, all_valid_names, status_rule)]
+
+def find_fuzzy_matches(edo_df, staff_df, gph_df, status_rule):
+    """Кандидаты на удаление, похожие на кого-то в AD: ФИО, ФИО в AD и сходство (из списка на удаление не исключаются)"""
+    originals = ad_original_names(staff_df, gph_df)
+    columns = [edo_df.columns[0] if len(edo_df.columns) else 'ФИО', 'AD_ФИО', 'Сходство']
+    if edo_df.empty or not originals:
+        return pd.DataFrame(columns=columns)
+    
+    fio_column = edo_df.columns[0]
+    candidates = edo_df[removal_mask(edo_df, fio_column, originals.keys(), status_rule)]
+    keys = name_index(edo_df, fio_column).keys.loc[candidates.index]
+    matches = match_names(candidates[fio_column].tolist(), keys.tolist(), originals)
     
-    return pd.DataFrame(users_to_remove)
\ No newline at end of file
+    positions = [position for position, _, _ in matches]
+    return pd.DataFrame({
+        fio_column: candidates[fio_column].iloc[positions],
+        'AD_ФИО': [name for _, name, _ in matches],
+        'Сходство': [round(score, 2) for _, _, score in matches],
+    }, index=candidates.index[positions], columns=columns)
\ No newline at end of file
@@ -0,0 +1,61 @@
+# watcher.py
+import logging
+import time
+from config import AD_EXPORT_DIR, WATCH_INTERVAL
+from source_registry import SOURCES
+
+# Отслеживаемые входные файлы: источник -> (каталог, шаблон имени)
+WATCHED_SOURCES = {
+    'ad': (AD_EXPORT_DIR, "*.txt"),
+    **{name: (spec['directory'], spec['pattern']) for name, spec in SOURCES.items()}
+}
+
+def scan_source(directory, pattern):
+    """Состояние файлов каталога: имя -> (время изменения, размер)"""
+    files = {}
+    for path in directory.glob(pattern):
+        # Файлы блокировки Excel (~$имя.xlsx) не являются выгрузками
+        if path.name.startswith('~$'):
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        files[path.name] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+def scan_all(sources=None):
+    sources = sources or WATCHED_SOURCES
+    return {name: scan_source(directory, pattern) for name, (directory, pattern) in sources.items()}
+
+def watch(on_change, interval=WATCH_INTERVAL, sources=None, should_stop=None):
+    """Опрос входных каталогов; on_change(изменившиеся источники) вызывается,
+    когда файлы источника изменились и не менялись между двумя опросами
+    (файл, который еще копируется, не читается)"""
+    sources = sources or WATCHED_SOURCES
+    processed = scan_all(sources)
+    pending = {}
+    
+    while should_stop is None or not should_stop():
+        time.sleep(interval)
+        current = scan_all(sources)
+        
+        ready = set()
+        for name, files in current.items():
+            if files == processed[name]:
+                pending.pop(name, None)
+            elif pending.get(name) == files:
+                ready.add(name)
+            else:
+                pending[name] = files
+        
+        if not ready:
+            continue
+        try:
+            on_change(ready)
+        except Exception:
+            # Ошибка в одной выгрузке не останавливает наблюдение - ждем следующего изменения
+            logging.exception(f"Ошибка при пересчете ({', '.join(sorted(ready))}):")
+        for name in ready:
+            processed[name] = current[name]
+            pending.pop(name, None)
@@ -0,0 +1,263 @@
+# xlsx_reader.py
+import contextlib
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_excel, CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904
+from config import HEADER_SCAN_ROWS
+
+# Пространства имен SpreadsheetML (Transitional - его пишут Excel, 1С и Контур)
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+CELL = MAIN_NS + 'c'
+ROW = MAIN_NS + 'row'
+VALUE = MAIN_NS + 'v'
+TEXT = MAIN_NS + 't'
+RUN = MAIN_NS + 'r'
+INLINE_STRING = MAIN_NS + 'is'
+
+class HeaderNotFoundError(ValueError):
+    """В файле не найдена строка заголовка с нужными столбцами (изменился формат выгрузки)"""
+
+def _string_item_text(item):
+    """Текст элемента si/is: простой текст или фрагменты форматированного текста (без фонетики)"""
+    parts = []
+    for child in item:
+        if child.tag == TEXT:
+            parts.append(child.text or '')
+        elif child.tag == RUN:
+            text = child.find(TEXT)
+            if text is not None:
+                parts.append(text.text or '')
+    return ''.join(parts)
+
+class SheetReader:
+    """Потоковое чтение первого листа XLSX напрямую из XML.
+
+    Ячейки вне столбцов self.columns пропускаются до преобразования значений,
+    поэтому широкие выгрузки с десятками лишних столбцов читаются быстро.
+    """
+    
+    def __init__(self, archive):
+        self.archive = archive
+        self.columns = None  # Индексы нужных столбцов с 0 (None - все столбцы)
+        self.sheet_path, self.epoch = self._read_workbook()
+        self.shared_strings = self._read_shared_strings()
+        self.date_styles = self._read_date_styles()
+    
+    def _read_workbook(self):
+        """Путь к первому листу и календарь дат книги"""
+        root = ET.fromstring(self.archive.read('xl/workbook.xml'))
+        if root.tag != MAIN_NS + 'workbook':
+            raise ValueError("неподдерживаемый формат книги")
+        
+        properties = root.find(MAIN_NS + 'workbookPr')
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        
+        sheet = root.find(f"{MAIN_NS}sheets/{MAIN_NS}sheet")
+        relation_id = sheet.get(REL_NS + 'id')
+        rels = ET.fromstring(self.archive.read('xl/_rels/workbook.xml.rels'))
+        for rel in rels.iter(PACKAGE_REL_NS + 'Relationship'):
+            if rel.get('Id') == relation_id:
+                target = rel.get('Target')
+                path = target.lstrip('/') if target.startswith('/') else f"xl/{target}"
+                return path, epoch
+        raise ValueError("не найден первый лист книги")
+    
+    def _read_shared_strings(self):
+        """Таблица общих строк"""
+        if 'xl/sharedStrings.xml' not in self.archive.namelist():
+            return []
+        strings = []
+        with self.archive.open('xl/sharedStrings.xml') as source:
+            for _, element in ET.iterparse(source):
+                if element.tag == MAIN_NS + 'si':
+                    strings.append(_string_item_text(element))
+                    element.clear()
+        return strings
+    
+    def _read_date_styles(self):
+        """Индексы стилей ячеек с форматом даты"""
+        if 'xl/styles.xml' not in self.archive.namelist():
+            return set()
+        root = ET.fromstring(self.archive.read('xl/styles.xml'))
+        custom_formats = {
+            int(fmt.get('numFmtId')): fmt.get('formatCode')
+            for fmt in root.iter(MAIN_NS + 'numFmt')
+        }
+        date_styles = set()
+        cell_formats = root.find(MAIN_NS + 'cellXfs')
+        if cell_formats is None:
+            return date_styles
+        for index, xf in enumerate(cell_formats.iter(MAIN_NS + 'xf')):
+            format_id = int(xf.get('numFmtId', 0))
+            code = custom_formats.get(format_id) or BUILTIN_FORMATS.get(format_id)
+            if code and is_date_format(code):
+                date_styles.add(index)
+        return date_styles
+    
+    def _cell_value(self, cell):
+        """Значение ячейки в типах Python"""
+        cell_type = cell.get('t', 'n')
+        if cell_type == 'inlineStr':
+            item = cell.find(INLINE_STRING)
+            return _string_item_text(item) if item is not None else None
+        
+        value = cell.find(VALUE)
+        if value is None or value.text is None:
+            return None
+        text = value.text
+        
+        if cell_type == 's':
+            return self.shared_strings[int(text)]
+        if cell_type in ('str', 'e'):
+            return text
+        if cell_type == 'b':
+            return text == '1'
+        if cell_type == 'd':
+            return datetime.fromisoformat(text)
+        
+        # Число (или дата, если у ячейки формат даты)
+        number = float(text) if any(ch in text for ch in '.eE') else int(text)
+        if int(cell.get('s', 0)) in self.date_styles:
+            return from_excel(number, self.epoch)
+        return number
+    
+    def rows(self):
+        """Строки листа: (номер строки с 1, {индекс столбца: значение})"""
+        with self.archive.open(self.sheet_path) as source:
+            values = {}
+            column = -1
+            row_number = 0
+            for _, element in ET.iterparse(source):
+                if element.tag == CELL:
+                    reference = element.get('r')
+                    if reference:
+                        column = column_index_from_string(reference.rstrip('0123456789')) - 1
+                    else:
+                        column += 1
+                    if self.columns is None or column in self.columns:
+                        values[column] = self._cell_value(element)
+                elif element.tag == ROW:
+                    row_number = int(element.get('r', row_number + 1))
+                    yield row_number, values
+                    values = {}
+                    column = -1
+                    element.clear()
+
+def _iter_rows_openpyxl(path):
+    """Запасной путь через openpyxl read-only (нестандартные книги)"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        # Размеры листа в выгрузках бывают записаны неверно - читаем до конца
+        worksheet.reset_dimensions()
+        for row_number, row in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            yield row_number, dict(enumerate(row))
+    finally:
+        workbook.close()
+
+def _header_text(value):
+    """Текст ячейки заголовка для сравнения с именем столбца"""
+    return str(value).strip() if value is not None else None
+
+def find_header(rows, columns, max_scan_rows=HEADER_SCAN_ROWS):
+    """Номер строки заголовка и индексы нужных столбцов среди первых max_scan_rows строк"""
+    best_match = set()
+    for row_number, values in rows:
+        if row_number > max_scan_rows:
+            break
+        header = {_header_text(value): index for index, value in sorted(values.items(), reverse=True)}
+        found = {column for column in columns if column in header}
+        if len(found) == len(columns):
+            return row_number, [header[column] for column in columns]
+        if len(found) > len(best_match):
+            best_match = found
+    
+    missing = [column for column in columns if column not in best_match]
+    raise HeaderNotFoundError(
+        f"не найдена строка заголовка в первых {max_scan_rows} строках, "
+        f"отсутствуют столбцы: {', '.join(missing)}"
+    )
+
+def _iter_values(rows, positions):
+    """Значения нужных столбцов по строкам; строки, где все они пусты, пропускаются"""
+    for _, values in rows:
+        row = [values.get(position) for position in positions]
+        if all(value is None or value == '' for value in row):
+            continue
+        yield row
+
+def _collect(rows, columns, positions):
+    """Значения нужных столбцов: {столбец: список значений}"""
+    data = {column: [] for column in columns}
+    for row in _iter_values(rows, positions):
+        for column, value in zip(columns, row):
+            data[column].append(value)
+    return data
+
+def _frame(data, columns):
+    df = pd.DataFrame(data, columns=columns)
+    # Пустые ячейки - NaN, как у pd.read_excel
+    return df.mask(df.isna())
+
+def read_columns(path, columns, max_scan_rows=HEADER_SCAN_ROWS):
+    """Потоковое чтение только нужных столбцов первого листа с автоопределением строки заголовка"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            reader = SheetReader(archive)
+            rows = reader.rows()
+            header_row, positions = find_header(rows, columns, max_scan_rows)
+            # Дальше значения берутся только из нужных столбцов
+            reader.columns = set(positions)
+            data = _collect(rows, columns, positions)
+    except HeaderNotFoundError as e:
+        raise HeaderNotFoundError(f"{path.name}: {e}") from None
+    except (KeyError, ValueError, AttributeError, ET.ParseError):
+        # Книга со структурой, которую прямой разбор не поддерживает
+        try:
+            rows = _iter_rows_openpyxl(path)
+            header_row, positions = find_header(rows, columns, max_scan_rows)
+            data = _collect(rows, columns, positions)
+        except HeaderNotFoundError as e:
+            raise HeaderNotFoundError(f"{path.name}: {e}") from None
+    
+    return _frame(data, columns)
+
+def iter_column_chunks(path, columns, chunk_size, max_scan_rows=HEADER_SCAN_ROWS):
+    """То же, что read_columns, но частями по chunk_size строк: файл не собирается в памяти целиком"""
+    with contextlib.ExitStack() as stack:
+        try:
+            archive = stack.enter_context(zipfile.ZipFile(path))
+            reader = SheetReader(archive)
+            rows = reader.rows()
+            header_row, positions = find_header(rows, columns, max_scan_rows)
+            reader.columns = set(positions)
+        except HeaderNotFoundError as e:
+            raise HeaderNotFoundError(f"{path.name}: {e}") from None
+        except (KeyError, ValueError, AttributeError, ET.ParseError):
+            rows = _iter_rows_openpyxl(path)
+            try:
+                header_row, positions = find_header(rows, columns, max_scan_rows)
+            except HeaderNotFoundError as e:
+                raise HeaderNotFoundError(f"{path.name}: {e}") from None
+        
+        data = {column: [] for column in columns}
+        count = 0
+        for row in _iter_values(rows, positions):
+            for column, value in zip(columns, row):
+                data[column].append(value)
+            count += 1
+            if count == chunk_size:
+                yield _frame(data, columns)
+                data = {column: [] for column in columns}
+                count = 0
+        if count:
+            yield _frame(data, columns)
\ No newline at end of file